@@ -1,6 +1,7 @@
 from flask import jsonify
 import psutil
 import time
+from db.connection_pool import pool_stats
 
 class AdminController:
     
@@ -68,29 +69,51 @@ class AdminController:
             return self._standard_response(data={
                 "user_statistics": user_stats,
                 "service_info": service_info,
+                "connection_pools": pool_stats(),
                 "timestamp": int(time.time())
             })
             
         except Exception as e:
             return self._standard_response(False, error=f"Failed to get system stats: {str(e)}", status_code=500)
 
-    def list_users(self, role):
-        """Lấy danh sách người dùng theo role - Chuẩn hóa response"""
+    def list_users(self, role, limit=100, cursor=None):
+        """
+        Lấy danh sách người dùng theo role - Chuẩn hóa response
+
+        Phân trang keyset: truyền next_cursor của trang trước vào cursor.
+        Với role 'all', học sinh được trả trước rồi tới giáo viên, cursor có
+        dạng '<role>:<id>' để biết đang ở phần nào.
+        """
         try:
+            user_service = self.admin_service.user_service
             if role == 'student':
-                users = self.admin_service.user_service.get_all_students()
+                users, next_cursor = user_service.get_students_page(limit, cursor=cursor)
             elif role == 'teacher':
-                users = self.admin_service.user_service.get_all_teachers()
-            elif role == 'None' or role == 'all':
-                students = self.admin_service.user_service.get_all_students()
-                teachers = self.admin_service.user_service.get_all_teachers()
-                users = students + teachers
+                users, next_cursor = user_service.get_teachers_page(limit, cursor=cursor)
+            elif role in (None, 'None', 'all'):
+                phase, _, last_id = (cursor or 'student:').partition(':')
+                last_id = last_id or None
+                if phase == 'teacher':
+                    users, teacher_cursor = user_service.get_teachers_page(limit, cursor=last_id)
+                    next_cursor = f"teacher:{teacher_cursor}" if teacher_cursor else None
+                else:
+                    users, student_cursor = user_service.get_students_page(limit, cursor=last_id)
+                    if student_cursor:
+                        next_cursor = f"student:{student_cursor}"
+                    else:
+                        # Hết học sinh, lấp phần còn lại của trang bằng giáo viên
+                        teachers, teacher_cursor = user_service.get_teachers_page(limit - len(users))
+                        users = users + teachers
+                        next_cursor = f"teacher:{teacher_cursor}" if teacher_cursor else None
+            else:
+                return self._standard_response(False, error=f"Invalid role '{role}'", status_code=400)
             
             #  Sử dụng standard response format
             return self._standard_response(data={
                 "users": users,
                 "count": len(users),
-                "filter": role
+                "filter": role,
+                "next_cursor": next_cursor
             })
             
         except Exception as e:
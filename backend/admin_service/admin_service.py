@@ -13,17 +13,19 @@ class AdminService:
     Tích hợp chức năng ServiceRegistry để đăng ký và quản lý các dịch vụ.
     """
 
-    def __init__(self, user_service):  # Loại bỏ type hint để tránh import
+    def __init__(self, user_service, signup_service=None, permission_service_obj=None):  # Loại bỏ type hint để tránh import
         """
         Khởi tạo AdminService
 
         Args:
             user_service: Service quản lý người dùng
+            signup_service: signup_service dùng chung (mặc định: tạo mới)
+            permission_service_obj: permission_service dùng chung (mặc định: tạo mới)
         """
         self.user_service = user_service
         self.services = {}
-        self.signup = signup()
-        self.permission_service = permission_service()
+        self.signup = signup_service or signup(user_service=user_service)
+        self.permission_service = permission_service_obj or permission_service()
 
     def register_service(self, name: str, service):
         """
@@ -1,11 +1,25 @@
+import os
+
 from flask import request, jsonify
+
+from api_gateway.request_auth import RequestAuth
+from api_gateway.service_registry import build_services
 from api_gateway.services_route import services_route
+from auth_service.role_permission_service.permission_matrix import ROLE_BITS, permission_matrix
+
+# Áp dụng bảng permission (dòng cố định và pattern '*' / '**') trước khi dispatch
+ENFORCE_PERMISSIONS = os.getenv("GATEWAY_ENFORCE_PERMISSIONS", "1") == "1"
 
 class gateway_service:
     def __init__(self, app):
         self.app = app
-        self.services_route = services_route()
+        # JWT xác thực một lần mỗi request, dùng chung cho bước kiểm tra permission và dispatch
+        self.request_auth = RequestAuth()
+        # Service tạo lười ở request đầu tiên cần đến (xem services/startup để biết thời gian khởi tạo)
+        self.services = build_services()
+        self.services_route = services_route(self.request_auth, self.services)
         self.service_list = ["admin", "auth", "classroom", "course", "game", "progress", "user", "feedback", "item"]
+        self.permissions = permission_matrix if ENFORCE_PERMISSIONS else None
         
         # Không register routes ở đây vì app.py đã handle
         
@@ -41,28 +55,11 @@ class gateway_service:
 
         # Check if the service requested is in the list of services
         if service_requested in self.service_list:
+            denied = self.enforce_permissions(service_requested, destination, method)
+            if denied is not None:
+                return denied
             try:
-                if service_requested == "admin":
-                    return self.services_route.handle_admin_service(destination, data, method)
-                elif service_requested == "auth":
-                    return self.services_route.authenticating_service(destination, data, method)
-                elif service_requested == "classroom":
-                    return self.services_route.classroom_service(destination, data, method)
-                elif service_requested == "course":
-                    return self.services_route.course_service(destination, data, method)
-                elif service_requested == "game":
-                    return self.services_route.handle_game_service(destination, data, method)
-                elif service_requested == "progress":
-                    return self.services_route.handle_progress_service(destination, data, method)
-                elif service_requested == "user":
-                    return self.services_route.handle_user_service(destination, data, method)
-                elif service_requested == "feedback":
-                    return self.services_route.handle_feedback_service(destination, data, method)
-                elif service_requested == "item":
-                    return self.services_route.handle_item_service(destination, data, method)
-                else:
-                    return jsonify({"error": "Service method not implemented"}), 501
-                    
+                return self.services_route.dispatch(service_requested, destination, data, method)
             except Exception as e:
                 return jsonify({"error": f"Internal server error: {str(e)}"}), 500
         else:
@@ -72,3 +69,25 @@ class gateway_service:
                 "requested": service_requested
             }), 404
 
+    def enforce_permissions(self, service, destination, method):
+        """
+        Kiểm tra request với bảng permission (trie theo segment, chi phí theo độ sâu path)
+
+        Endpoint không khớp rule nào thì cho qua (route tự kiểm tra JWT/role như cũ).
+
+        Returns:
+            None nếu được phép, ngược lại là response 401/403
+        """
+        if self.permissions is None:
+            return None
+        mask = self.permissions.resolve(service, destination, method)
+        if mask is None:
+            return None
+        try:
+            role = self.request_auth.authenticate().role
+        except Exception as e:
+            return jsonify({"error": f"Authentication required - {str(e)}"}), 401
+        bit = ROLE_BITS.get(role)
+        if bit is None or not mask & bit:
+            return jsonify({"error": f"Access denied - role '{role}' cannot {method} /{service}/{destination}"}), 403
+        return None
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from flask import jsonify
+
+from common.fork_safety import reinit_after_fork
+
+
+class Lifecycle:
+    """
+    Trạng thái phục vụ của một worker: readiness và graceful drain.
+
+      - /livez:  tiến trình còn sống (luôn 200)
+      - /readyz: 200 khi worker đã khởi động xong và chưa drain, ngược lại 503
+        (load balancer ngừng gửi request mới trước khi worker dừng)
+
+    Khi drain, /readyz trả 503 trước; server (serve.py) ngừng nhận kết nối mới
+    và chờ các request đang xử lý xong rồi mới thoát. Số request đang xử lý
+    được đếm ở before/teardown_request để theo dõi.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._ready = False
+        self._draining = False
+        self._ready_at = None
+        self._started = time.time()
+        self._checks: List[Callable[[], Any]] = []
+        reinit_after_fork(self)
+        if app is not None:
+            self.init_app(app)
+
+    def _after_fork(self):
+        # Worker mới: chưa sẵn sàng cho tới khi warm_up() của chính nó chạy xong
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._ready = False
+        self._draining = False
+        self._ready_at = None
+
+    def init_app(self, app) -> None:
+        app.before_request(self._request_started)
+        app.teardown_request(self._request_finished)
+        app.add_url_rule("/livez", "livez", lambda: (jsonify({"status": "alive"}), 200))
+        app.add_url_rule("/readyz", "readyz", self._readyz)
+        app.lifecycle = self
+
+    def _request_started(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def _request_finished(self, exc=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _readyz(self):
+        status = self.stats()
+        return jsonify(status), 200 if status["ready"] else 503
+
+    def add_check(self, check: Callable[[], Any]) -> None:
+        """Thêm bước khởi động chạy trong warm_up() (vd: tạo trước service, kiểm tra database)"""
+        self._checks.append(check)
+
+    def warm_up(self) -> None:
+        """
+        Chạy các bước khởi động rồi đánh dấu worker sẵn sàng
+
+        Raises:
+            Exception của bước khởi động lỗi (worker không được đánh dấu sẵn sàng)
+        """
+        for check in self._checks:
+            check()
+        self.mark_ready()
+
+    def mark_ready(self) -> None:
+        with self._lock:
+            self._ready = True
+            self._ready_at = time.time()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready and not self._draining
+
+    def begin_drain(self) -> None:
+        """Ngừng báo sẵn sàng (bước đầu của graceful drain); request vẫn được xử lý tiếp"""
+        with self._lock:
+            self._draining = True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "ready": self._ready and not self._draining,
+                "draining": self._draining,
+                # Request /readyz hiện tại cũng được đếm
+                "in_flight": self._in_flight,
+                "uptime_seconds": int(time.time() - self._started),
+                "startup_seconds": round(self._ready_at - self._started, 3) if self._ready_at else None
+            }
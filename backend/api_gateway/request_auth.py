@@ -0,0 +1,112 @@
+import os
+import time
+from typing import Any, Dict, Optional
+
+from flask import current_app, g, request
+from flask_jwt_extended import get_jwt, get_jwt_request_location, verify_jwt_in_request
+
+from common.lru_cache import LRUCache
+
+# Số token đã xác thực giữ trong bộ nhớ, và thời gian sống tối đa của một entry (giây).
+# Entry hết hạn theo exp của token (không quá JWT_CLAIMS_CACHE_TTL).
+JWT_CLAIMS_CACHE_SIZE = int(os.getenv("JWT_CLAIMS_CACHE_SIZE", "4096"))
+JWT_CLAIMS_CACHE_TTL = float(os.getenv("JWT_CLAIMS_CACHE_TTL", "600"))
+
+_CONTEXT_KEY = "_request_auth"
+
+
+class AuthContext:
+    """Danh tính của request hiện tại, xác thực một lần và giữ trong flask.g"""
+
+    __slots__ = ("user_id", "role", "claims")
+
+    def __init__(self, claims: Dict[str, Any], identity_claim: str = "sub"):
+        identity = claims.get(identity_claim)
+        self.user_id = str(identity) if identity else None
+        self.role = claims.get("role")
+        self.claims = claims
+
+
+class RequestAuth:
+    """
+    Xác thực JWT của request đúng một lần.
+
+    Kết quả (hoặc lỗi) được lưu trong flask.g, nên gateway và route gọi
+    authenticate() bao nhiêu lần cũng chỉ xác thực một lần. Token gửi qua header
+    đã xác thực được cache theo chữ ký (LRU, hết hạn cùng token), nên các request
+    sau của cùng client bỏ qua bước kiểm tra HMAC. Token gửi qua cookie luôn đi
+    qua flask_jwt_extended (cần kiểm tra CSRF).
+    """
+
+    def __init__(self, max_entries: int = JWT_CLAIMS_CACHE_SIZE, max_ttl: float = JWT_CLAIMS_CACHE_TTL):
+        self.max_ttl = max_ttl
+        self._cache = LRUCache(max_entries)
+
+    def authenticate(self) -> AuthContext:
+        """
+        AuthContext của request hiện tại
+
+        Raises:
+            Exception của flask_jwt_extended nếu không có token hoặc token không hợp lệ
+        """
+        result = g.get(_CONTEXT_KEY)
+        if result is None:
+            try:
+                result = AuthContext(self._verify(), current_app.config.get("JWT_IDENTITY_CLAIM", "sub"))
+            except Exception as e:
+                result = e
+            setattr(g, _CONTEXT_KEY, result)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _header_token(self) -> Optional[str]:
+        if "headers" not in current_app.config.get("JWT_TOKEN_LOCATION", ("headers",)):
+            return None
+        header = request.headers.get(current_app.config.get("JWT_HEADER_NAME", "Authorization"), "")
+        header_type = current_app.config.get("JWT_HEADER_TYPE", "Bearer")
+        parts = header.split()
+        if header_type:
+            return parts[1] if len(parts) == 2 and parts[0] == header_type else None
+        return parts[0] if len(parts) == 1 else None
+
+    def _verify(self) -> Dict[str, Any]:
+        token = self._header_token()
+        if token is not None:
+            signing_input, _, signature = token.rpartition(".")
+            cached = self._cache.get(signature)
+            # Cùng chữ ký nhưng header/payload khác thì không dùng entry cũ
+            if cached is not None and cached[0] == signing_input:
+                claims = cached[1]
+                if claims.get("exp") is None or claims["exp"] > time.time():
+                    return claims
+
+        verify_jwt_in_request()
+        claims = get_jwt()
+        if token is not None and get_jwt_request_location() == "headers":
+            ttl = self.max_ttl
+            if claims.get("exp") is not None:
+                ttl = min(ttl, claims["exp"] - time.time())
+            if ttl > 0:
+                signing_input, _, signature = token.rpartition(".")
+                self._cache.put(signature, (signing_input, claims), ttl_seconds=ttl)
+        return claims
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+def current_auth() -> Optional[AuthContext]:
+    """AuthContext đã xác thực của request hiện tại (None nếu chưa xác thực hoặc lỗi)"""
+    result = g.get(_CONTEXT_KEY)
+    return result if isinstance(result, AuthContext) else None
+
+
+def current_user_id() -> Optional[str]:
+    auth = current_auth()
+    return auth.user_id if auth else None
+
+
+def current_role() -> Optional[str]:
+    auth = current_auth()
+    return auth.role if auth else None
@@ -0,0 +1,80 @@
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+HTTP_METHODS = ("GET", "POST", "PUT", "DELETE", "PATCH")
+
+
+class Route:
+    """Một endpoint của gateway: (service, destination, method) -> handler"""
+
+    def __init__(self, service: str, destination: str, method: str, handler: Callable,
+                 jwt: bool = False, roles: Optional[Tuple[str, ...]] = None, requires: Optional[str] = None):
+        """
+        Args:
+            service: Tên service (phần đầu của path, vd: "user")
+            destination: Phần còn lại của path (vd: "stats-only")
+            method: HTTP method
+            handler: Hàm xử lý, nhận (data, user_id)
+            jwt: True nếu route cần JWT hợp lệ
+            roles: Các role được phép gọi route (ngầm định cần JWT)
+            requires: Tên thuộc tính controller trên services_route cần có để phục vụ route
+        """
+        self.service = service
+        self.destination = destination
+        self.method = method
+        self.handler = handler
+        self.roles = tuple(roles) if roles else None
+        self.jwt = jwt or self.roles is not None
+        self.requires = requires
+        self.name = f"{method} /{service}/{destination}"
+
+
+class RouteRegistry:
+    """Bảng route dựng một lần khi khởi động, tra cứu O(1) theo (service, destination, method)"""
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str, str], Route] = {}
+        self._by_service: Dict[str, List[Route]] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, service: str, destination: str, methods, handler: Callable, **options) -> None:
+        """Đăng ký handler cho một hoặc nhiều method"""
+        if isinstance(methods, str):
+            methods = (methods,)
+        for method in methods:
+            route = Route(service, destination, method, handler, **options)
+            self._routes[(service, destination, method)] = route
+            self._by_service.setdefault(service, []).append(route)
+
+    def lookup(self, service: str, destination: str, method: str) -> Optional[Route]:
+        return self._routes.get((service, destination, method))
+
+    def endpoints(self, service: str) -> List[str]:
+        """Danh sách endpoint của một service (dùng cho response 404)"""
+        return [route.name for route in self._by_service.get(service, [])]
+
+    def record(self, route: Route, elapsed_ms: float) -> None:
+        """Ghi lại thời gian xử lý của một route"""
+        with self._lock:
+            timing = self._timings.get(route.name)
+            if timing is None:
+                timing = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+                self._timings[route.name] = timing
+            timing["count"] += 1
+            timing["total_ms"] += elapsed_ms
+            if elapsed_ms > timing["max_ms"]:
+                timing["max_ms"] = elapsed_ms
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Thống kê thời gian dispatch theo từng route"""
+        with self._lock:
+            return {
+                name: {
+                    "count": int(timing["count"]),
+                    "avg_ms": round(timing["total_ms"] / timing["count"], 3),
+                    "max_ms": round(timing["max_ms"], 3),
+                    "total_ms": round(timing["total_ms"], 3)
+                }
+                for name, timing in self._timings.items()
+            }
@@ -0,0 +1,133 @@
+from flask import jsonify
+
+from auth_service.auth_service_controller import auth_service_controller
+from auth_service.login_and_register_service.auth_service_database_interface import auth_service_database_interface
+from auth_service.login_and_register_service.login_service import login_service
+from auth_service.login_and_register_service.signup_service import signup_service
+from auth_service.role_permission_service.permission_service import permission_service
+from common.service_container import ServiceContainer
+
+from game_service.game_service_controller import game_service_controller
+from progress_feedback.progress_service.progress_controller import ProgressController
+from progress_feedback.progress_service.feedback_controller import FeedbackController
+from admin_service.admin_controller import AdminController
+from user_profile_service.user.user_controller import UserController
+from user_profile_service.item.item_controller import ItemController
+from classroom_service.classroom_controller import ClassroomController
+from classroom_service.classroom_service import ClassroomService
+
+from progress_feedback.progress_service.progress_service import ProgressService
+from user_profile_service.user.user_service import UserProfileService
+from user_profile_service.item.item_service import ItemService
+from admin_service.admin_service import AdminService
+
+
+# Fallback khi service thật không khởi tạo được
+class MockProgressController:
+    def check_health(self):
+        return jsonify({"status": "healthy", "service": "progress"}), 200
+    def record_activity(self, data):
+        return jsonify({"error": "Progress service not implemented"}), 501
+    def get_user_progress(self, user_id):
+        return jsonify({"error": "Progress service not implemented"}), 501
+    def get_average_grade(self, user_id, difficulty):
+        return jsonify({"error": "Progress service not implemented"}), 501
+    def get_performance_by_difficulty(self, user_id):
+        return jsonify({"error": "Progress service not implemented"}), 501
+
+
+class MockFeedbackController:
+    def check_health(self):
+        return jsonify({"status": "healthy", "service": "feedback"}), 200
+    def generate_feedback(self, data):
+        return jsonify({"error": "Feedback service not implemented"}), 501
+    def get_user_feedback(self, user_id):
+        return jsonify({"error": "Feedback service not implemented"}), 501
+    def get_feedback_by_id(self, feedback_id):
+        return jsonify({"error": "Feedback service not implemented"}), 501
+
+
+class MockClassroomController:
+    def check_health(self):
+        return jsonify({"status": "healthy", "service": "classroom"}), 200
+    def create_class(self, data):
+        return jsonify({"error": "Classroom service not implemented"}), 501
+    def join_class(self, data):
+        return jsonify({"error": "Classroom service not implemented"}), 501
+    def get_students(self, class_id):
+        return jsonify({"error": "Classroom service not implemented"}), 501
+    def get_dashboard(self, class_id):
+        return jsonify({"error": "Classroom service not implemented"}), 501
+    def get_student_classes(self, student_id):
+        return jsonify({"error": "Classroom service not implemented"}), 501
+    def get_questions_by_criteria(self, class_id):
+        return jsonify({"error": "Classroom service not implemented"}), 501
+
+
+def _admin_service(c):
+    admin = AdminService(c.get("user_service"), c.get("signup_service"), c.get("permission_service"))
+    # Đăng ký services với admin
+    admin.register_service("user", c.get("user_service"))
+    admin.register_service("item", c.get("item_service"))
+    admin.register_service("admin", admin)
+    return admin
+
+
+def _progress_controller(c):
+    progress_service = c.get("progress_service")
+    return ProgressController(progress_service) if progress_service is not None else MockProgressController()
+
+
+def _feedback_controller(c):
+    progress_service = c.get("progress_service")
+    return FeedbackController(progress_service) if progress_service is not None else MockFeedbackController()
+
+
+def _classroom_controller(c):
+    classroom_service = c.get("classroom_service")
+    return ClassroomController(classroom_service) if classroom_service is not None else MockClassroomController()
+
+
+def _controller(controller_class, service_name):
+    """Factory của controller chỉ bọc một service; None nếu service không tạo được"""
+    def factory(c):
+        service = c.get(service_name)
+        return controller_class(service) if service is not None else None
+    return factory
+
+
+def build_services() -> ServiceContainer:
+    """
+    Đăng ký mọi service của gateway vào một container mới (chưa tạo service nào)
+
+    Returns:
+        ServiceContainer, mỗi service được tạo ở lần dùng đầu tiên
+    """
+    services = ServiceContainer()
+    register = services.register
+
+    # Auth: một database interface / permission_service / signup_service dùng chung
+    register("auth_db", lambda c: auth_service_database_interface())
+    register("permission_service", lambda c: permission_service())
+    register("login_service", lambda c: login_service(c.get("auth_db")))
+    register("signup_service", lambda c: signup_service(c.get("auth_db"), c.get("user_service")))
+    register("auth", lambda c: auth_service_controller(
+        c.get("login_service"), c.get("signup_service"), c.get("permission_service"), c.get("auth_db")))
+
+    # Core services
+    register("user_service", lambda c: UserProfileService())
+    register("item_service", lambda c: ItemService())
+    register("admin_service", _admin_service)
+    register("progress_service", lambda c: ProgressService(c.get("user_service"), c.get("admin_service")))
+    register("classroom_service", lambda c: ClassroomService(c.get("user_service")))
+    # Game service dùng chung user/classroom service, không tạo mới cho mỗi phòng
+    register("game_service", lambda c: game_service_controller(c.get("user_service"), c.get("classroom_service")))
+
+    # Controllers
+    register("user_controller", _controller(UserController, "user_service"))
+    register("item_controller", _controller(ItemController, "item_service"))
+    register("admin_controller", _controller(AdminController, "admin_service"))
+    register("progress_controller", _progress_controller)
+    register("feedback_controller", _feedback_controller)
+    register("classroom_controller", _classroom_controller)
+    return services
@@ -7,6 +7,8 @@ import dotenv
 
 # Import database interface trực tiếp
 from user_profile_service.database_interface import DatabaseInterface, UserProfileDatabaseInterface, ItemDatabaseInterface
+from api_gateway.lifecycle import Lifecycle
+from auth_service.role_permission_service.permission_matrix import permission_matrix
 
 # Load environment variables from .env file
 dotenv.load_dotenv()
@@ -21,8 +23,9 @@ def create_app(config_object=None):
     # Configure CORS
     CORS(app,supports_credentials=True)
     
-    # Simple configuration
-    app.config['DEBUG'] = True
+    # Debug chỉ bật khi được yêu cầu (FLASK_DEBUG=1 hoặc config_object), serve.py chạy với DEBUG tắt
+    if not app.config.get('DEBUG'):
+        app.config['DEBUG'] = os.getenv("FLASK_DEBUG", "0") == "1"
     
     # JWT Configurations
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(minutes=120)
@@ -35,34 +38,30 @@ def create_app(config_object=None):
     app.config['JWT_REFRESH_COOKIE_PATH'] = '/'
     jwt = JWTManager(app)
     
-    # Initialize database interfaces for dependency injection
-    try:
-        # Test database connections on startup
-        user_db = UserProfileDatabaseInterface()
-        item_db = ItemDatabaseInterface()
-        
-        # Store in app context for potential access
-        app.user_db = user_db
-        app.item_db = item_db
-        
-    except Exception as e:
-        # Continue without database - services will handle their own connections
-        pass
-    
     # Register API Gateway service
+    # Service và database interface được tạo lười ở request đầu tiên cần đến
     from api_gateway.gateway_service import gateway_service
     app.gateway_service = gateway_service(app)
+    app.services = app.gateway_service.services
+
+    # Readiness (/readyz, /livez) và graceful drain; warm_up() được gọi bởi serve.py trong từng worker
+    lifecycle = Lifecycle(app)
+    lifecycle.add_check(permission_matrix.refresh)   # mở database.db và chạy migration
+    if os.getenv("SERVICES_EAGER_INIT", "0") == "1":
+        # Tạo trước mọi service (đổi thời gian khởi động lấy latency request đầu tiên)
+        lifecycle.add_check(app.services.build_all)
     
     # Optional: Configure dependency injection if flask_injector is available
     try:
         from flask_injector import FlaskInjector
-        from injector import Binder, singleton
+        from injector import Binder, CallableProvider, singleton
         
         def configure_di(binder: Binder):
             """Configure dependency injection bindings"""
             try:
-                binder.bind(UserProfileDatabaseInterface, to=UserProfileDatabaseInterface(), scope=singleton)
-                binder.bind(ItemDatabaseInterface, to=ItemDatabaseInterface(), scope=singleton)
+                # Provider chỉ tạo database interface khi được inject lần đầu
+                binder.bind(UserProfileDatabaseInterface, to=CallableProvider(UserProfileDatabaseInterface), scope=singleton)
+                binder.bind(ItemDatabaseInterface, to=CallableProvider(ItemDatabaseInterface), scope=singleton)
             except Exception as e:
                 pass
         
@@ -86,7 +85,8 @@ def create_app(config_object=None):
     
     return app
 
-# Make the file directly runnable
+# Make the file directly runnable (development server; production: serve.py)
 if __name__ == '__main__':
     app = create_app()
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.lifecycle.warm_up()
+    app.run(debug=app.config['DEBUG'], host='0.0.0.0', port=5000)
\ No newline at end of file
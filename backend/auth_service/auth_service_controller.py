@@ -4,16 +4,21 @@ from auth_service.role_permission_service.permission_service import permission_s
 from auth_service.login_and_register_service.auth_service_database_interface import auth_service_database_interface
 
 class auth_service_controller:
-    def __init__(self):
-        self.login_service = login_service()
-        self.signup_service = signup_service()
-        self.permission_service = permission_service()
-        self.auth_service_database_interface = auth_service_database_interface()
+    def __init__(self, login=None, signup=None, permission=None, database_interface=None):
+        # Các service con có thể được truyền vào để dùng chung instance (service container)
+        self.auth_service_database_interface = database_interface or auth_service_database_interface()
+        self.login_service = login or login_service(self.auth_service_database_interface)
+        self.signup_service = signup or signup_service(self.auth_service_database_interface)
+        self.permission_service = permission or permission_service()
         pass
 
     def login(self, username, password):
         return self.login_service.login(username, password)
 
+    def authenticate(self, username, password):
+        """(user_id, role) nếu đăng nhập đúng, None nếu sai"""
+        return self.login_service.authenticate(username, password)
+
     def sign_up(self, username, password):
         return self.signup_service.sign_up(username, password)
 
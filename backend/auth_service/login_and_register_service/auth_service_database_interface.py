@@ -1,30 +1,23 @@
-import sqlite3
+from auth_service.login_and_register_service.password_hasher import PasswordHasherBusy, password_hasher
+from db.connection_pool import get_connection
+from db.migrations import migrate
 
 
 class auth_service_database_interface:
-    def __init__(self):
-        self.connection = sqlite3.connect('database.db')
-        self.cursor = self.connection.cursor()
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='auth_service'")
-        table_exists = self.cursor.fetchone() is not None
-        if not table_exists:
-            with open('auth_service/login_and_register_service/auth_service.sql', 'r') as file:
-                sql_script = file.read()
-                self.cursor.executescript(sql_script)
-                self.connection.commit()
-        self.cursor.close()
-        self.connection.close()
+    def __init__(self, hasher=None):
+        self.hasher = hasher or password_hasher
+        # Bảng auth_service được tạo bởi migration runner dùng chung cho database.db
+        migrate('database.db')
         print("Database initialized (db.auth_service_database_interface)")
         pass
 
     def get_user(self, username):
         if self.check_if_user_exist(username):
-            connection = sqlite3.connect('database.db')
-            cursor = connection.cursor()
-            cursor.execute("SELECT * FROM auth_service WHERE username = ?", (username,))
-            result = cursor.fetchone()
-            cursor.close()
-            connection.close()
+            with get_connection('database.db') as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT * FROM auth_service WHERE username = ?", (username,))
+                result = cursor.fetchone()
+                cursor.close()
             return result
         else:
             print("User not found (db.get_user)")
@@ -32,87 +25,114 @@ class auth_service_database_interface:
 
     def add_user(self, user_id , username, password,role):
         if not self.check_if_user_exist(username):
-            connection = sqlite3.connect('database.db')
-            cursor = connection.cursor()
-            cursor.execute("INSERT INTO auth_service (user_id,username, password,role) VALUES (?, ?,?,?)", (user_id, username, password,role))
-            cursor.close()
-            connection.commit()
-            connection.close()
+            password_hash = self.hasher.hash(password)
+            with get_connection('database.db') as connection:
+                cursor = connection.cursor()
+                cursor.execute("INSERT INTO auth_service (user_id,username, password,role) VALUES (?, ?,?,?)", (user_id, username, password_hash,role))
+                cursor.close()
+                connection.commit()
             return True
         else :
             print("User already exists (db.add_user)")
             return False
     def update_user(self, username, password,role):
         if self.login(username, password):
-            connection = sqlite3.connect('database.db')
-            cursor = connection.cursor()
-            cursor.execute("UPDATE auth_service SET password = ? AND role = ? WHERE username = ?", (password,role, username))
-            cursor.close()
-            connection.commit()
-            connection.close()
+            with get_connection('database.db') as connection:
+                cursor = connection.cursor()
+                cursor.execute("UPDATE auth_service SET password = ?, role = ? WHERE username = ?",
+                               (self.hasher.hash(password), role, username))
+                cursor.close()
+                connection.commit()
             return True
         else :
             print("User not found (db.update_user)")
 
     def delete_user(self, username):
         if self.check_if_user_exist(username):
-            connection = sqlite3.connect('database.db')
-            cursor = connection.cursor()
-            cursor.execute("DELETE FROM auth_service WHERE username = ?", (username,))
-            cursor.close()
-            connection.commit()
-            connection.close()
+            with get_connection('database.db') as connection:
+                cursor = connection.cursor()
+                cursor.execute("DELETE FROM auth_service WHERE username = ?", (username,))
+                cursor.close()
+                connection.commit()
             return True
         else:
             print("User not found (db.delete_user)")
             return False
 
     def check_if_user_exist(self, username):
-        connection = sqlite3.connect('database.db')
-        cursor = connection.cursor()
-        cursor.execute("SELECT user_id FROM auth_service WHERE username = ?", (username,))
-        result = cursor.fetchone()
-        cursor.close()
-        connection.close()
-        return result is not None
-
-    def login(self, username, password):
-        if self.check_if_user_exist(username):
-            connection = sqlite3.connect('database.db')
+        with get_connection('database.db') as connection:
             cursor = connection.cursor()
-            cursor.execute("SELECT * FROM auth_service WHERE username = ? AND password = ?", (username, password))
+            cursor.execute("SELECT user_id FROM auth_service WHERE username = ?", (username,))
             result = cursor.fetchone()
             cursor.close()
+        return result is not None
+
+    def login(self, username, password):
+        return self.authenticate(username, password) is not None
+
+    def authenticate(self, username, password):
+        """
+        Kiểm tra đăng nhập bằng một query (dùng unique index của username)
+
+        Mật khẩu được kiểm tra trên thread pool của password_hasher. Dòng cũ còn
+        lưu plaintext (hoặc hash với cost cũ) được hash lại ngay khi đăng nhập đúng.
+
+        Returns:
+            (user_id, role) nếu đúng username/password, None nếu sai
+        """
+        connection = get_connection('database.db')
+        try:
+            result = connection.execute(
+                "SELECT user_id, password, role FROM auth_service WHERE username = ?", (username,)
+            ).fetchone()
+        finally:
+            connection.close()
+        ok, needs_rehash = self.hasher.verify(password, result[1] if result else None)
+        if result is None:
+            print("User not found (db.authenticate)")
+            return None
+        if not ok:
+            print("Wrong password (db.authenticate)")
+            return None
+        user_id, stored_password, role = result
+        if needs_rehash:
+            try:
+                self._rehash_password(user_id, stored_password, password)
+            except PasswordHasherBusy:
+                print("Password rehash skipped, hasher busy (db.authenticate)")
+        return user_id, role
+
+    def _rehash_password(self, user_id, stored_password, password):
+        """Thay mật khẩu cũ bằng hash mới (chỉ khi cột password chưa bị đổi bởi request khác)"""
+        password_hash = self.hasher.hash(password)
+        connection = get_connection('database.db')
+        try:
+            connection.execute(
+                "UPDATE auth_service SET password = ? WHERE user_id = ? AND password = ?",
+                (password_hash, user_id, stored_password)
+            )
+            connection.commit()
+        finally:
             connection.close()
-            if result:
-                return True
-            else:
-                print("Wrong password (db.login)")
-                return False
-        else:
-            print("User not found (db.login)")
-            return False
 
     def get_id_from_username(self, username):
         if self.check_if_user_exist(username):
-            connection = sqlite3.connect('database.db')
-            cursor = connection.cursor()
-            cursor.execute("SELECT user_id FROM auth_service WHERE username = ?", (username,))
-            result = cursor.fetchone()
-            cursor.close()
-            connection.close()
+            with get_connection('database.db') as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT user_id FROM auth_service WHERE username = ?", (username,))
+                result = cursor.fetchone()
+                cursor.close()
             return result[0]
         else:
             print("User not found (db.get_id_from_username)")
             return None
 
     def get_role_from_id(self, user_id):
-        connection = sqlite3.connect('database.db')
-        cursor = connection.cursor()
-        cursor.execute("SELECT role FROM auth_service WHERE user_id = ?", (user_id,))
-        result = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        with get_connection('database.db') as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT role FROM auth_service WHERE user_id = ?", (user_id,))
+            result = cursor.fetchone()
+            cursor.close()
         if result:
             return result[0]
         else:
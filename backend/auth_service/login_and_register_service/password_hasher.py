@@ -0,0 +1,166 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from common.fork_safety import reinit_after_fork
+
+# Thuật toán và cost mặc định cho mật khẩu mới:
+#   pbkdf2_sha256: cost = số vòng lặp
+#   scrypt:        cost = log2(n), r=8, p=1 (bộ nhớ ~ 128 * r * 2**cost bytes)
+PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "pbkdf2_sha256")
+PASSWORD_HASH_COST = int(os.getenv("PASSWORD_HASH_COST", "100000" if PASSWORD_HASH_ALGORITHM == "pbkdf2_sha256" else "14"))
+# Số thread hash song song và số hash tối đa đang chờ/chạy; vượt quá thì từ chối ngay
+# thay vì để login chiếm hết CPU của các endpoint khác (độ trễ tối đa ~ QUEUE * thời gian hash / WORKERS)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+
+ALGORITHMS = ("pbkdf2_sha256", "scrypt")
+_SALT_BYTES = 16
+_SCRYPT_R, _SCRYPT_P = 8, 1
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Hàng đợi hash đã đầy (quá nhiều login cùng lúc)"""
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _derive(algorithm: str, password: str, salt: bytes, cost: int) -> bytes:
+    # hashlib nhả GIL trong lúc tính, nên chạy trên thread pool là đủ (không cần process)
+    if algorithm == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, cost)
+    if algorithm == "scrypt":
+        n = 1 << cost
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=_SCRYPT_R, p=_SCRYPT_P,
+                              maxmem=256 * _SCRYPT_R * n + 1024 * 1024, dklen=32)
+    raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+
+
+def is_hashed(stored: str) -> bool:
+    """Giá trị trong cột password đã là hash (không phải mật khẩu plaintext cũ)"""
+    return isinstance(stored, str) and stored.split("$", 1)[0] in ALGORITHMS
+
+
+class PasswordHasher:
+    """
+    Hash / kiểm tra mật khẩu trên một thread pool giới hạn.
+
+    Định dạng lưu: "<thuật toán>$<cost>$<salt>$<hash>" (salt và hash dạng base64).
+    Các dòng cũ còn lưu plaintext vẫn kiểm tra được và được báo là cần rehash.
+    """
+
+    def __init__(self, algorithm: str = PASSWORD_HASH_ALGORITHM, cost: int = PASSWORD_HASH_COST,
+                 workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_QUEUE):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.cost = cost
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid = None
+        self._pending = 0
+        self._dummy: Optional[str] = None
+        self.rejected = 0
+        reinit_after_fork(self)
+
+    def _after_fork(self):
+        # Thread của pool không tồn tại ở tiến trình con; pool mới được tạo ở lần hash đầu tiên
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Tạo lại pool sau khi fork (thread của tiến trình cha không tồn tại ở tiến trình con)
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix="password-hash")
+                    self._pending = 0
+                    self._pid = pid
+        return self._executor
+
+    def _run(self, fn, *args):
+        # Hàng đợi của executor là FIFO; chỉ giới hạn số hash đang chờ/chạy
+        executor = self._get_executor()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy("Too many concurrent password hashes")
+            self._pending += 1
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _encode(self, password: str) -> str:
+        salt = os.urandom(_SALT_BYTES)
+        digest = _derive(self.algorithm, password, salt, self.cost)
+        return f"{self.algorithm}${self.cost}${_b64(salt)}${_b64(digest)}"
+
+    def _check(self, password: str, stored: str) -> bool:
+        try:
+            algorithm, cost, salt, digest = stored.split("$")
+            expected = _unb64(digest)
+            actual = _derive(algorithm, password, _unb64(salt), int(cost))
+        except ValueError:
+            return False
+        return hmac.compare_digest(actual, expected)
+
+    def _get_dummy(self) -> str:
+        # Hash với thuật toán/cost hiện tại, dùng cho các lần kiểm tra giả
+        if self._dummy is None:
+            self._dummy = self.hash("dummy-password")
+        return self._dummy
+
+    def hash(self, password: str) -> str:
+        """Hash mật khẩu với thuật toán và cost hiện tại"""
+        return self._run(self._encode, str(password))
+
+    def needs_rehash(self, stored: str) -> bool:
+        """Hash được tạo bằng thuật toán/cost khác cấu hình hiện tại (hoặc còn là plaintext)"""
+        if not is_hashed(stored):
+            return True
+        parts = stored.split("$")
+        return len(parts) != 4 or parts[0] != self.algorithm or parts[1] != str(self.cost)
+
+    def verify(self, password: str, stored: Optional[str]) -> Tuple[bool, bool]:
+        """
+        Kiểm tra mật khẩu với giá trị đã lưu
+
+        Args:
+            password: Mật khẩu người dùng nhập
+            stored: Giá trị cột password (hash hoặc plaintext cũ); None nếu user không tồn tại
+
+        Returns:
+            (đúng mật khẩu, cần rehash)
+        """
+        password = str(password)
+        if stored is None or not is_hashed(stored):
+            # User không tồn tại hoặc mật khẩu plaintext cũ: vẫn tốn thời gian như một lần
+            # kiểm tra thật, để thời gian phản hồi không lộ username nào tồn tại
+            self._run(self._check, password, self._get_dummy())
+            if stored is None:
+                return False, False
+            ok = hmac.compare_digest(str(stored).encode(), password.encode())
+            return ok, ok
+        ok = self._run(self._check, password, stored)
+        return ok, ok and self.needs_rehash(stored)
+
+
+# Dùng chung trong tiến trình (auth_service_database_interface)
+password_hasher = PasswordHasher()
@@ -3,9 +3,9 @@ from user_profile_service.user.user_service import UserProfileService as user
 import uuid
 
 class signup_service:
-    def __init__(self):
-        self.auth_service_database_interface = auth_service_database_interface()
-        self.user = user()
+    def __init__(self, database_interface=None, user_service=None):
+        self.auth_service_database_interface = database_interface or auth_service_database_interface()
+        self.user = user_service or user()
 
     def sign_up(self, username, password):
         if not self.auth_service_database_interface.check_if_user_exist(username):
@@ -0,0 +1,83 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+STAR = "*"          # khớp đúng một segment
+GLOBSTAR = "**"     # khớp không hoặc nhiều segment
+
+
+def split_path(service: str, path: str) -> List[str]:
+    """Các segment của một endpoint: service rồi từng phần của path"""
+    return [service] + (path.strip("/").split("/") if path and path.strip("/") else [])
+
+
+def is_pattern(value: str) -> bool:
+    return STAR in (value or "")
+
+
+class _Node:
+    __slots__ = ("children", "star", "globstar", "value")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.star: Optional["_Node"] = None
+        self.globstar: Optional["_Node"] = None
+        self.value: Any = None
+
+
+class PathTrie:
+    """
+    Trie theo segment của path, hỗ trợ '*' (một segment) và '**' (không hoặc nhiều segment).
+
+    Chi phí tra cứu phụ thuộc độ sâu của path (mỗi segment một lần tra dict),
+    không phụ thuộc số rule. Khi nhiều pattern cùng khớp, pattern cụ thể hơn thắng:
+    so từ trái sang phải, segment cố định > '*' > '**'.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self.size = 0
+
+    def insert(self, segments: Sequence[str], value: Any) -> None:
+        """Thêm pattern; pattern đã có thì giữ giá trị cũ (dòng đầu tiên thắng)"""
+        node = self._root
+        for segment in segments:
+            if segment == GLOBSTAR:
+                if node.globstar is None:
+                    node.globstar = _Node()
+                node = node.globstar
+            elif segment == STAR:
+                if node.star is None:
+                    node.star = _Node()
+                node = node.star
+            else:
+                child = node.children.get(segment)
+                if child is None:
+                    child = node.children[segment] = _Node()
+                node = child
+        if node.value is None:
+            node.value = value
+            self.size += 1
+
+    def match(self, segments: Sequence[str]) -> Any:
+        """Giá trị của pattern cụ thể nhất khớp với segments, None nếu không có"""
+        return self._match(self._root, segments, 0)
+
+    def _match(self, node: _Node, segments: Sequence[str], i: int) -> Any:
+        if i == len(segments):
+            if node.value is not None:
+                return node.value
+        else:
+            child = node.children.get(segments[i])
+            if child is not None:
+                value = self._match(child, segments, i + 1)
+                if value is not None:
+                    return value
+            if node.star is not None:
+                value = self._match(node.star, segments, i + 1)
+                if value is not None:
+                    return value
+        if node.globstar is not None:
+            for j in range(i, len(segments) + 1):
+                value = self._match(node.globstar, segments, j)
+                if value is not None:
+                    return value
+        return None
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from auth_service.role_permission_service.path_trie import STAR, PathTrie, is_pattern, split_path
+from common.fork_safety import abandon, reinit_after_fork
+from db.connection_pool import open_connection
+from db.migrations import migrate
+
+# Bit của từng role trong mask
+ROLE_BITS = {"student": 1, "teacher": 2, "admin": 4}
+# Khoảng thời gian tối thiểu (giây) giữa hai lần kiểm tra thay đổi từ tiến trình khác
+PERMISSION_POLL_INTERVAL = float(os.getenv("PERMISSION_POLL_INTERVAL", "1"))
+
+PermissionKey = Tuple[str, str, str]
+
+
+class PermissionMatrix:
+    """
+    Bảng permission được biên dịch vào bộ nhớ: (service, path, method) -> bitmask role.
+
+    Mọi dòng nằm trong dict theo key; dòng có '*' / '**' (ở service, path hoặc method)
+    còn được đưa vào PathTrie theo method, nên tra cứu request không phụ thuộc số rule.
+    Matrix được dựng lại toàn bộ rồi thay một lần
+    (reader thấy bản cũ hoặc bản mới, không thấy bản dở dang):
+      - ngay sau khi tiến trình này commit thay đổi (reload)
+      - khi tiến trình khác ghi: PRAGMA data_version trên kết nối riêng thay đổi
+        (không đọc đĩa) và bộ đếm permission_version (tăng bởi trigger) khác
+        version đang giữ; kiểm tra tối đa mỗi poll_interval giây
+    """
+
+    def __init__(self, db_path: str = 'database.db', poll_interval: float = PERMISSION_POLL_INTERVAL):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        # (mask theo key của mọi dòng, trie pattern theo method) - thay cùng lúc
+        self._compiled: Tuple[Dict[PermissionKey, int], Dict[str, PathTrie]] = ({}, {})
+        self._version = None
+        self._data_version = None
+        self._checked_at = 0.0
+        self._loaded = False
+        self.reloads = 0
+        reinit_after_fork(self)
+
+    def _after_fork(self):
+        # Kết nối của tiến trình cha bị bỏ lại (không đóng), matrix đã nạp vẫn dùng được
+        self._lock = threading.Lock()
+        abandon(self._connection)
+        self._connection = None
+        self._pid = None
+        self._data_version = None
+
+    def _get_connection(self):
+        # Kết nối riêng của tiến trình: data_version chỉ so sánh được trên cùng một kết nối,
+        # và tiến trình con sau fork không dùng lại kết nối của tiến trình cha
+        pid = os.getpid()
+        if self._connection is None or self._pid != pid:
+            self._connection = open_connection(self.db_path)
+            self._pid = pid
+            self._data_version = None
+        return self._connection
+
+    def _rebuild(self, connection) -> None:
+        """Đọc version và toàn bộ bảng trong một transaction đọc, rồi thay matrix"""
+        data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+        connection.execute("BEGIN")
+        try:
+            version = connection.execute("SELECT version FROM permission_version WHERE id = 1").fetchone()
+            rows = connection.execute(
+                "SELECT service, path, method, student, teacher, admin FROM permission ORDER BY rowid"
+            ).fetchall()
+        finally:
+            connection.rollback()
+
+        masks, patterns = {}, {}
+        for service, path, method, student, teacher, admin in rows:
+            key = (service, path, method)
+            # Dòng trùng: giữ dòng đầu tiên như check_permission cũ (fetchone)
+            if key in masks:
+                continue
+            mask = ((ROLE_BITS["student"] if student else 0)
+                    | (ROLE_BITS["teacher"] if teacher else 0)
+                    | (ROLE_BITS["admin"] if admin else 0))
+            masks[key] = mask
+            if is_pattern(service) or is_pattern(path) or is_pattern(method):
+                trie = patterns.get(method)
+                if trie is None:
+                    trie = patterns[method] = PathTrie()
+                trie.insert(split_path(service, path), mask)
+        self._compiled = (masks, patterns)
+        self._version = version[0] if version else None
+        self._data_version = data_version
+        self.reloads += 1
+
+    def reload(self) -> None:
+        """Dựng lại matrix ngay (gọi sau khi commit thay đổi bảng permission)"""
+        with self._lock:
+            if not self._loaded:
+                migrate(self.db_path)
+            self._rebuild(self._get_connection())
+            self._loaded = True
+            self._checked_at = time.monotonic()
+
+    def refresh(self) -> None:
+        """Nạp matrix nếu chưa có, hoặc dựng lại nếu tiến trình khác đã ghi bảng permission"""
+        if self._loaded and time.monotonic() - self._checked_at < self.poll_interval:
+            return
+        with self._lock:
+            if self._loaded and time.monotonic() - self._checked_at < self.poll_interval:
+                return
+            if not self._loaded:
+                migrate(self.db_path)
+            connection = self._get_connection()
+            if not self._loaded:
+                self._rebuild(connection)
+                self._loaded = True
+            else:
+                data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+                if data_version != self._data_version:
+                    # database.db còn chứa bảng khác; chỉ dựng lại khi bảng permission đổi
+                    version = connection.execute(
+                        "SELECT version FROM permission_version WHERE id = 1"
+                    ).fetchone()
+                    if (version[0] if version else None) != self._version:
+                        self._rebuild(connection)
+                    else:
+                        self._data_version = data_version
+            self._checked_at = time.monotonic()
+
+    def mask(self, service: str, path: str, method: str) -> Optional[int]:
+        """Bitmask của đúng dòng (service, path, method), None nếu không có dòng đó"""
+        self.refresh()
+        return self._compiled[0].get((service, path, method))
+
+    def resolve(self, service: str, path: str, method: str) -> Optional[int]:
+        """
+        Bitmask áp dụng cho một request: dòng cố định trước, sau đó pattern cụ thể nhất
+        của method rồi của method '*'. None nếu không rule nào khớp.
+        """
+        self.refresh()
+        masks, patterns = self._compiled
+        mask = masks.get((service, path, method))
+        if mask is not None or not patterns:
+            return mask
+        segments = split_path(service, path)
+        for key in (method, STAR):
+            trie = patterns.get(key)
+            if trie is not None:
+                mask = trie.match(segments)
+                if mask is not None:
+                    return mask
+        return None
+
+    def allows(self, role: str, service: str, path: str, method: str) -> bool:
+        bit = ROLE_BITS.get(role)
+        mask = self.mask(service, path, method)
+        return bit is not None and mask is not None and bool(mask & bit)
+
+    def role_permissions(self, role: str) -> List[PermissionKey]:
+        """Các rule (cố định và pattern) cho phép role"""
+        self.refresh()
+        bit = ROLE_BITS.get(role)
+        if bit is None:
+            return []
+        return [key for key, mask in self._compiled[0].items() if mask & bit]
+
+    def stats(self) -> Dict[str, Any]:
+        masks, patterns = self._compiled
+        return {
+            "entries": len(masks),
+            "patterns": sum(trie.size for trie in patterns.values()),
+            "version": self._version,
+            "reloads": self.reloads,
+            "poll_interval": self.poll_interval
+        }
+
+
+# Dùng chung cho mọi permission_service trong tiến trình (auth, admin)
+permission_matrix = PermissionMatrix()
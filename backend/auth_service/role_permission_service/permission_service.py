@@ -1,31 +1,22 @@
-import sqlite3
+from auth_service.role_permission_service.permission_matrix import ROLE_BITS, permission_matrix
+from db.connection_pool import get_connection
+from db.migrations import migrate
 class permission_service:
-    def __init__(self):
-        self.connection = sqlite3.connect('database.db')
-        self.cursor = self.connection.cursor()
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='permission'")
-        table_exists = self.cursor.fetchone() is not None
-        if not table_exists:
-            with open('auth_service/role_permission_service/permission_service.sql', 'r') as file:
-                sql_script = file.read()
-                self.cursor.executescript(sql_script)
-                self.connection.commit()
-        self.cursor.close()
-        self.connection.close()
+    def __init__(self, matrix=None):
+        # Bảng permission được tạo bởi migration runner dùng chung cho database.db
+        migrate('database.db')
+        # Kiểm tra quyền đọc từ matrix trong bộ nhớ, không query mỗi lần gọi
+        self.matrix = matrix or permission_matrix
+        self.matrix.refresh()
         print("Database initialized (db.permission_service)")
         pass
 
     def check_permission(self, role, path,service, method):
-        connection = sqlite3.connect('database.db')
-        cursor = connection.cursor()
-        cursor.execute("SELECT student, teacher,admin FROM permission WHERE  service = ? AND path = ? AND method = ?", (service,path,method))
-        result = cursor.fetchone()
-        cursor.close()
-        connection.close()
-        if result:
-            role_index = {'student': 0, 'teacher': 1, 'admin': 2}
-            index = role_index.get(role.lower())
-            if index is not None and result[index]:
+        # Dòng cố định hoặc pattern '*' / '**' cụ thể nhất khớp với endpoint
+        mask = self.matrix.resolve(service, path, method)
+        if mask is not None:
+            bit = ROLE_BITS.get(role.lower())
+            if bit is not None and mask & bit:
                 return True
             else:
                 print("Permission denied (db.check_permission)")
@@ -35,60 +26,35 @@ class permission_service:
             return False
 
     def permission_exists(self, role, service, path, method):
-        connection = sqlite3.connect('database.db')
-        cursor = connection.cursor()
-
-        if role == 'student':
-            cursor.execute(
-                "SELECT COUNT(*) FROM permission WHERE service = ? AND path = ? AND method = ? AND student = 1",
-                (service, path, method))
-        elif role == 'teacher':
-            cursor.execute(
-                "SELECT COUNT(*) FROM permission WHERE service = ? AND path = ? AND method = ? AND teacher = 1",
-                (service, path, method))
-        elif role == 'admin':
-            cursor.execute(
-                "SELECT COUNT(*) FROM permission WHERE service = ? AND path = ? AND method = ? AND admin = 1",
-                (service, path, method))
-        else:
-            cursor.close()
-            connection.close()
-            return False
-
-        result = cursor.fetchone()[0] > 0
-        cursor.close()
-        connection.close()
-        if result:
-            return True
-        else: return False
+        return self.matrix.allows(role, service, path, method)
 
     def add_permission(self, roles, path, service, method):
         if not isinstance(roles, list):
             roles = [roles]
 
-        connection = sqlite3.connect('database.db')
-        cursor = connection.cursor()
+        with get_connection('database.db') as connection:
+            cursor = connection.cursor()
 
-        cursor.execute("SELECT COUNT(*) FROM permission WHERE service = ? AND path = ? AND method = ?",
-                       (service, path, method))
-        exists = cursor.fetchone()[0] > 0
+            cursor.execute("SELECT COUNT(*) FROM permission WHERE service = ? AND path = ? AND method = ?",
+                           (service, path, method))
+            exists = cursor.fetchone()[0] > 0
 
-        student_val = 1 if 'student' in roles else 0
-        teacher_val = 1 if 'teacher' in roles else 0
-        admin_val = 1 if 'admin' in roles else 0
+            student_val = 1 if 'student' in roles else 0
+            teacher_val = 1 if 'teacher' in roles else 0
+            admin_val = 1 if 'admin' in roles else 0
 
-        if exists:
-            cursor.execute(
-                "UPDATE permission SET student = ?, teacher = ?, admin = ? WHERE service = ? AND path = ? AND method = ?",
-                (student_val, teacher_val, admin_val, service, path, method))
-        else:
-            cursor.execute(
-                "INSERT INTO permission (service,path,method,student,teacher,admin) VALUES (?, ?, ?, ?,?,?)",
-                (service, path, method, student_val, teacher_val, admin_val))
+            if exists:
+                cursor.execute(
+                    "UPDATE permission SET student = ?, teacher = ?, admin = ? WHERE service = ? AND path = ? AND method = ?",
+                    (student_val, teacher_val, admin_val, service, path, method))
+            else:
+                cursor.execute(
+                    "INSERT INTO permission (service,path,method,student,teacher,admin) VALUES (?, ?, ?, ?,?,?)",
+                    (service, path, method, student_val, teacher_val, admin_val))
 
-        cursor.close()
-        connection.commit()
-        connection.close()
+            cursor.close()
+            connection.commit()
+        self.matrix.reload()
         print(f"Permission added for roles {roles} (db.add_permission)")
         return True
 
@@ -96,38 +62,37 @@ class permission_service:
         if not isinstance(roles, list):
             roles = [roles]
 
-        connection = sqlite3.connect('database.db')
-        cursor = connection.cursor()
+        with get_connection('database.db') as connection:
+            cursor = connection.cursor()
 
-        cursor.execute("SELECT student, teacher, admin FROM permission WHERE service = ? AND path = ? AND method = ?",
-                       (service, path, method))
-        existing = cursor.fetchone()
+            cursor.execute("SELECT student, teacher, admin FROM permission WHERE service = ? AND path = ? AND method = ?",
+                           (service, path, method))
+            existing = cursor.fetchone()
 
-        if not existing:
-            cursor.close()
-            connection.close()
-            print(f"Path {service}/{path} with method {method} does not exist")
-            return False
+            if not existing:
+                cursor.close()
+                print(f"Path {service}/{path} with method {method} does not exist")
+                return False
 
-        current_student, current_teacher, current_admin = existing
+            current_student, current_teacher, current_admin = existing
 
-        student_val = 1 if 'student' in roles or current_student == 1 else 0
-        teacher_val = 1 if 'teacher' in roles or current_teacher == 1 else 0
-        admin_val = 1 if 'admin' in roles or current_admin == 1 else 0
+            student_val = 1 if 'student' in roles or current_student == 1 else 0
+            teacher_val = 1 if 'teacher' in roles or current_teacher == 1 else 0
+            admin_val = 1 if 'admin' in roles or current_admin == 1 else 0
 
-        cursor.execute(
-            "UPDATE permission SET student = ?, teacher = ?, admin = ? WHERE service = ? AND path = ? AND method = ?",
-            (student_val, teacher_val, admin_val, service, path, method))
+            cursor.execute(
+                "UPDATE permission SET student = ?, teacher = ?, admin = ? WHERE service = ? AND path = ? AND method = ?",
+                (student_val, teacher_val, admin_val, service, path, method))
 
-        cursor.close()
-        connection.commit()
-        connection.close()
+            cursor.close()
+            connection.commit()
+        self.matrix.reload()
         print(f"Permission added for roles {roles} to existing path {service}/{path} (method: {method})")
         return True
 
     def list_permissions(self, role=None, service=None):
         """List permissions với filters"""
-        connection = sqlite3.connect('database.db')
+        connection = get_connection('database.db')
         cursor = connection.cursor()
         try:
             if role and service:
@@ -212,7 +177,7 @@ class permission_service:
 
     def delete_permission(self, role, path, service, method):
         """Xóa permission cho một role cụ thể"""
-        connection = sqlite3.connect('database.db')
+        connection = get_connection('database.db')
         cursor = connection.cursor()
         try:
             # Lấy permission hiện tại
@@ -251,6 +216,7 @@ class permission_service:
                     (new_student, new_teacher, new_admin, service, path, method))
             
             connection.commit()
+            self.matrix.reload()
             return {"success": True, "message": f"Permission removed for {role}"}
             
         except Exception as e:
@@ -262,31 +228,18 @@ class permission_service:
 
     def get_role_permissions(self, role):
         """Get all permissions cho một role"""
-        connection = sqlite3.connect('database.db')
-        cursor = connection.cursor()
+        if role not in ROLE_BITS:
+            return {"success": False, "error": "Invalid role"}
         try:
-            if role == 'student':
-                cursor.execute("SELECT service, path, method FROM permission WHERE student = 1")
-            elif role == 'teacher':
-                cursor.execute("SELECT service, path, method FROM permission WHERE teacher = 1")
-            elif role == 'admin':
-                cursor.execute("SELECT service, path, method FROM permission WHERE admin = 1")
-            else:
-                return {"success": False, "error": "Invalid role"}
-            
-            rows = cursor.fetchall()
             permissions = []
-            for row in rows:
+            for service, path, method in self.matrix.role_permissions(role):
                 permissions.append({
-                    "service": row[0],
-                    "path": row[1],
-                    "method": row[2]
+                    "service": service,
+                    "path": path,
+                    "method": method
                 })
-            
+
             return {"success": True, "permissions": permissions}
-            
+
         except Exception as e:
             return {"success": False, "error": str(e)}
-        finally:
-            cursor.close()
-            connection.close()
\ No newline at end of file
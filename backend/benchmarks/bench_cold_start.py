@@ -0,0 +1,120 @@
+"""
+Benchmark: cold start của backend (tiến trình mới mỗi lần đo).
+
+Mỗi lần chạy một tiến trình con trong thư mục tạm (database.db / userprofile.db
+riêng) và đo:
+  - import:  import app (Flask + module của các service)
+  - create:  create_app() (dựng gateway; service được tạo lười)
+  - first:   request đầu tiên (POST /admin/services: tạo admin service cùng
+             user/item/signup/permission service mà nó dùng)
+  - ready:   tạo nốt mọi service còn lại (container.build_all) nếu tree có container
+
+Hai trường hợp: "fresh" (database chưa tồn tại, phải tạo schema) và "warm"
+(database đã có từ lần chạy trước). Kết quả là median của --runs lần; tổng
+import + create + first được so với COLD_START_TARGET_MS.
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_cold_start.py --runs 5
+So sánh với một tree khác (vd: git worktree của commit trước):
+    python benchmarks/bench_cold_start.py --backend /tmp/old/backend
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Mục tiêu cold start: từ lúc bắt đầu import tới khi trả xong request đầu tiên
+COLD_START_TARGET_MS = float(os.getenv("COLD_START_TARGET_MS", "300"))
+
+_CHILD = r"""
+import contextlib, io, json, sys, time
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    from app import create_app
+    imported = time.perf_counter()
+    app = create_app()
+    created = time.perf_counter()
+    response = app.test_client().post("/admin/services", json={})
+    first = time.perf_counter()
+    services = getattr(app, "services", None)
+    if services is not None:
+        services.build_all()
+    ready = time.perf_counter()
+result = {
+    "import": (imported - started) * 1000,
+    "create": (created - imported) * 1000,
+    "first": (first - created) * 1000,
+    "ready": (ready - first) * 1000,
+    "status": response.status_code,
+    "init_ms": services.init_times() if services is not None else {},
+}
+sys.stderr.write(json.dumps(result) + "\n")
+"""
+
+
+def run_child(backend, workdir):
+    env = dict(os.environ, PYTHONPATH=backend, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run([sys.executable, "-c", _CHILD], cwd=workdir, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    for line in reversed(proc.stderr.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"child failed:\n{proc.stderr}")
+
+
+def measure(backend, runs, fresh):
+    results = []
+    warm_dir = None if fresh else tempfile.mkdtemp()
+    try:
+        if warm_dir:
+            run_child(backend, warm_dir)   # tạo database trước
+        for _ in range(runs):
+            if fresh:
+                workdir = tempfile.mkdtemp()
+                try:
+                    results.append(run_child(backend, workdir))
+                finally:
+                    shutil.rmtree(workdir, ignore_errors=True)
+            else:
+                results.append(run_child(backend, warm_dir))
+    finally:
+        if warm_dir:
+            shutil.rmtree(warm_dir, ignore_errors=True)
+    return results
+
+
+def report(label, results):
+    median = {key: statistics.median(r[key] for r in results) for key in ("import", "create", "first", "ready")}
+    total = median["import"] + median["create"] + median["first"]
+    verdict = "OK" if total <= COLD_START_TARGET_MS else "MISS"
+    print(f"  {label:5s}  import {median['import']:6.1f}ms  create {median['create']:6.1f}ms  "
+          f"first request {median['first']:6.1f}ms  (status {results[0]['status']})  "
+          f"-> {total:6.1f}ms [{verdict} target {COLD_START_TARGET_MS:.0f}ms]  "
+          f"remaining services {median['ready']:6.1f}ms")
+    return results[-1]["init_ms"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend cold start (import, create_app, first request)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backend", default=BACKEND, help="Thư mục backend cần đo")
+    args = parser.parse_args()
+    backend = os.path.abspath(args.backend)
+
+    print(f"backend: {backend}, runs: {args.runs}")
+    init_ms = report("fresh", measure(backend, args.runs, fresh=True))
+    report("warm", measure(backend, args.runs, fresh=False))
+    if init_ms:
+        print("per-service init (fresh database, ms):")
+        for name, ms in sorted(init_ms.items(), key=lambda item: -item[1]):
+            print(f"  {name:20s} {ms:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: số phòng game tạo được mỗi giây.
+
+So sánh hai cách:
+  - before: mỗi phòng tự tạo UserProfileService, ClassroomService và
+    game_resource_interface như code cũ (gameroom/game_logic_handler).
+  - after:  các service được tạo một lần và dùng chung cho mọi phòng.
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_game_rooms.py --rooms 300
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Flask
+
+from classroom_service.classroom_service import ClassroomService
+from game_service.gameroom.gameroom_service import game_service
+from game_service.question.game_resource_interface import game_resource_interface
+from user_profile_service.user.user_service import UserProfileService
+
+
+def legacy_create_room(service, student_id):
+    """Tạo phòng với chi phí khởi tạo service như trước khi chia sẻ singleton"""
+    UserProfileService()                 # gameroom.__init__
+    ClassroomService()                   # game_logic_handler.__init__
+    game_resource_interface()            # game_logic_handler -> game_resource_interface
+    return service.create_game_room(student_id, "easy", "bench")
+
+
+def shared_create_room(service, student_id):
+    return service.create_game_room(student_id, "easy", "bench")
+
+
+def run(create, service, student_id, rooms):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(rooms):
+            create(service, student_id)
+    elapsed = time.perf_counter() - started
+    return rooms / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Game room creation throughput")
+    parser.add_argument("--rooms", type=int, default=300, help="Số phòng tạo cho mỗi lần đo")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    with app.app_context(), contextlib.redirect_stdout(io.StringIO()):
+        user_service = UserProfileService()
+        student_id = f"bench-{uuid.uuid4()}"
+        user_service.add_user_id_only(student_id, "student")
+        service = game_service(user_service)
+
+    try:
+        with app.app_context():
+            # Làm nóng (mở kết nối pool, nạp module)
+            run(shared_create_room, service, student_id, 10)
+            before, before_s = run(legacy_create_room, service, student_id, args.rooms)
+            after, after_s = run(shared_create_room, service, student_id, args.rooms)
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            user_service.delete_user(student_id)
+
+    print(f"rooms per run: {args.rooms}")
+    print(f"before (per-room services): {before:10.1f} rooms/s  ({before_s:.2f}s)")
+    print(f"after  (shared services):   {after:10.1f} rooms/s  ({after_s:.2f}s)")
+    print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: xác thực JWT cho một request đã được gateway xử lý.
+
+  - before:  verify_jwt_in_request ở dispatch rồi lại ở @jwt_required của
+             ClassroomController (2 lần giải mã + kiểm tra HMAC mỗi request)
+  - once:    RequestAuth không cache, xác thực một lần mỗi request
+  - cached:  RequestAuth với LRU chữ ký -> claims
+
+Mỗi "request" là một test_request_context với header Authorization của một
+trong --clients token (xoay vòng), nên đo được cả tỉ lệ hit của LRU.
+Cuối cùng đo end-to-end qua Flask test client trên POST /classroom/student/classes.
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_jwt_verify.py --clients 100 --requests 20000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, verify_jwt_in_request
+
+from api_gateway.request_auth import RequestAuth
+from app import create_app
+
+
+def legacy_verify():
+    """Đường cũ: dispatch kiểm tra JWT, rồi decorator @jwt_required kiểm tra lại"""
+    verify_jwt_in_request()
+    user_id = str(get_jwt_identity())
+    role = get_jwt().get("role")
+    verify_jwt_in_request()
+    return user_id, role, get_jwt_identity()
+
+
+def run(app, headers, requests, verify):
+    started = time.perf_counter()
+    for i in range(requests):
+        with app.test_request_context("/classroom/student/classes", method="POST",
+                                      headers=headers[i % len(headers)]):
+            verify()
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JWT verification per request")
+    parser.add_argument("--clients", type=int, default=100, help="Số token khác nhau (client)")
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app()
+    with app.app_context():
+        headers = [{"Authorization": "Bearer " + create_access_token(identity=str(uuid.uuid4()),
+                                                                      additional_claims={"role": "student"})}
+                   for _ in range(args.clients)]
+
+    once = RequestAuth(max_entries=0)
+    cached = RequestAuth()
+    print(f"clients: {args.clients}, requests: {args.requests}")
+    before = run(app, headers, args.requests, legacy_verify)
+    print(f"  before (verify in dispatch + @jwt_required): {before:9.0f} req/s")
+    after_once = run(app, headers, args.requests, once.authenticate)
+    print(f"  once   (RequestAuth, no cache):              {after_once:9.0f} req/s  ({after_once / before:.2f}x)")
+    after_cached = run(app, headers, args.requests, cached.authenticate)
+    stats = cached.stats()
+    print(f"  cached (RequestAuth + claims LRU):            {after_cached:9.0f} req/s  ({after_cached / before:.2f}x)"
+          f"  hit rate {stats['hit_rate']:.3f}")
+
+    client = app.test_client()
+    requests = min(args.requests, 2000)
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for i in range(requests):
+            client.post("/classroom/student/classes", headers=headers[i % len(headers)], json={})
+        elapsed = time.perf_counter() - started
+    print(f"end-to-end POST /classroom/student/classes: {requests / elapsed:.0f} req/s, "
+          f"jwt cache {app.gateway_service.request_auth.stats()}")
+
+
+if __name__ == "__main__":
+    main()
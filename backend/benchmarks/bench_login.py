@@ -0,0 +1,183 @@
+"""
+Benchmark: throughput và độ trễ login với các cost hash mật khẩu khác nhau.
+
+Mỗi cấu hình tạo các user với hash tương ứng, rồi nhiều client song song gọi
+auth_service_database_interface.authenticate. Trong lúc đó một thread "game"
+chạy một thao tác ngắn mỗi 5ms để xem login có làm chậm các endpoint khác không.
+
+  - plaintext: so sánh mật khẩu trong SQL như code cũ (mốc so sánh)
+  - <thuật toán>:<cost>: PasswordHasher trên thread pool giới hạn
+
+Cuối cùng kiểm tra rehash khi login: các dòng plaintext cũ được hash lại sau
+lần đăng nhập đúng đầu tiên.
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_login.py --costs pbkdf2_sha256:10000 pbkdf2_sha256:100000 scrypt:14
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from auth_service.login_and_register_service.auth_service_database_interface import auth_service_database_interface
+from auth_service.login_and_register_service.password_hasher import PasswordHasher, PasswordHasherBusy, is_hashed
+from db.connection_pool import get_connection
+
+PASSWORD = "correct horse battery"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def legacy_authenticate(username, password):
+    """Đường cũ: mật khẩu plaintext so sánh trong SQL"""
+    connection = get_connection('database.db')
+    try:
+        return connection.execute(
+            "SELECT user_id, role FROM auth_service WHERE username = ? AND password = ?", (username, password)
+        ).fetchone()
+    finally:
+        connection.close()
+
+
+def insert_users(usernames, stored_password):
+    connection = get_connection('database.db')
+    connection.executemany(
+        "INSERT INTO auth_service (user_id, username, password, role) VALUES (?, ?, ?, 'student')",
+        [(str(uuid.uuid4()), username, stored_password) for username in usernames]
+    )
+    connection.commit()
+    connection.close()
+
+
+def delete_users(usernames):
+    connection = get_connection('database.db')
+    connection.executemany("DELETE FROM auth_service WHERE username = ?", [(u,) for u in usernames])
+    connection.commit()
+    connection.close()
+
+
+class GameProbe(threading.Thread):
+    """Đo độ trễ của một thao tác ngắn (dựng và serialize một câu hỏi) trong lúc login chạy"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.latencies = []
+        self._done = threading.Event()
+
+    def run(self):
+        question = {"id": "q1", "question": "pick one", "choices": ["a", "b", "c", "d"], "type": "single_choice"}
+        while not self._done.is_set():
+            started = time.perf_counter()
+            for _ in range(50):
+                json.loads(json.dumps(question))
+            self.latencies.append(time.perf_counter() - started)
+            self._done.wait(0.005)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def run_logins(authenticate, usernames, logins, clients):
+    latencies = []
+
+    def login(i):
+        started = time.perf_counter()
+        try:
+            result = authenticate(usernames[i % len(usernames)], PASSWORD)
+        except PasswordHasherBusy:
+            return 0   # 503, không tính vào độ trễ
+        latencies.append(time.perf_counter() - started)
+        return result is not None
+
+    probe = GameProbe()
+    probe.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        ok = sum(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    probe.stop()
+    return ok, logins / elapsed, latencies, probe.latencies
+
+
+def report(label, ok, logins, rate, latencies, probe):
+    print(f"{label:<28} {rate:9.1f} logins/s  p50 {statistics.median(latencies) * 1000:7.1f}ms"
+          f"  p99 {percentile(latencies, 99) * 1000:7.1f}ms  game p99 {percentile(probe, 99) * 1000:6.2f}ms"
+          f"  ok {ok}/{logins}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput / latency per password hash cost")
+    parser.add_argument("--costs", nargs="+", default=["pbkdf2_sha256:10000", "pbkdf2_sha256:100000",
+                                                       "pbkdf2_sha256:310000", "scrypt:14"],
+                        help="Các cấu hình <thuật toán>:<cost>")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=100, help="Số login cho mỗi cấu hình")
+    parser.add_argument("--clients", type=int, default=16, help="Số client login song song")
+    parser.add_argument("--workers", type=int, default=None, help="Số thread hash (mặc định: PASSWORD_HASH_WORKERS)")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        auth_service_database_interface()   # chạy migration
+
+    print(f"users: {args.users}, logins per config: {args.logins}, clients: {args.clients}, cpus: {os.cpu_count()}")
+
+    usernames = [f"bench-{uuid.uuid4().hex[:12]}" for _ in range(args.users)]
+    insert_users(usernames, PASSWORD)
+    try:
+        ok, rate, latencies, probe = run_logins(legacy_authenticate, usernames, args.logins, args.clients)
+        report("plaintext (SQL compare)", ok, args.logins, rate, latencies, probe)
+    finally:
+        delete_users(usernames)
+
+    for config in args.costs:
+        algorithm, cost = config.split(":")
+        options = {} if args.workers is None else {"workers": args.workers}
+        hasher = PasswordHasher(algorithm, int(cost), **options)
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = auth_service_database_interface(hasher)
+        usernames = [f"bench-{uuid.uuid4().hex[:12]}" for _ in range(args.users)]
+        insert_users(usernames, hasher.hash(PASSWORD))
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                ok, rate, latencies, probe = run_logins(db.authenticate, usernames, args.logins, args.clients)
+            report(f"{algorithm}:{cost} (x{hasher.workers})", ok, args.logins, rate, latencies, probe)
+        finally:
+            delete_users(usernames)
+
+    # Rehash khi login: dòng plaintext -> hash với cấu hình hiện tại
+    algorithm, cost = args.costs[0].split(":")
+    hasher = PasswordHasher(algorithm, int(cost))
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = auth_service_database_interface(hasher)
+    usernames = [f"bench-{uuid.uuid4().hex[:12]}" for _ in range(args.users)]
+    insert_users(usernames, PASSWORD)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            first = sum(db.authenticate(u, PASSWORD) is not None for u in usernames)
+            second = sum(db.authenticate(u, PASSWORD) is not None for u in usernames)
+            wrong = sum(db.authenticate(u, "wrong") is not None for u in usernames)
+        connection = get_connection('database.db')
+        stored = [row[0] for row in connection.execute(
+            f"SELECT password FROM auth_service WHERE username IN ({','.join('?' * len(usernames))})", usernames)]
+        connection.close()
+        print(f"lazy rehash: {sum(map(is_hashed, stored))}/{len(stored)} plaintext rows hashed after first login "
+              f"(logins ok: {first} then {second}, wrong password accepted: {wrong})")
+    finally:
+        delete_users(usernames)
+
+
+if __name__ == "__main__":
+    main()
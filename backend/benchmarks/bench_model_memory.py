@@ -0,0 +1,257 @@
+"""
+Benchmark: bộ nhớ và tốc độ tạo các domain model.
+
+So sánh hai cách:
+  - before: model có __dict__, dựng từ dict (dict được dựng từ tuple của
+    sqlite3), profile giữ snapshot là một dict to_dict().
+  - after:  model dùng __slots__, dựng trực tiếp từ row bằng row factory,
+    snapshot là một tuple.
+
+Các workload:
+  - roster:   đọc danh sách học sinh của một lớp (get_users_by_ids)
+  - question: nạp ngân hàng câu hỏi của một lớp
+  - rooms:    100k phòng game (gameroom + game_logic_handler + monster + deck)
+
+Số byte/object là bộ nhớ còn giữ lại sau khi tạo (tracemalloc), không tính
+các object trung gian đã được giải phóng.
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_model_memory.py --roster 40 --rooms 100000
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from classroom_service.classroom_db import get_db_connection, init_db
+from classroom_service.classroom_model import Question, QUESTION_COLUMNS
+from game_service.gameroom.game_logic_handler import game_logic_handler
+from game_service.gameroom.gameroom import gameroom
+from game_service.monster.monster import monster
+from user_profile_service.user.user_repository import UserRepository
+
+
+# ---- Model trước khi dùng __slots__ (giữ nguyên thuộc tính như code cũ) ----
+
+class LegacyStudentProfile:
+    def __init__(self, **kwargs):
+        self.id = kwargs.get('id')
+        self.email = kwargs.get('email')
+        self.role = kwargs.get('role', 'student')
+        self.created_at = kwargs.get('created_at', int(time.time()))
+        self.last_login = kwargs.get('last_login', self.created_at)
+        self.language_level = kwargs.get('language_level', 1)
+        self.points = kwargs.get('points', 0)
+        self.money = kwargs.get('money', 100)
+        self.hp = kwargs.get('hp', 100)
+        self.atk = kwargs.get('atk', 10)
+        self.current_map = kwargs.get('current_map', 1)
+        self.max_map_unlocked = kwargs.get('max_map_unlocked', 1)
+        self._maps_completed = kwargs.get('maps_completed', '[]')
+        items = kwargs.get('items', '[]')
+        self._items = items if isinstance(items, str) else json.dumps(items)
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'email': self.email, 'role': self.role,
+            'created_at': self.created_at, 'last_login': self.last_login,
+            'language_level': self.language_level, 'points': self.points, 'money': self.money,
+            'hp': self.hp, 'atk': self.atk, 'current_map': self.current_map,
+            'max_map_unlocked': self.max_map_unlocked, 'maps_completed': self._maps_completed,
+            'items': self._items
+        }
+
+
+class LegacyQuestion:
+    def __init__(self, id, text, difficulty, choices, correct_index, q_type, class_id):
+        self.id = id
+        self.question = text
+        self.difficulty = difficulty
+        self.choices = choices
+        self.correct_index = correct_index
+        self.type = q_type
+        self.class_id = class_id
+
+
+class LegacyMonster:
+    def __init__(self):
+        self.monster_hp = 0
+        self.monster_atk = 0
+        self.money_win = 0
+
+
+class LegacyDeck:
+    def __init__(self, resource_interface, difficulty):
+        self.resource_interface = resource_interface
+        self.difficulty = difficulty
+        self.class_id = None
+        self._cards = []
+        self._last_id = None
+        self.loads = 0
+
+
+class LegacyLogic:
+    def __init__(self, player_hp, player_atk, monster_hp, monster_atk, difficulty,
+                 classroom_service=None, resource_interface=None):
+        self.hp = player_hp
+        self.atk = player_atk
+        self.monster_hp = monster_hp
+        self.monster_atk = monster_atk
+        self.difficulty = difficulty
+        self.classroom_service = classroom_service
+        self.game_resource_interface = resource_interface
+        self.question = None
+        self.deck = LegacyDeck(resource_interface, difficulty)
+        self.answer_keys = {}
+
+
+class LegacyRoom:
+    def __init__(self, session_id, student_id, game_logic_handler, difficulty, monster, money_win):
+        self.student_id = student_id
+        self.money_win = money_win
+        self.session_id = session_id
+        self.difficulty = difficulty
+        self.monster = monster
+        self.status = 0
+        self.game_logic_handler = game_logic_handler
+
+
+# ---- Workload ----
+
+def legacy_load_roster(repo, student_ids):
+    """Đường cũ: tuple -> dict (get_users_by_ids) -> object có __dict__ + snapshot dict"""
+    users = {}
+    for user_id, data in repo.db.get_users_by_ids(student_ids).items():
+        user = LegacyStudentProfile(**data)
+        user._persisted = user.to_dict()
+        users[user_id] = user
+    return users
+
+
+def slotted_load_roster(repo, student_ids):
+    """Đường mới: row factory tạo StudentProfile (slots) trực tiếp từ row"""
+    return repo.db.get_users_by_ids(student_ids, UserRepository._row_to_user)
+
+
+def legacy_load_questions(class_id):
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("SELECT * FROM questions WHERE class_id = ?", (class_id,)).fetchall()
+        return [LegacyQuestion(r["id"], r["question"], r["difficulty"], json.loads(r["choices"]),
+                               r["correct_index"], r["q_type"], r["class_id"]) for r in rows]
+    finally:
+        conn.close()
+
+
+def slotted_load_questions(class_id):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = Question.row_factory
+        return cursor.execute(f"SELECT {QUESTION_COLUMNS} FROM questions WHERE class_id = ?", (class_id,)).fetchall()
+    finally:
+        conn.close()
+
+
+SHARED_SERVICE = object()   # classroom_service / resource_interface dùng chung, không tính vào phòng
+
+
+def make_rooms(n, room_cls, logic_cls, monster_cls):
+    rooms = []
+    for i in range(n):
+        m = monster_cls()
+        m.monster_hp, m.monster_atk, m.money_win = 70, 16, 10
+        logic = logic_cls(100, 10, m.monster_hp, m.monster_atk, "easy", SHARED_SERVICE, SHARED_SERVICE)
+        rooms.append(room_cls(f"session-{i}", f"student-{i}", logic, "easy", m, m.money_win))
+    return rooms
+
+
+def measure(build, count_of):
+    """(bytes giữ lại / object, object / giây); đo thời gian và bộ nhớ ở hai lần build() riêng"""
+    gc.collect()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    count = count_of(result)
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = build()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del result
+    return retained / count, count / elapsed
+
+
+def report(name, legacy, slotted):
+    (legacy_bytes, legacy_rate), (slotted_bytes, slotted_rate) = legacy, slotted
+    print(f"{name}:")
+    print(f"  before (__dict__, dict rows):  {legacy_bytes:8.0f} bytes/object  {legacy_rate:10.0f} objects/s")
+    print(f"  after  (__slots__, row factory): {slotted_bytes:6.0f} bytes/object  {slotted_rate:10.0f} objects/s")
+    print(f"  memory: {slotted_bytes / legacy_bytes:.2f}x  speed: {slotted_rate / legacy_rate:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Domain model memory / construction benchmark")
+    parser.add_argument("--roster", type=int, default=40, help="Số học sinh trong lớp")
+    parser.add_argument("--loads", type=int, default=250, help="Số lần đọc roster giữ trong bộ nhớ")
+    parser.add_argument("--questions", type=int, default=500, help="Số câu hỏi của lớp")
+    parser.add_argument("--rooms", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db()
+        repo = UserRepository()
+        student_ids = [f"bench-{uuid.uuid4()}" for _ in range(args.roster)]
+        for student_id in student_ids:
+            repo.add_user_id_only(student_id, "student")
+
+    class_id = f"bench-{uuid.uuid4().hex[:8]}"
+    conn = get_db_connection()
+    conn.executemany(
+        "INSERT INTO questions (id, class_id, question, q_type, difficulty, choices, correct_index) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(uuid.uuid4().hex[:8], class_id, f"question {i}", "single_choice", "easy",
+          json.dumps(["a", "b", "c", "d"]), i % 4) for i in range(args.questions)]
+    )
+    conn.commit()
+    conn.close()
+
+    def many_rosters(load):
+        return [load(repo, student_ids) for _ in range(args.loads)]
+
+    try:
+        print(f"roster: {args.roster} students x {args.loads} loads, "
+              f"question bank: {args.questions}, rooms: {args.rooms}")
+        count_users = lambda loads: sum(len(users) for users in loads)
+        report("roster (StudentProfile)",
+               measure(lambda: many_rosters(legacy_load_roster), count_users),
+               measure(lambda: many_rosters(slotted_load_roster), count_users))
+        report("question bank (Question)",
+               measure(lambda: [legacy_load_questions(class_id) for _ in range(20)], lambda r: sum(map(len, r))),
+               measure(lambda: [slotted_load_questions(class_id) for _ in range(20)], lambda r: sum(map(len, r))))
+        report("rooms (room + logic + monster + deck)",
+               measure(lambda: make_rooms(args.rooms, LegacyRoom, LegacyLogic, LegacyMonster), len),
+               measure(lambda: make_rooms(args.rooms, gameroom, game_logic_handler, monster), len))
+    finally:
+        conn = get_db_connection()
+        conn.execute("DELETE FROM questions WHERE class_id = ?", (class_id,))
+        conn.commit()
+        conn.close()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for student_id in student_ids:
+                repo.delete_user(student_id)
+
+
+if __name__ == "__main__":
+    main()
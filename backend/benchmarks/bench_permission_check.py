@@ -0,0 +1,139 @@
+"""
+Benchmark: kiểm tra quyền bằng query mỗi lần gọi so với permission matrix trong bộ nhớ.
+
+  - before: check_permission cũ, mở kết nối và SELECT trên bảng permission mỗi lần
+  - after:  permission_service.check_permission đọc PermissionMatrix (tra dict)
+
+Sau đó đo độ trễ lan truyền thay đổi từ một tiến trình khác (ghi thẳng vào
+database.db bằng sqlite3) tới matrix của tiến trình này, với vài poll_interval,
+và kiểm tra ghi vào bảng khác của database.db không làm dựng lại matrix.
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_permission_check.py --rules 200 --checks 100000
+"""
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from auth_service.role_permission_service.permission_matrix import PermissionMatrix
+from auth_service.role_permission_service.permission_service import permission_service
+from db.connection_pool import get_connection
+
+ROLE_INDEX = {'student': 0, 'teacher': 1, 'admin': 2}
+
+WRITER = """
+import sqlite3, sys
+conn = sqlite3.connect(sys.argv[1])
+conn.execute("INSERT INTO permission (service, path, method, student, teacher, admin) VALUES (?, ?, 'POST', 1, 0, 0)",
+             (sys.argv[2], sys.argv[3]))
+conn.commit()
+"""
+
+
+def legacy_check_permission(role, path, service, method):
+    """check_permission trước khi có matrix: một query cho mỗi lần kiểm tra"""
+    connection = get_connection('database.db')
+    cursor = connection.cursor()
+    cursor.execute("SELECT student, teacher,admin FROM permission WHERE  service = ? AND path = ? AND method = ?",
+                   (service, path, method))
+    result = cursor.fetchone()
+    cursor.close()
+    connection.close()
+    if result:
+        index = ROLE_INDEX.get(role.lower())
+        return index is not None and bool(result[index])
+    return False
+
+
+def throughput(check, keys, checks):
+    started = time.perf_counter()
+    allowed = 0
+    for i in range(checks):
+        service, path, method = keys[i % len(keys)]
+        allowed += check("student", path, service, method)
+    return checks / (time.perf_counter() - started), allowed
+
+
+def propagation(service, poll_interval, trials):
+    """Thời gian từ lúc tiến trình khác commit tới lúc matrix của tiến trình này thấy thay đổi"""
+    matrix = PermissionMatrix(poll_interval=poll_interval)
+    matrix.refresh()
+    delays = []
+    for _ in range(trials):
+        path = f"path-{uuid.uuid4().hex[:8]}"
+        subprocess.run([sys.executable, "-c", WRITER, os.path.abspath("database.db"), service, path], check=True)
+        committed = time.perf_counter()
+        while not matrix.allows("student", service, path, "POST"):
+            time.sleep(0.001)
+        delays.append(time.perf_counter() - committed)
+    return delays
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Permission check: per-call query vs in-memory matrix")
+    parser.add_argument("--rules", type=int, default=200, help="Số dòng trong bảng permission")
+    parser.add_argument("--checks", type=int, default=100_000)
+    parser.add_argument("--trials", type=int, default=5, help="Số lần đo độ trễ lan truyền")
+    args = parser.parse_args()
+
+    service = f"bench-{uuid.uuid4().hex[:8]}"
+    with contextlib.redirect_stdout(io.StringIO()):
+        permissions = permission_service()
+    connection = get_connection('database.db')
+    keys = [(service, f"endpoint/{i}", "POST") for i in range(args.rules)]
+    connection.executemany(
+        "INSERT INTO permission (service, path, method, student, teacher, admin) VALUES (?, ?, ?, 1, 0, 1)", keys)
+    connection.commit()
+    connection.close()
+    permissions.matrix.reload()
+
+    try:
+        print(f"rules: {args.rules}, checks: {args.checks}")
+        before, before_ok = throughput(legacy_check_permission, keys, args.checks)
+        after, after_ok = throughput(permissions.check_permission, keys, args.checks)
+        print(f"  before (query per check): {before:10.0f} checks/s  allowed {before_ok}")
+        print(f"  after  (in-memory matrix): {after:10.0f} checks/s  allowed {after_ok}")
+        print(f"  speedup: {after / before:.1f}x")
+
+        # Ghi vào bảng khác của database.db: data_version đổi nhưng matrix không dựng lại
+        matrix = PermissionMatrix(poll_interval=0)
+        matrix.refresh()
+        reloads = matrix.reloads
+        connection = get_connection('database.db')
+        for _ in range(20):
+            connection.execute("UPDATE student_class SET wins = wins WHERE id = -1")
+            connection.execute("INSERT INTO classes (id, name, code, teacher_id) VALUES (?, 'bench', ?, 'bench')",
+                               (service, service))
+            connection.commit()
+            matrix.refresh()
+            connection.execute("DELETE FROM classes WHERE id = ?", (service,))
+            connection.commit()
+            matrix.refresh()
+        connection.close()
+        started = time.perf_counter()
+        for _ in range(args.checks):
+            matrix.refresh()
+        poll_us = (time.perf_counter() - started) / args.checks * 1e6
+        print(f"unrelated writes: 40 commits -> {matrix.reloads - reloads} rebuilds; "
+              f"data_version poll: {poll_us:.1f}us")
+
+        for poll_interval in (0.0, 0.1, 1.0):
+            delays = propagation(service, poll_interval, args.trials)
+            print(f"cross-process change, poll_interval {poll_interval:.1f}s: "
+                  f"avg {sum(delays) / len(delays) * 1000:.1f}ms  max {max(delays) * 1000:.1f}ms")
+    finally:
+        connection = get_connection('database.db')
+        connection.execute("DELETE FROM permission WHERE service = ?", (service,))
+        connection.commit()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark: tra cứu permission theo pattern ('*', '**') bằng trie so với duyệt tuần tự.
+
+  - linear: so từng rule với path (chi phí tăng theo số rule)
+  - trie:   PermissionMatrix.resolve (dict cho dòng cố định + PathTrie theo method)
+
+Rule được sinh ngẫu nhiên (cố định, '*', '**', method '*') vào một database tạm,
+rồi đo số lần tra cứu mỗi giây với vài số lượng rule và độ sâu path.
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_permission_trie.py --rules 1000 10000 --lookups 20000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from auth_service.role_permission_service.path_trie import GLOBSTAR, STAR, split_path
+from auth_service.role_permission_service.permission_matrix import PermissionMatrix
+from db.connection_pool import get_connection
+from db.migrations import migrate
+
+SERVICES = ["admin", "auth", "classroom", "game", "progress", "user", "feedback", "item"]
+METHODS = ["GET", "POST"]
+
+
+def segment_match(pattern, segments):
+    """So một pattern (danh sách segment) với path, như PathTrie nhưng cho một rule"""
+    if not pattern:
+        return not segments
+    head, rest = pattern[0], pattern[1:]
+    if head == GLOBSTAR:
+        return any(segment_match(rest, segments[i:]) for i in range(len(segments) + 1))
+    if not segments:
+        return False
+    return (head == STAR or head == segments[0]) and segment_match(rest, segments[1:])
+
+
+def linear_resolve(rules, service, path, method):
+    segments = split_path(service, path)
+    for (rule_method, pattern), mask in rules:
+        if rule_method in (method, STAR) and segment_match(pattern, segments):
+            return mask
+    return None
+
+
+def make_rules(n, rng):
+    rules = []
+    for i in range(n):
+        service = rng.choice(SERVICES)
+        kind = rng.random()
+        if kind < 0.5:
+            path = f"res{i}/item/{rng.randrange(100)}"
+        elif kind < 0.7:
+            path = f"res{i}/*/detail"
+        elif kind < 0.9:
+            path = f"res{i}/**"
+        else:
+            service, path = STAR, f"shared{i}/*"
+        method = STAR if rng.random() < 0.1 else rng.choice(METHODS)
+        rules.append((service, path, method, rng.randrange(8)))
+    return rules
+
+
+def make_requests(rules, depth, count, rng):
+    """Request khớp các rule đã sinh (thay '*' / '**' bằng segment cụ thể) với độ sâu cho trước"""
+    requests = []
+    for _ in range(count):
+        service, path, method, _ = rng.choice(rules)
+        segments = []
+        for segment in path.split("/"):
+            if segment == GLOBSTAR:
+                segments.extend(f"s{k}" for k in range(max(1, depth - len(segments))))
+            elif segment == STAR:
+                segments.append("x")
+            else:
+                segments.append(segment)
+        service = rng.choice(SERVICES) if service == STAR else service
+        method = rng.choice(METHODS) if method == STAR else method
+        requests.append((service, "/".join(segments), method))
+    return requests
+
+
+def rate(resolve, requests):
+    started = time.perf_counter()
+    for service, path, method in requests:
+        resolve(service, path, method)
+    return len(requests) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Permission pattern lookup: trie vs linear scan")
+    parser.add_argument("--rules", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--linear-lookups", type=int, default=500, help="Số lần tra cứu cho cách duyệt tuần tự (chậm)")
+    parser.add_argument("--depths", type=int, nargs="+", default=[3, 6, 12])
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    for count in args.rules:
+        rules = make_rules(count, rng)
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "permissions.db")
+            with contextlib.redirect_stdout(io.StringIO()):
+                migrate(db_path)
+            connection = get_connection(db_path)
+            connection.executemany(
+                "INSERT INTO permission (service, path, method, student, teacher, admin) VALUES (?, ?, ?, ?, ?, ?)",
+                [(s, p, m, mask & 1, (mask >> 1) & 1, (mask >> 2) & 1) for s, p, m, mask in rules])
+            connection.commit()
+            connection.close()
+
+            matrix = PermissionMatrix(db_path, poll_interval=3600)
+            started = time.perf_counter()
+            matrix.reload()
+            build_ms = (time.perf_counter() - started) * 1000
+
+            linear_rules = [((m, split_path(s, p)), mask) for s, p, m, mask in rules]
+            stats = matrix.stats()
+            print(f"rules: {count} ({stats['entries'] - stats['patterns']} exact, {stats['patterns']} patterns), "
+                  f"rebuild: {build_ms:.1f}ms")
+            for depth in args.depths:
+                requests = make_requests(rules, depth, args.lookups, rng)
+                trie_rate = rate(matrix.resolve, requests)
+                linear_rate = rate(lambda s, p, m: linear_resolve(linear_rules, s, p, m), requests[:args.linear_lookups])
+                matched = sum(matrix.resolve(*request) is not None for request in requests)
+                print(f"  depth {depth:2d}: trie {trie_rate:10.0f} lookups/s   linear {linear_rate:8.0f} lookups/s"
+                      f"   speedup {trie_rate / linear_rate:6.0f}x   matched {matched}/{len(requests)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark: số lần ghi profile mỗi giây của UserRepository.save.
+
+So sánh hai cách:
+  - before: save_user cũ, SELECT kiểm tra tồn tại rồi UPDATE/INSERT toàn bộ
+    cột cho user_profiles và một lần nữa cho bảng profile theo role.
+  - after:  INSERT ... ON CONFLICT DO UPDATE, mỗi bảng một câu lệnh, chỉ
+    các cột đã thay đổi (bảng không đổi thì không ghi).
+
+Hai kiểu ghi được đo:
+  - complete_map:   ProgressService.complete_map (map progression + points + money)
+  - update_profile: UserProfileService.update_profile (đổi hp / last_login)
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_profile_writes.py --users 50 --rounds 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from user_profile_service.user.user_repository import UserRepository
+
+
+def legacy_save_user(db, user_data):
+    """save_user trước khi dùng upsert (SELECT id rồi UPDATE toàn bộ cột, cho từng bảng)"""
+    connection = db._get_connection()
+    cursor = connection.cursor()
+    try:
+        user_id = user_data.get('id')
+        cursor.execute("SELECT id FROM user_profiles WHERE id = ?", (user_id,))
+        if cursor.fetchone() is not None:
+            cursor.execute("UPDATE user_profiles SET email = ?, role = ?, last_login = ? WHERE id = ?",
+                           (user_data.get('email'), user_data.get('role'), user_data.get('last_login'), user_id))
+        cursor.execute("SELECT id FROM student_profiles WHERE id = ?", (user_id,))
+        if cursor.fetchone() is not None:
+            cursor.execute("""
+                UPDATE student_profiles
+                SET language_level = ?, points = ?, money = ?, hp = ?, atk = ?, items = ?,
+                    version = version + 1
+                WHERE id = ?
+            """, (user_data.get('language_level', 1), user_data.get('points', 0), user_data.get('money', 100),
+                  user_data.get('hp', 100), user_data.get('atk', 10), json.dumps(user_data.get('items', [])),
+                  user_id))
+        connection.commit()
+        return user_id
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def legacy_save(repo, user):
+    legacy_save_user(repo.db, user.to_dict())
+    repo.invalidate(user.id)
+    return user
+
+
+def complete_map(user, i):
+    user.current_map += 1
+    user.max_map_unlocked = max(user.max_map_unlocked, user.current_map)
+    user.set_maps_completed(user.get_maps_completed() + [user.current_map - 1])
+    user.points += 75
+    user.money += 45
+
+
+def update_profile(user, i):
+    user.hp = 100 + i % 50
+    user.last_login = int(time.time()) + i
+
+
+class StatementCounter:
+    """Đếm số câu lệnh SQL (trừ BEGIN/COMMIT) trên các kết nối của pool"""
+
+    def __init__(self, db):
+        self.db = db
+        self.count = 0
+        self._connections = []
+
+    def _trace(self, sql):
+        if sql.split(None, 1)[0].upper() not in ("BEGIN", "COMMIT", "ROLLBACK"):
+            self.count += 1
+
+    def __enter__(self):
+        # Pool là LIFO: kết nối vừa trả lại sẽ được dùng cho lần save tiếp theo
+        connection = self.db._get_connection()
+        connection.set_trace_callback(self._trace)
+        self._connections.append(connection)
+        connection.close()
+        return self
+
+    def __exit__(self, *exc):
+        for connection in self._connections:
+            connection.set_trace_callback(None)
+
+
+def run(repo, users, save, mutate, rounds):
+    writes = 0
+    counter = StatementCounter(repo.db)
+    started = time.perf_counter()
+    with counter:
+        for i in range(rounds):
+            for user in users:
+                mutate(user, i)
+                save(repo, user)
+                writes += 1
+    elapsed = time.perf_counter() - started
+    return writes / elapsed, counter.count / writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile write throughput")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20, help="Số lần ghi cho mỗi user trong một lần đo")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        repo = UserRepository()
+        user_ids = [f"bench-{uuid.uuid4()}" for _ in range(args.users)]
+        for user_id in user_ids:
+            repo.add_user_id_only(user_id, "student")
+
+    try:
+        print(f"users: {args.users}, writes per run: {args.users * args.rounds}")
+        for name, mutate in (("complete_map", complete_map), ("update_profile", update_profile)):
+            results = {}
+            for label, save in (("before", legacy_save), ("after", UserRepository.save)):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    users = [repo.find_by_id(user_id) for user_id in user_ids]
+                    results[label] = run(repo, users, save, mutate, args.rounds)
+            (before, before_stmts), (after, after_stmts) = results["before"], results["after"]
+            print(f"{name}:")
+            print(f"  before (probe + full UPDATE): {before:9.0f} writes/s  {before_stmts:.1f} statements/write")
+            print(f"  after  (upsert changed cols): {after:9.0f} writes/s  {after_stmts:.1f} statements/write")
+            print(f"  speedup: {after / before:.2f}x")
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for user_id in user_ids:
+                repo.delete_user(user_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Benchmark: tải HTTP thật lên serve.py với 1, 4 và 8 worker (tiến trình).
+
+Mỗi cấu hình chạy serve.py trong một thư mục tạm (database riêng), đăng ký
+một user, rồi nhiều tiến trình client gửi request liên tục (closed loop) trong
+--duration giây, xoay vòng giữa:
+  - POST /user/get                    (JWT + profile cache + database)
+  - POST /classroom/student/classes   (JWT + classroom database)
+  - POST /progress/leaderboard        (leaderboard trong bộ nhớ)
+Kết quả: requests/s, p50 và p99 latency, số lỗi.
+
+--baseline chạy thêm cấu hình cũ: app.run(debug=True) của werkzeug (một tiến trình,
+mỗi kết nối một thread) để so sánh.
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_serve_workers.py --workers 1 4 8 --threads 8 --duration 10 --baseline
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_DEV_SERVER = (
+    "import sys\n"
+    "from app import create_app\n"
+    "create_app().run(host='127.0.0.1', port=int(sys.argv[1]), debug=True, use_reloader=False, threaded=True)\n"
+)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def call(port, method, path, body=None, token=None, timeout=30):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    try:
+        connection.request(method, path, body=json.dumps(body if body is not None else {}), headers=headers)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def start_server(port, workdir, workers, threads, baseline):
+    env = dict(os.environ, PYTHONPATH=BACKEND, PYTHONDONTWRITEBYTECODE="1")
+    if baseline:
+        command = [sys.executable, "-c", _DEV_SERVER, str(port)]
+    else:
+        command = [sys.executable, os.path.join(BACKEND, "serve.py"), "--host", "127.0.0.1", "--port", str(port),
+                   "--workers", str(workers), "--threads", str(threads)]
+    proc = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if call(port, "GET", "/livez", timeout=2)[0] == 200:
+                time.sleep(1.0 if workers > 1 else 0.2)   # các worker còn lại khởi động xong
+                return proc
+        except OSError:
+            pass
+        time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def client_process(port, token, threads, duration, queue):
+    """Một tiến trình client: threads vòng lặp gửi request cho tới hết duration"""
+    requests = [
+        ("POST", "/user/get", {}, token),
+        ("POST", "/classroom/student/classes", {}, token),
+        ("POST", "/progress/leaderboard", {"map_number": 1}, None),
+    ]
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def loop(offset):
+        local, failed, i = [], 0, offset
+        while time.monotonic() < stop_at:
+            method, path, body, auth = requests[i % len(requests)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                status, _ = call(port, method, path, body, auth)
+                if status >= 500:
+                    failed += 1
+            except OSError:
+                failed += 1
+                continue
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    workers = [threading.Thread(target=loop, args=(k,)) for k in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    queue.put((latencies, errors[0]))
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_load(label, workers, args, baseline=False):
+    workdir = tempfile.mkdtemp()
+    port = free_port()
+    proc = start_server(port, workdir, workers, args.threads, baseline)
+    try:
+        username = "bench_serve"
+        call(port, "POST", "/auth/signup", {"username": username, "password": "secret1"})
+        token = json.loads(call(port, "POST", "/auth/login", {"username": username, "password": "secret1"})[1])["access_token"]
+
+        queue = multiprocessing.Queue()
+        per_process = max(1, args.clients // args.client_procs)
+        clients = [multiprocessing.Process(target=client_process, args=(port, token, per_process, args.duration, queue))
+                   for _ in range(args.client_procs)]
+        started = time.perf_counter()
+        for client in clients:
+            client.start()
+        latencies, errors = [], 0
+        for _ in clients:
+            result, failed = queue.get()
+            latencies.extend(result)
+            errors += failed
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=40)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"  {label:22s} {len(latencies) / elapsed:8.0f} req/s   p50 {percentile(latencies, 0.50):7.1f}ms   "
+          f"p99 {percentile(latencies, 0.99):7.1f}ms   errors {errors}   (exit {proc.returncode})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test serve.py at several worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--threads", type=int, default=8, help="Số thread mỗi worker")
+    parser.add_argument("--clients", type=int, default=32, help="Số request đồng thời")
+    parser.add_argument("--client-procs", type=int, default=4, help="Số tiến trình client")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--baseline", action="store_true", help="Đo thêm app.run(debug=True)")
+    args = parser.parse_args()
+
+    print(f"cpus: {os.cpu_count()}, clients: {args.clients} ({args.client_procs} procs), "
+          f"threads/worker: {args.threads}, duration: {args.duration}s")
+    if args.baseline:
+        run_load("dev server (debug)", 1, args, baseline=True)
+    for workers in args.workers:
+        run_load(f"serve.py {workers} worker(s)", workers, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Stress test: nhiều request nâng cấp kiếm song song không được làm mất cập nhật.
+
+Mỗi student được cấp đúng số tiền cho UPGRADES_AFFORDABLE lần nâng cấp, sau đó
+bắn REQUESTS_PER_STUDENT request song song cho mỗi student. Kiểm tra:
+  - số lần thành công == số level kiếm tăng thêm == UPGRADES_AFFORDABLE
+  - tiền bị trừ đúng bằng tổng chi phí các lần thành công (không trừ hai lần)
+  - HP tăng đúng 20 cho mỗi lần thành công
+
+Chạy từ thư mục backend:
+    python benchmarks/stress_sword_upgrade.py --students 30 --requests 10
+    python benchmarks/stress_sword_upgrade.py --legacy   # đường đọc-sửa-ghi cũ để so sánh
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from user_profile_service.item.item_service import ItemService
+from user_profile_service.user.user import StudentProfile
+from user_profile_service.database_interface import ItemDatabaseInterface, UserProfileDatabaseInterface
+
+UPGRADES_AFFORDABLE = 4
+START_MONEY = sum((level ** 2) * 50 for level in range(1, UPGRADES_AFFORDABLE + 1))
+
+
+def legacy_upgrade(service, user_id):
+    """Đường nâng cấp cũ: find_by_id -> tính toán -> save_item + save (không có điều kiện)"""
+    user = service.user_repository.find_by_id(user_id)
+    if not user or not isinstance(user, StudentProfile):
+        return {"success": False}
+    sword = service.item_repository.find_by_id(f"sword_{user_id}")
+    if not sword or not sword.can_upgrade():
+        return {"success": False}
+    cost = sword.get_upgrade_cost()
+    if user.money < cost:
+        return {"success": False}
+    sword.level += 1
+    sword.effect = int(sword.effect * 1.3)
+    user.money -= cost
+    user.hp += 20
+    user.atk = 10 + int(sword.effect * 0.5)
+    service.item_repository.save_item(sword)
+    service.user_repository.save(user)
+    return {"success": True, "upgrade_info": {"upgrade_cost": cost}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent sword upgrade stress test")
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=10, help="Request song song cho mỗi student")
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--legacy", action="store_true", help="Dùng đường đọc-sửa-ghi cũ")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = ItemService()
+        users_db = UserProfileDatabaseInterface()
+        items_db = ItemDatabaseInterface()
+        student_ids = [f"stress-{uuid.uuid4()}" for _ in range(args.students)]
+        for student_id in student_ids:
+            users_db.add_user_id_only(student_id, "student")
+
+    conn = users_db._get_connection()
+    conn.executemany("UPDATE student_profiles SET money = ? WHERE id = ?",
+                     [(START_MONEY, student_id) for student_id in student_ids])
+    conn.commit()
+    conn.close()
+
+    upgrade = (lambda user_id: legacy_upgrade(service, user_id)) if args.legacy else service.upgrade_sword
+    jobs = [student_id for student_id in student_ids for _ in range(args.requests)]
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(lambda user_id: (user_id, upgrade(user_id)), jobs))
+    elapsed = time.perf_counter() - started
+
+    successes = {student_id: [] for student_id in student_ids}
+    errors = {}
+    for user_id, result in results:
+        if result.get("success"):
+            successes[user_id].append(result["upgrade_info"]["upgrade_cost"])
+        else:
+            error = str(result.get("error", "failed")).split(".")[0]
+            errors[error] = errors.get(error, 0) + 1
+
+    violations = 0
+    conn = users_db._get_connection()
+    try:
+        for student_id in student_ids:
+            money, hp = conn.execute("SELECT money, hp FROM student_profiles WHERE id = ?", (student_id,)).fetchone()
+            level = conn.execute("SELECT level FROM items WHERE id = ?", (f"sword_{student_id}",)).fetchone()[0]
+            paid = sum(successes[student_id])
+            ok = (
+                len(successes[student_id]) == level - 1
+                and money == START_MONEY - paid
+                and hp == 100 + 20 * len(successes[student_id])
+                and money >= 0
+            )
+            if not ok:
+                violations += 1
+    finally:
+        conn.close()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for student_id in student_ids:
+            users_db.delete_user(student_id)
+            items_db.delete_item(f"sword_{student_id}")
+
+    total_success = sum(len(costs) for costs in successes.values())
+    print(f"mode: {'legacy read-modify-write' if args.legacy else 'guarded transaction'}")
+    print(f"requests: {len(jobs)} ({args.students} students x {args.requests}), workers: {args.workers}")
+    print(f"elapsed: {elapsed:.2f}s  ({len(jobs) / elapsed:.0f} req/s)")
+    print(f"successful upgrades: {total_success} (expected {args.students * UPGRADES_AFFORDABLE})")
+    print(f"rejected: {errors}")
+    print(f"students with lost updates / double spend: {violations}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
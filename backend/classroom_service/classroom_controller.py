@@ -1,7 +1,7 @@
 import traceback
 
 from flask import jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from api_gateway.request_auth import current_user_id
 from classroom_service.classroom_db import get_db_connection
 from classroom_service.classroom_service import ClassroomService
 
@@ -23,27 +23,24 @@ class ClassroomController:
     def __init__(self, service: ClassroomService):
         self.service = service
 
-    @jwt_required()
     def create_class(self, data):
         if not data or 'name' not in data:
             return jsonify({"error": "Missing class name"}), 400
 
-        teacher_id = get_jwt_identity()
+        teacher_id = current_user_id()
         new_cls_obj = self.service.create_class(data['name'], teacher_id)
         return jsonify({"success": True, "classroom": new_cls_obj.to_dict()}), 201
 
-    @jwt_required()
     def join_class(self, data):
         if not data or 'class_code' not in data:
             return jsonify({"error": "Missing class_code"}), 400
 
-        student_id = get_jwt_identity()
+        student_id = current_user_id()
         success = self.service.join_class_by_code(student_id, data['class_code'])
         if not success:
             return jsonify({"error": "Invalid class code"}), 404
         return jsonify({"success": True}), 200
 
-    @jwt_required()
     def get_students(self, class_id):
         print("class_id: ", class_id)
         if not class_id:
@@ -59,14 +56,12 @@ class ClassroomController:
             traceback.print_exc()
             return jsonify({"error": f"Internal error: {str(e)}"}), 500
 
-    @jwt_required()
     def get_teachers_classes(self):
-        teacher_id = get_jwt_identity()
+        teacher_id = current_user_id()
         classes = self.service.get_classes_by_teacher(teacher_id)
         print(classes)
         return jsonify(classes), 200
 
-    @jwt_required()
     def create_question(self):
         data = request.get_json()
         required_fields = ["class_id", "text", "q_type", "difficulty", "choices", "correct_index"]
@@ -87,7 +82,6 @@ class ClassroomController:
         except Exception as e:
             return jsonify({"error": f"Failed to create question: {str(e)}"}), 500
 
-    @jwt_required()
     def get_questions_by_criteria(self):
         data = request.get_json() or {}
         class_id = data.get("class_id")
@@ -105,13 +99,11 @@ class ClassroomController:
         questions = self.service.get_questions_by_criteria(class_id, difficulty, q_type, num)
         return jsonify({"questions": questions}), 200
 
-    @jwt_required()
     def get_student_classes(self):
-        student_id = get_jwt_identity()
+        student_id = current_user_id()
         classes = self.service.get_student_classes(student_id)
         return jsonify({"classes": classes}), 200
 
-    @jwt_required()
     def get_dashboard(self, class_id):
         print("Dashboard1", class_id)
         if not class_id:
@@ -122,23 +114,21 @@ class ClassroomController:
         return jsonify({"dashboard": dashboard}), 200
 
 
-    @jwt_required()
     def kick_student(self, data):
         if not data or "class_id" not in data or "student_id" not in data:
             return jsonify({"error": "class_id và student_id cần thiết"}), 400
 
         class_id = data["class_id"]
         student_id = data["student_id"]
-        teacher_id = get_jwt_identity()
+        teacher_id = current_user_id()
 
         cls = self.service.get_class_by_code(class_id)
         from classroom_service.classroom_model import Classroom
         conn = self.service.get_class_by_code(class_id)
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT teacher_id FROM classes WHERE id = ?;", (class_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT teacher_id FROM classes WHERE id = ?;", (class_id,))
+            row = cursor.fetchone()
         if not row:
             return jsonify({"error": "Class không tồn tại"}), 404
 
@@ -151,11 +141,9 @@ class ClassroomController:
 
         return jsonify({"success": True}), 200
 
-    @jwt_required()
     def check_health(self):
         return jsonify(self.service.check_internal()), 200
 
-    @jwt_required()
     def increment_win(self):
         data = request.get_json()
         if not data or "class_id" not in data or "student_id" not in data:
@@ -2,11 +2,16 @@ import uuid
 import json
 from typing import List, Optional, Dict, Any
 
-from classroom_service.classroom_db import init_db, get_db_connection
+from classroom_service.classroom_db import get_db_connection
+
+# Thứ tự cột mà Question.row_factory / Classroom.row_factory đọc
+QUESTION_COLUMNS = "id, question, difficulty, choices, correct_index, q_type, class_id"
+CLASSROOM_COLUMNS = "id, name, code, teacher_id"
 
-init_db()
 
 class Question:
+    __slots__ = ('id', 'question', 'difficulty', 'choices', 'correct_index', 'type', 'class_id')
+
     def __init__(
         self,
         id: str,
@@ -48,8 +53,15 @@ class Question:
             class_id=row["class_id"]
         )
 
+    @staticmethod
+    def row_factory(cursor, row) -> "Question":
+        """Row factory cho query SELECT QUESTION_COLUMNS: tạo Question trực tiếp từ tuple"""
+        return Question(row[0], row[1], row[2], json.loads(row[3]), row[4], row[5], row[6])
+
 
 class Classroom:
+    __slots__ = ('id', 'name', 'code', 'teacher_id')
+
     def __init__(self, id: str, name: str, code: str, teacher_id: str):
         self.id = id
         self.name = name
@@ -72,3 +84,8 @@ class Classroom:
             code=row["code"],
             teacher_id=row["teacher_id"]
         )
+
+    @staticmethod
+    def row_factory(cursor, row) -> "Classroom":
+        """Row factory cho query SELECT CLASSROOM_COLUMNS"""
+        return Classroom(row[0], row[1], row[2], row[3])
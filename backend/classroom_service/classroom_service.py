@@ -4,83 +4,72 @@ from typing import List, Dict, Any, Optional
 
 from flask import jsonify
 
-from classroom_service.classroom_model import Classroom, Classroom as ClassroomObj, Question
-from classroom_service.classroom_db import get_db_connection
+from classroom_service.classroom_model import Classroom, Classroom as ClassroomObj, Question, QUESTION_COLUMNS, CLASSROOM_COLUMNS
+from classroom_service.classroom_db import get_db_connection, init_db
+from classroom_service.question_bank import question_bank
 from user_profile_service.user.user_service import UserProfileService as UserService
 
 class ClassroomService:
-    def __init__(self):
-        self.user_service = UserService()
+    def __init__(self, user_service: UserService = None):
+        # Schema của classroom được kiểm tra khi service được tạo, không phải lúc import model
+        init_db()
+        self.user_service = user_service or UserService()
 
     def create_class(self, name: str, teacher_id: str) -> ClassroomObj:
         class_id = str(uuid.uuid4())[:8]
         code     = str(uuid.uuid4())[:6].upper()
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO classes (id, name, code, teacher_id) VALUES (?, ?, ?, ?);",
-            (class_id, name, code, teacher_id)
-        )
-        conn.commit()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO classes (id, name, code, teacher_id) VALUES (?, ?, ?, ?);",
+                (class_id, name, code, teacher_id)
+            )
+            conn.commit()
         return ClassroomObj(id=class_id, name=name, code=code, teacher_id=teacher_id)
 
     def get_class_by_code(self, code: str) -> Optional[ClassroomObj]:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM classes WHERE code = ?;", (code,))
-        row = cursor.fetchone()
-        conn.close()
-        if not row:
-            return None
-        return Classroom.from_row(row)
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = Classroom.row_factory
+            cursor.execute(f"SELECT {CLASSROOM_COLUMNS} FROM classes WHERE code = ?;", (code,))
+            cls = cursor.fetchone()
+        return cls
 
     def join_class_by_code(self, student_id: str, class_code: str) -> bool:
         cls = self.get_class_by_code(class_code)
         if not cls:
             return False
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                INSERT OR IGNORE INTO student_class (class_id, student_id)
-                VALUES (?, ?);
-            """, (cls.id, student_id))
-            conn.commit()
-        except:
-            conn.close()
-            return False
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO student_class (class_id, student_id)
+                    VALUES (?, ?);
+                """, (cls.id, student_id))
+                conn.commit()
+            except:
+                return False
         return True
 
     def get_class_students(self, class_id: str) -> List[Dict[str, Any]]:
         print("class_id for db2: ", class_id)
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT student_id FROM student_class WHERE class_id = ?;", (class_id,))
-        rows = cursor.fetchall()
-        conn.close()
-        print('rows: ', rows)
-        result = []
-        for r in rows:
-            print(r["student_id"])
-            sid = r["student_id"]
-            user_data = self.user_service.get_user(sid)
-            print("user_data:", user_data)
-            if user_data:
-                result.append(user_data)
-        return result
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT student_id FROM student_class WHERE class_id = ?;", (class_id,))
+            rows = cursor.fetchall()
+        users = self.user_service.get_users_by_ids([r["student_id"] for r in rows])
+        return [users[r["student_id"]] for r in rows if r["student_id"] in users]
 
     def get_classes_by_teacher(self, teacher_id: str) -> List[Dict[str, Any]]:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM classes WHERE teacher_id = ?;", (teacher_id,))
-        rows = cursor.fetchall()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = Classroom.row_factory
+            cursor.execute(f"SELECT {CLASSROOM_COLUMNS} FROM classes WHERE teacher_id = ?;", (teacher_id,))
+            classes = cursor.fetchall()
 
-        return [Classroom.from_row(r).to_dict() for r in rows]
+        return [cls.to_dict() for cls in classes]
 
     def create_question(
         self,
@@ -94,15 +83,15 @@ class ClassroomService:
         question_id = str(uuid.uuid4())[:8]
         choices_json = json.dumps(choices, ensure_ascii=False)
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-                    INSERT INTO questions
-                    (id, class_id, question, q_type, difficulty, choices, correct_index)
-                    VALUES (?, ?, ?, ?, ?, ?, ?);
-                """, (question_id, class_id, text, q_type, difficulty, choices_json, correct_index))
-        conn.commit()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                        INSERT INTO questions
+                        (id, class_id, question, q_type, difficulty, choices, correct_index)
+                        VALUES (?, ?, ?, ?, ?, ?, ?);
+                    """, (question_id, class_id, text, q_type, difficulty, choices_json, correct_index))
+            conn.commit()
+        question_bank.invalidate(class_id)
 
         return Question(
             id=question_id,
@@ -114,110 +103,97 @@ class ClassroomService:
             class_id=class_id
         )
 
-    def get_questions_by_criteria(self, class_id, difficulty=None, q_type=None, limit=1):
-        base_sql = "SELECT * FROM questions WHERE class_id = ?"
-        params = [class_id]
-
-        if difficulty is not None:
-            base_sql += " AND difficulty = ?"
-            params.append(difficulty)
-        if q_type is not None:
-            base_sql += " AND q_type = ?"
-            params.append(q_type)
-        if limit is not None:
-            base_sql += " ORDER BY RANDOM() LIMIT ?"
-            params.append(limit)
-
-        # DEBUG
-        print("SQL →", base_sql)
-        print("PARAMS →", params)
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(base_sql, tuple(params))
-        rows = cursor.fetchall()
-        conn.close()
-
-        print("ROWS →", rows)
-        return [Question.from_row(r).to_dict() for r in rows]
+    def _load_class_questions(self, class_id: str) -> List[Question]:
+        """Đọc toàn bộ câu hỏi của lớp từ database (một query)"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = Question.row_factory
+            cursor.execute(f"SELECT {QUESTION_COLUMNS} FROM questions WHERE class_id = ?", (class_id,))
+            return cursor.fetchall()
 
-    def get_student_classes(self, student_id: str) -> Dict[str, Any]:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT class_id FROM student_class WHERE student_id = ?;",
-            (student_id,)
-        )
-        rows = cursor.fetchall()
-
-        class_list = []
-        for r in rows:
-            cid = r["class_id"]
-            cursor2 = conn.cursor()
-            cursor2.execute("SELECT * FROM classes WHERE id = ?;", (cid,))
-            row_cls = cursor2.fetchone()
-            cursor2.close()
-
-            if row_cls:
-                class_list.append(Classroom.from_row(row_cls).to_dict())
+    def get_questions(self, class_id: str, difficulty: Optional[str] = None) -> List[Question]:
+        """Tất cả câu hỏi của lớp (lọc theo độ khó nếu có), lấy từ question bank"""
+        return list(question_bank.get(class_id, self._load_class_questions).select(difficulty))
 
-        conn.close()
+    def get_questions_by_criteria(self, class_id, difficulty=None, q_type=None, limit=1):
+        # Lấy ngẫu nhiên từ question bank thay vì ORDER BY RANDOM() trên database
+        questions = question_bank.get(class_id, self._load_class_questions).sample(difficulty, q_type, limit)
+        return [q.to_dict() for q in questions]
 
-        classes_dict = { item["id"]: item for item in class_list }
+    def get_student_classes(self, student_id: str) -> Dict[str, Any]:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            # Một query JOIN thay cho một query classes cho mỗi lớp
+            cursor.row_factory = Classroom.row_factory
+            cursor.execute("""
+                SELECT c.id, c.name, c.code, c.teacher_id
+                FROM student_class sc
+                JOIN classes c ON c.id = sc.class_id
+                WHERE sc.student_id = ?;
+            """, (student_id,))
+            classes = cursor.fetchall()
+
+        classes_dict = { cls.id: cls.to_dict() for cls in classes }
         return classes_dict
 
     def get_class_dashboard(self, class_id: str) -> List[Dict[str, Any]]:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT student_id, wins FROM student_class 
-            WHERE class_id = ?
-            ORDER BY wins DESC;
-        """, (class_id,))
-        rows = cursor.fetchall()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT student_id, wins FROM student_class 
+                WHERE class_id = ?
+                ORDER BY wins DESC;
+            """, (class_id,))
+            rows = cursor.fetchall()
 
+        users = self.user_service.get_users_by_ids([r["student_id"] for r in rows])
         result = []
         for r in rows:
-            sid = r["student_id"]
-            wins = r["wins"]
-            user_data = self.user_service.get_user(sid)
+            user_data = users.get(r["student_id"])
             if user_data:
-                user_data["wins"] = wins
+                user_data = dict(user_data)
+                user_data["wins"] = r["wins"]
                 result.append(user_data)
-        print("Dashboard result:", result)
         return result
 
     def remove_student_from_class(self, class_id: str, student_id: str) -> bool:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "DELETE FROM student_class WHERE class_id = ? AND student_id = ?;",
-                (class_id, student_id)
-            )
-            conn.commit()
-            return True
-        except Exception:
-            return False
-        finally:
-            conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "DELETE FROM student_class WHERE class_id = ? AND student_id = ?;",
+                    (class_id, student_id)
+                )
+                conn.commit()
+                return True
+            except Exception:
+                return False
 
     def check_internal(self) -> Dict[str, Any]:
-        return {"status": "healthy", "details": "Classroom service running"}
+        return {
+            "status": "healthy",
+            "details": "Classroom service running",
+            "question_bank": question_bank.stats()
+        }
+
+    def get_question_by_id(self, question_id: str) -> Optional[Question]:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = Question.row_factory
+            cursor.execute(f"SELECT {QUESTION_COLUMNS} FROM questions WHERE id = ?", (question_id,))
+            return cursor.fetchone()
 
     def get_question_by_id_minimal(self,question_id: str) -> Optional[List[str]]:
         sql = "SELECT difficulty, question, correct_index, choices FROM questions WHERE id = ?"
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(sql, (question_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (question_id,))
+            row = cursor.fetchone()
 
         if row:
             # Lấy danh sách đáp án từ chuỗi JSON lưu trong `choices`
-            choices = eval(row["choices"]) if row["choices"] else []
+            choices = json.loads(row["choices"]) if row["choices"] else []
             correct_index = row["correct_index"]
             correct_answer = choices[correct_index] if 0 <= correct_index < len(choices) else None
 
@@ -226,16 +202,14 @@ class ClassroomService:
             return None
 
     def increment_student_win(self, class_id: str, student_id: str) -> bool:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "UPDATE student_class SET wins = wins + 1 WHERE class_id = ? AND student_id = ?;",
-                (class_id, student_id)
-            )
-            conn.commit()
-            return cursor.rowcount > 0
-        except Exception:
-            return False
-        finally:
-            conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "UPDATE student_class SET wins = wins + 1 WHERE class_id = ? AND student_id = ?;",
+                    (class_id, student_id)
+                )
+                conn.commit()
+                return cursor.rowcount > 0
+            except Exception:
+                return False
@@ -0,0 +1,178 @@
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from classroom_service.classroom_db import DB_PATH
+from common.fork_safety import abandon, reinit_after_fork
+from common.lru_cache import LRUCache
+from db.connection_pool import open_connection
+from db.migrations import migrate
+
+# Số lớp tối đa được giữ ngân hàng câu hỏi trong bộ nhớ
+QUESTION_BANK_MAX_CLASSES = int(os.getenv("QUESTION_BANK_MAX_CLASSES", "256"))
+# Khoảng thời gian tối thiểu (giây) giữa hai lần kiểm tra câu hỏi được ghi bởi tiến trình khác
+QUESTION_BANK_POLL_INTERVAL = float(os.getenv("QUESTION_BANK_POLL_INTERVAL", "1"))
+
+
+def _estimate_size(question) -> int:
+    """Ước lượng số byte của một Question (object + chuỗi + danh sách đáp án)"""
+    size = sys.getsizeof(question)
+    if hasattr(question, "__dict__"):
+        size += sys.getsizeof(question.__dict__)
+    for value in (question.id, question.question, question.difficulty, question.type, question.class_id):
+        size += sys.getsizeof(value)
+    size += sys.getsizeof(question.choices) + sum(sys.getsizeof(c) for c in question.choices)
+    return size
+
+
+class ClassQuestionSet:
+    """Toàn bộ câu hỏi của một lớp, có index theo difficulty và (difficulty, q_type)"""
+
+    def __init__(self, class_id: str, questions: List[Any]):
+        self.class_id = class_id
+        self.questions = questions
+        self.by_difficulty: Dict[str, List[Any]] = {}
+        self.by_type: Dict[str, List[Any]] = {}
+        self.by_difficulty_type: Dict[Tuple[str, str], List[Any]] = {}
+        for question in questions:
+            self.by_difficulty.setdefault(question.difficulty, []).append(question)
+            self.by_type.setdefault(question.type, []).append(question)
+            self.by_difficulty_type.setdefault((question.difficulty, question.type), []).append(question)
+        self.size_bytes = sum(_estimate_size(q) for q in questions)
+
+    def select(self, difficulty: Optional[str] = None, q_type: Optional[str] = None) -> List[Any]:
+        """Danh sách câu hỏi khớp điều kiện (tham chiếu tới index, không được sửa)"""
+        if difficulty is not None and q_type is not None:
+            return self.by_difficulty_type.get((difficulty, q_type), [])
+        if difficulty is not None:
+            return self.by_difficulty.get(difficulty, [])
+        if q_type is not None:
+            return self.by_type.get(q_type, [])
+        return self.questions
+
+    def sample(self, difficulty: Optional[str] = None, q_type: Optional[str] = None,
+               limit: Optional[int] = 1) -> List[Any]:
+        """Lấy ngẫu nhiên tối đa `limit` câu hỏi; limit=1 là O(1), limit=None trả về tất cả"""
+        candidates = self.select(difficulty, q_type)
+        if limit is None:
+            return list(candidates)
+        if not candidates or limit <= 0:
+            return []
+        if limit == 1:
+            return [random.choice(candidates)]
+        return random.sample(candidates, min(limit, len(candidates)))
+
+
+class QuestionBank:
+    """
+    Cache ngân hàng câu hỏi dùng chung cho cả tiến trình, key là class_id.
+
+    Mỗi lớp được nạp bằng một query khi cần, giữ trong LRU có giới hạn và bị xóa:
+      - ngay khi giáo viên thêm câu hỏi trong tiến trình này (ClassroomService.create_question)
+      - khi tiến trình khác ghi: PRAGMA data_version trên kết nối riêng thay đổi và
+        bộ đếm question_version (tăng bởi trigger, theo lớp) khác version đang giữ;
+        kiểm tra tối đa mỗi poll_interval giây
+    """
+
+    def __init__(self, max_classes: int = QUESTION_BANK_MAX_CLASSES, db_path: str = DB_PATH,
+                 poll_interval: float = QUESTION_BANK_POLL_INTERVAL):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self._cache = LRUCache(max_classes)
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._versions: Optional[Dict[str, int]] = None
+        self._data_version = None
+        self._checked_at = 0.0
+        reinit_after_fork(self)
+
+    def _after_fork(self):
+        # Kết nối của tiến trình cha bị bỏ lại (không đóng), câu hỏi đã nạp vẫn dùng được
+        self._lock = threading.Lock()
+        abandon(self._connection)
+        self._connection = None
+        self._pid = None
+        self._data_version = None
+
+    def _get_connection(self):
+        # Kết nối riêng của tiến trình: data_version chỉ so sánh được trên cùng một kết nối
+        pid = os.getpid()
+        if self._connection is None or self._pid != pid:
+            self._connection = open_connection(self.db_path)
+            self._pid = pid
+            self._data_version = None
+        return self._connection
+
+    def refresh(self) -> None:
+        """Xóa khỏi cache các lớp có câu hỏi bị tiến trình khác ghi từ lần kiểm tra trước"""
+        if self._versions is not None and time.monotonic() - self._checked_at < self.poll_interval:
+            return
+        with self._lock:
+            if self._versions is not None and time.monotonic() - self._checked_at < self.poll_interval:
+                return
+            if self._versions is None:
+                migrate(self.db_path)
+            connection = self._get_connection()
+            data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                # database.db còn chứa bảng khác; chỉ xóa những lớp có question_version đổi
+                versions = dict(connection.execute("SELECT class_id, version FROM question_version").fetchall())
+                if self._versions is not None:
+                    for class_id, version in versions.items():
+                        if self._versions.get(class_id) != version:
+                            self._generations[class_id] = self._generations.get(class_id, 0) + 1
+                            self._cache.invalidate(class_id)
+                self._versions = versions
+                self._data_version = data_version
+            self._checked_at = time.monotonic()
+
+    def get(self, class_id: str, loader: Callable[[str], List[Any]]) -> ClassQuestionSet:
+        """
+        Lấy câu hỏi của lớp từ cache, nạp bằng loader(class_id) nếu chưa có
+
+        Args:
+            class_id: ID lớp
+            loader: Hàm trả về toàn bộ Question của lớp
+        """
+        self.refresh()
+        entry = self._cache.get(class_id)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            generation = self._generations.get(class_id, 0)
+        entry = ClassQuestionSet(class_id, loader(class_id))
+        with self._lock:
+            # Không lưu kết quả nếu lớp bị invalidate trong lúc đang nạp
+            if self._generations.get(class_id, 0) == generation:
+                self._cache.put(class_id, entry)
+        return entry
+
+    def invalidate(self, class_id: str) -> None:
+        with self._lock:
+            self._generations[class_id] = self._generations.get(class_id, 0) + 1
+            self._cache.invalidate(class_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            for class_id in list(self._generations):
+                self._generations[class_id] += 1
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate và dung lượng ước lượng của cache"""
+        stats = self._cache.stats()
+        entries = self._cache.values()
+        stats["questions"] = sum(len(entry.questions) for entry in entries)
+        stats["memory_bytes"] = sum(entry.size_bytes for entry in entries)
+        stats["poll_interval"] = self.poll_interval
+        return stats
+
+
+# Dùng chung cho mọi ClassroomService trong tiến trình
+question_bank = QuestionBank()
@@ -0,0 +1,38 @@
+import os
+import weakref
+from typing import Any
+
+# Đối tượng cần khởi tạo lại trạng thái theo tiến trình (lock, thread, kết nối) sau fork
+_registered = weakref.WeakSet()
+# Tài nguyên (kết nối SQLite...) thừa hưởng từ tiến trình cha: giữ tham chiếu để không bị
+# đóng trong tiến trình con (đóng ở con có thể đụng vào file/WAL mà tiến trình cha đang dùng)
+_inherited = []
+
+
+def reinit_after_fork(obj: Any) -> Any:
+    """
+    Đăng ký obj để obj._after_fork() được gọi trong tiến trình con ngay sau fork
+
+    Returns:
+        obj (dùng được như decorator/biểu thức)
+    """
+    _registered.add(obj)
+    return obj
+
+
+def abandon(resource: Any) -> None:
+    """Bỏ một tài nguyên thuộc tiến trình cha mà không đóng nó"""
+    if resource is not None:
+        _inherited.append(resource)
+
+
+def _after_fork_in_child() -> None:
+    for obj in list(_registered):
+        try:
+            obj._after_fork()
+        except Exception as e:
+            print(f"❌ after-fork reset failed for {type(obj).__name__}: {e}")
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+from common.fork_safety import reinit_after_fork
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe LRU cache with optional per-entry TTL.
+
+    Dùng chung cho các cache trong tiến trình (lịch sử progress, profile...),
+    có đếm hit/miss/eviction để theo dõi.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            max_entries: Số entry tối đa, entry ít dùng nhất bị loại khi vượt quá
+            ttl_seconds: Thời gian sống mặc định của entry (None = không hết hạn)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expired = 0
+        reinit_after_fork(self)
+
+    def _after_fork(self):
+        # Lock có thể đang bị một thread của tiến trình cha giữ lúc fork; dữ liệu vẫn dùng được
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Lấy giá trị, đánh dấu là vừa dùng; trả default nếu không có hoặc đã hết hạn"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self._misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self._expired += 1
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Lấy giá trị mà không thay đổi thứ tự LRU và không tính vào hit/miss"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                return default
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Thêm/cập nhật entry; ttl_seconds ghi đè TTL mặc định"""
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Xóa một entry, trả True nếu entry tồn tại"""
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def values(self) -> List[Any]:
+        """Ảnh chụp các giá trị đang có (không tính vào hit/miss)"""
+        with self._lock:
+            return [value for value, _ in self._data.values()]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Số liệu hit/miss/eviction của cache"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expired": self._expired,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0
+            }
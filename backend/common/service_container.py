@@ -0,0 +1,104 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from common.fork_safety import reinit_after_fork
+
+_MISSING = object()
+
+
+class ServiceContainer:
+    """
+    Container service khởi tạo lười, mỗi service đúng một instance.
+
+    Service được đăng ký bằng factory (nhận container để lấy service phụ thuộc)
+    và chỉ được tạo ở lần get() đầu tiên, nên khởi động không phải dựng
+    mọi service/kết nối database. Thời gian khởi tạo của từng service
+    (không tính service phụ thuộc) được ghi lại để theo dõi cold start.
+    Factory lỗi thì service được ghi là None (kèm lỗi) và không thử lại.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[["ServiceContainer"], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._errors: Dict[str, str] = {}
+        self._init_ms: Dict[str, float] = {}
+        # RLock: factory gọi get() cho service phụ thuộc trong cùng thread
+        self._lock = threading.RLock()
+        self._building = []
+        reinit_after_fork(self)
+
+    def _after_fork(self):
+        # Service đã tạo vẫn dùng được (trạng thái theo tiến trình tự khởi tạo lại), chỉ cần lock mới
+        self._lock = threading.RLock()
+        self._building = []
+
+    def register(self, name: str, factory: Callable[["ServiceContainer"], Any]) -> None:
+        """
+        Args:
+            name: Tên service
+            factory: Hàm tạo service, nhận container
+        """
+        self._factories[name] = factory
+
+    def get(self, name: str) -> Any:
+        """
+        Instance của service, tạo ở lần gọi đầu tiên
+
+        Returns:
+            Instance, hoặc None nếu factory lỗi
+
+        Raises:
+            KeyError nếu service chưa đăng ký
+        """
+        instance = self._instances.get(name, _MISSING)
+        if instance is not _MISSING:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name, _MISSING)
+            if instance is not _MISSING:
+                return instance
+            factory = self._factories[name]
+            if name in self._building:
+                raise RuntimeError(f"Circular service dependency: {' -> '.join(self._building + [name])}")
+
+            self._building.append(name)
+            started = time.perf_counter()
+            # Thời gian của service phụ thuộc được tạo bên trong factory không tính cho service này
+            nested_before = sum(self._init_ms.values())
+            try:
+                instance = factory(self)
+            except Exception as e:
+                print(f"❌ ERROR while initializing service '{name}':", str(e))
+                self._errors[name] = str(e)
+                instance = None
+            finally:
+                self._building.pop()
+            nested_ms = sum(self._init_ms.values()) - nested_before
+            self._init_ms[name] = (time.perf_counter() - started) * 1000 - nested_ms
+            self._instances[name] = instance
+            return instance
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+    def build_all(self, names: Optional[Iterable[str]] = None) -> None:
+        """Tạo trước các service (mặc định: tất cả), dùng để làm nóng trước khi nhận request"""
+        for name in (names if names is not None else list(self._factories)):
+            self.get(name)
+
+    def init_times(self) -> Dict[str, float]:
+        """Thời gian khởi tạo (ms) của các service đã tạo, theo thứ tự tạo"""
+        with self._lock:
+            return {name: round(ms, 3) for name, ms in self._init_ms.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "registered": len(self._factories),
+                "built": len(self._instances),
+                "pending": [name for name in self._factories if name not in self._instances],
+                "init_ms": {name: round(ms, 3) for name, ms in self._init_ms.items()},
+                "total_init_ms": round(sum(self._init_ms.values()), 3),
+                "errors": dict(self._errors)
+            }
@@ -0,0 +1,311 @@
+import gc
+import os
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Dict, Any
+
+from common.fork_safety import abandon, reinit_after_fork
+
+# Cấu hình mặc định, có thể ghi đè bằng biến môi trường
+POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "16"))
+POOL_TIMEOUT = float(os.getenv("SQLITE_POOL_TIMEOUT", "10"))
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "8192"))
+MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+# Khi pool đầy: khoảng thời gian tối thiểu (giây) giữa hai lần chạy GC tìm kết nối bị bỏ quên
+_LEAK_CHECK_INTERVAL = 0.1
+
+
+def open_connection(db_path: str, factory=sqlite3.Connection) -> sqlite3.Connection:
+    """
+    Mở một kết nối với cùng PRAGMA như các kết nối trong pool
+
+    Dùng trực tiếp khi cần một kết nối riêng sống lâu (vd: theo dõi PRAGMA data_version,
+    giá trị này chỉ so sánh được trên cùng một kết nối).
+    """
+    connection = sqlite3.connect(
+        db_path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        factory=factory
+    )
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    connection.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    connection.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    return connection
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Kết nối SQLite thuộc về một ConnectionPool.
+
+    Gọi close() sẽ trả kết nối về pool thay vì đóng file, nên code cũ
+    (connect -> query -> close) vẫn chạy đúng mà không phải mở lại file.
+
+    Dùng như context manager để kết nối luôn được trả về pool kể cả khi có exception:
+        with get_connection(path) as conn:
+            ...
+    Khác với sqlite3.Connection, khối with KHÔNG tự commit: thay đổi chưa commit
+    bị rollback khi kết nối được trả về pool.
+    """
+
+    _pool = None
+    _checked_out = False
+    _generation = 0
+    _finalizer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.release(self)
+        else:
+            super().close()
+
+    def _really_close(self):
+        self._pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """Pool có giới hạn các kết nối SQLite cho một file database"""
+
+    def __init__(self, db_path: str, max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        """
+        Args:
+            db_path: Đường dẫn tuyệt đối đến file database
+            max_size: Số kết nối tối đa được mở cùng lúc
+            timeout: Thời gian chờ tối đa (giây) khi pool đã hết kết nối
+        """
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        # RLock: _reclaim có thể chạy (do GC) trong lúc chính thread này đang giữ lock
+        self._lock = threading.RLock()
+        self._created = 0
+        self._in_use = 0
+        # Tăng sau mỗi fork; kết nối của thế hệ cũ không được trả về pool
+        self._generation = 0
+        self._collected_at = 0.0
+        self._stats = {"hits": 0, "misses": 0, "waits": 0, "timeouts": 0, "wait_time_ms": 0.0, "leaked": 0}
+        reinit_after_fork(self)
+
+    def _after_fork(self):
+        """
+        Tiến trình con bắt đầu với pool rỗng: kết nối SQLite không được dùng qua fork,
+        kết nối của tiến trình cha được bỏ lại (không đóng) và lock được tạo mới
+        """
+        while True:
+            try:
+                abandon(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        self._idle = queue.LifoQueue()
+        self._lock = threading.RLock()
+        self._created = 0
+        self._in_use = 0
+        self._generation += 1
+
+    def _open(self) -> PooledConnection:
+        """Mở kết nối mới và áp dụng PRAGMA một lần duy nhất"""
+        connection = open_connection(self.db_path, factory=PooledConnection)
+        connection._pool = self
+        connection._generation = self._generation
+        return connection
+
+    def acquire(self, row_factory=None) -> PooledConnection:
+        """
+        Lấy một kết nối từ pool
+
+        Args:
+            row_factory: row_factory gán cho kết nối (vd: sqlite3.Row)
+
+        Returns:
+            Kết nối SQLite, dùng với `with` (hoặc gọi close()) để trả lại pool
+        """
+        try:
+            connection = self._idle.get_nowait()
+            with self._lock:
+                self._stats["hits"] += 1
+                self._in_use += 1
+        except queue.Empty:
+            connection = self._open_reserved() if self._reserve() else self._wait()
+
+        connection.row_factory = row_factory
+        connection._checked_out = True
+        # Kết nối bị bỏ (mất tham chiếu) mà không close(): trả lại chỗ trong pool khi bị thu hồi
+        connection._finalizer = weakref.finalize(connection, self._reclaim, connection._generation)
+        connection._finalizer.atexit = False
+        return connection
+
+    def _wait(self) -> PooledConnection:
+        """Pool đã đầy: chờ kết nối được trả về, hoặc chỗ của kết nối bị bỏ quên được thu hồi"""
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise sqlite3.OperationalError(
+                    f"Connection pool exhausted for {self.db_path} (max_size={self.max_size})"
+                )
+            try:
+                connection = self._idle.get(timeout=min(remaining, _LEAK_CHECK_INTERVAL))
+            except queue.Empty:
+                if self._collect_leaked() and self._reserve():
+                    return self._open_reserved()
+                continue
+            with self._lock:
+                self._stats["waits"] += 1
+                self._stats["wait_time_ms"] += (time.perf_counter() - started) * 1000
+                self._in_use += 1
+            return connection
+
+    def _open_reserved(self) -> PooledConnection:
+        """Mở kết nối cho chỗ đã giữ bằng _reserve(), trả lại chỗ nếu mở lỗi"""
+        try:
+            return self._open()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+                self._in_use -= 1
+            raise
+
+    def _reserve(self) -> bool:
+        """Giữ chỗ cho một kết nối mới nếu pool chưa đủ max_size"""
+        with self._lock:
+            if self._created >= self.max_size:
+                return False
+            self._created += 1
+            self._in_use += 1
+            self._stats["misses"] += 1
+            return True
+
+    def _collect_leaked(self) -> bool:
+        """
+        Pool đã đầy: kết nối bị bỏ mà không close() có thể chưa được thu hồi vì nằm
+        trong vòng tham chiếu (cache statement của sqlite3), chạy GC (tối đa mỗi _LEAK_CHECK_INTERVAL giây)
+
+        Returns:
+            True nếu có kết nối được thu hồi
+        """
+        now = time.monotonic()
+        if now - self._collected_at < _LEAK_CHECK_INTERVAL:
+            return False
+        self._collected_at = now
+        leaked = self._stats["leaked"]
+        gc.collect()
+        return self._stats["leaked"] != leaked
+
+    def _reclaim(self, generation: int):
+        """Kết nối đang mượn bị thu hồi bởi GC mà chưa được trả: giải phóng chỗ của nó"""
+        if generation != self._generation:
+            return
+        with self._lock:
+            self._created -= 1
+            self._in_use -= 1
+            self._stats["leaked"] += 1
+
+    def release(self, connection: PooledConnection):
+        """Trả kết nối về pool, rollback nếu còn transaction dang dở"""
+        # close() gọi hai lần không được đưa kết nối vào pool hai lần
+        if not connection._checked_out:
+            return
+        connection._checked_out = False
+        connection._finalizer.detach()
+        connection._finalizer = None
+        if connection._generation != self._generation:
+            # Kết nối mượn trước khi fork: thuộc tiến trình cha
+            abandon(connection)
+            return
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+            connection.row_factory = None
+        except sqlite3.Error:
+            # Kết nối hỏng, bỏ luôn để lần sau mở kết nối mới
+            with self._lock:
+                self._created -= 1
+                self._in_use -= 1
+            connection._really_close()
+            return
+
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(connection)
+
+    def close_all(self):
+        """Đóng tất cả kết nối đang rảnh"""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
+            connection._really_close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Số liệu của pool để theo dõi khi chạy tải"""
+        with self._lock:
+            return {
+                "db_path": self.db_path,
+                "max_size": self.max_size,
+                "open": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "hits": self._stats["hits"],
+                "misses": self._stats["misses"],
+                "waits": self._stats["waits"],
+                "timeouts": self._stats["timeouts"],
+                "leaked": self._stats["leaked"],
+                "wait_time_ms": round(self._stats["wait_time_ms"], 2)
+            }
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _reset_pools_lock():
+    global _pools_lock
+    _pools_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools_lock)
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Lấy pool dùng chung cho một file database (tạo mới nếu chưa có)"""
+    key = os.path.abspath(db_path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(key)
+                _pools[key] = pool
+    return pool
+
+
+def get_connection(db_path: str, row_factory=None) -> PooledConnection:
+    """Lấy kết nối từ pool của db_path, dùng với `with` (hoặc gọi close()) để trả lại"""
+    return get_pool(db_path).acquire(row_factory)
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Số liệu của tất cả các pool, key là đường dẫn database"""
+    return {path: pool.stats() for path, pool in list(_pools.items())}
@@ -0,0 +1,277 @@
+"""
+Migration runner cho database.db (auth_service, permission, classroom)
+và các database khác truyền danh sách migration riêng (vd: userprofile.db).
+
+Mỗi migration có version tăng dần và được ghi vào bảng schema_migrations.
+Các migration chưa chạy được áp dụng theo thứ tự, mỗi cái trong một
+transaction BEGIN IMMEDIATE, nên nhiều tiến trình khởi động cùng lúc cũng
+chỉ có một tiến trình thực sự chạy migration.
+
+Xem trạng thái và query plan:
+    python -m db.migrations [đường_dẫn_database]
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from db.connection_pool import get_connection
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MAIN_DB_PATH = os.path.join(BASE_DIR, "database.db")
+
+# (bảng kiểm tra, file SQL tạo bảng)
+_BASE_SCHEMAS = [
+    ("auth_service", os.path.join(BASE_DIR, "auth_service", "login_and_register_service", "auth_service.sql")),
+    ("permission", os.path.join(BASE_DIR, "auth_service", "role_permission_service", "permission_service.sql")),
+    ("classes", os.path.join(BASE_DIR, "classroom_service", "classroom.sql")),
+]
+PROGRESS_SQL = os.path.join(BASE_DIR, "progress_feedback", "progress_service", "progress.sql")
+
+# Các query nóng, in EXPLAIN QUERY PLAN trước/sau khi thêm index
+HOT_QUERIES: List[Tuple[str, str, tuple]] = [
+    ("class roster", "SELECT student_id FROM student_class WHERE class_id = ?", ("c",)),
+    ("class dashboard", "SELECT student_id, wins FROM student_class WHERE class_id = ? ORDER BY wins DESC", ("c",)),
+    ("student classes", "SELECT class_id FROM student_class WHERE student_id = ?", ("s",)),
+    ("win increment", "UPDATE student_class SET wins = wins + 1 WHERE class_id = ? AND student_id = ?", ("c", "s")),
+    ("leave class", "DELETE FROM student_class WHERE class_id = ? AND student_id = ?", ("c", "s")),
+    ("questions by criteria", "SELECT * FROM questions WHERE class_id = ? AND difficulty = ? AND q_type = ?", ("c", "easy", "true_false")),
+    ("class question bank", "SELECT * FROM questions WHERE class_id = ?", ("c",)),
+    ("classes by teacher", "SELECT * FROM classes WHERE teacher_id = ?", ("t",)),
+    ("login", "SELECT user_id, password, role FROM auth_service WHERE username = ?", ("u",)),
+    ("permission check", "SELECT student, teacher, admin FROM permission WHERE service = ? AND path = ? AND method = ?", ("user", "get", "POST")),
+    # userprofile.db
+    ("role page (keyset)", "SELECT up.id FROM user_profiles up JOIN student_profiles sp ON sp.id = up.id "
+                           "WHERE up.role = ? AND up.id > ? ORDER BY up.id LIMIT ?", ("student", "", 50)),
+    ("role page (offset)", "SELECT up.id FROM user_profiles up JOIN student_profiles sp ON sp.id = up.id "
+                           "WHERE up.role = ? ORDER BY up.id LIMIT ? OFFSET ?", ("student", 50, 0)),
+]
+
+
+def _split_statements(script: str) -> List[str]:
+    """Tách script SQL thành từng câu lệnh (để chạy trong cùng transaction)"""
+    statements, buffer = [], ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+    # Câu lệnh cuối không có dấu ';' (vd: permission_service.sql)
+    rest = "\n".join(l for l in buffer.splitlines() if not l.strip().startswith("--")).strip()
+    if rest:
+        statements.append(rest)
+    return statements
+
+
+def _table_exists(conn, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)
+    ).fetchone() is not None
+
+
+def _m001_base_tables(conn):
+    """Tạo các bảng gốc nếu chưa có (database cũ đã có bảng thì bỏ qua)"""
+    for table, sql_file in _BASE_SCHEMAS:
+        if _table_exists(conn, table):
+            continue
+        with open(sql_file, "r", encoding="utf-8") as f:
+            for statement in _split_statements(f.read()):
+                conn.execute(statement)
+
+
+def _m002_classroom_indexes(conn):
+    """Index cho student_class, questions, classes và permission"""
+    # Bỏ các dòng membership trùng (giữ dòng nhiều wins nhất) trước khi thêm unique index
+    conn.execute("""
+        DELETE FROM student_class WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY class_id, student_id ORDER BY wins DESC, id
+                ) AS rn
+                FROM student_class
+            ) WHERE rn = 1
+        )
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_student_class_class_student "
+                 "ON student_class(class_id, student_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_student_class_class_wins "
+                 "ON student_class(class_id, wins DESC, student_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_student_class_student "
+                 "ON student_class(student_id, class_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_class_difficulty_type "
+                 "ON questions(class_id, difficulty, q_type)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_classes_teacher ON classes(teacher_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_permission_lookup ON permission(service, path, method)")
+
+
+def _m003_permission_version(conn):
+    """Bộ đếm version của bảng permission, tăng bởi trigger mỗi khi bảng bị ghi"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS permission_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO permission_version (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS permission_version_{event.lower()}
+            AFTER {event} ON permission
+            BEGIN
+                UPDATE permission_version SET version = version + 1 WHERE id = 1;
+            END
+        """)
+
+
+def _m004_question_version(conn):
+    """Bộ đếm version theo lớp của bảng questions, tăng bởi trigger mỗi khi câu hỏi của lớp bị ghi"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS question_version (
+            class_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    """)
+    bump = ("INSERT INTO question_version (class_id, version) VALUES ({row}.class_id, 1) "
+            "ON CONFLICT(class_id) DO UPDATE SET version = version + 1;")
+    rows = {"INSERT": ("NEW",), "UPDATE": ("OLD", "NEW"), "DELETE": ("OLD",)}
+    for event, refs in rows.items():
+        body = "\n".join(bump.format(row=ref) for ref in refs)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS question_version_{event.lower()}
+            AFTER {event} ON questions
+            BEGIN
+                {body}
+            END
+        """)
+
+
+def _m005_progress_tables(conn):
+    """Bảng map_attempts và feedback của progress_service (database cũ đã có bảng thì bỏ qua)"""
+    if _table_exists(conn, "map_attempts") and _table_exists(conn, "feedback"):
+        return
+    with open(PROGRESS_SQL, "r", encoding="utf-8") as f:
+        for statement in _split_statements(f.read()):
+            conn.execute(statement)
+
+
+# (version, tên, hàm migration, có in query plan hay không)
+MIGRATIONS: List[Tuple[int, str, Callable, bool]] = [
+    (1, "base_tables", _m001_base_tables, False),
+    (2, "classroom_indexes", _m002_classroom_indexes, True),
+    (3, "permission_version", _m003_permission_version, False),
+    (4, "question_version", _m004_question_version, False),
+    (5, "progress_tables", _m005_progress_tables, False),
+]
+
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def explain_hot_queries(conn) -> List[Tuple[str, List[str]]]:
+    """EXPLAIN QUERY PLAN của các query nóng (bỏ qua query có bảng chưa tồn tại)"""
+    plans = []
+    for name, sql, params in HOT_QUERIES:
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        except sqlite3.OperationalError:
+            continue
+        plans.append((name, [row[3] for row in rows]))
+    return plans
+
+
+def _print_plans(label: str, plans):
+    print(f"[migrations] EXPLAIN QUERY PLAN ({label})")
+    for name, details in plans:
+        print(f"  {name}: {' | '.join(details)}")
+
+
+def applied_versions(conn) -> List[int]:
+    if not _table_exists(conn, "schema_migrations"):
+        return []
+    return [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version")]
+
+
+def migrate(db_path: str = MAIN_DB_PATH, migrations: Optional[List[Tuple[int, str, Callable, bool]]] = None,
+            verbose: bool = True) -> List[int]:
+    """
+    Áp dụng các migration chưa chạy cho db_path (mỗi file chỉ kiểm tra một lần mỗi tiến trình)
+
+    Args:
+        db_path: Đường dẫn database
+        migrations: Danh sách migration của database đó (mặc định: MIGRATIONS của database.db)
+        verbose: In thông tin migration và query plan
+
+    Returns:
+        Danh sách version vừa được áp dụng
+    """
+    migrations = MIGRATIONS if migrations is None else migrations
+    key = os.path.abspath(db_path)
+    if key in _migrated:
+        return []
+
+    with _migrate_lock:
+        if key in _migrated:
+            return []
+        applied = []
+        conn = get_connection(key)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at INTEGER NOT NULL
+                )
+            """)
+            conn.commit()
+            done_versions = set(applied_versions(conn))
+            for version, name, apply, explain in migrations:
+                if version in done_versions:
+                    continue
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # Kiểm tra lại trong transaction (tiến trình khác có thể vừa chạy xong)
+                    done = conn.execute(
+                        "SELECT 1 FROM schema_migrations WHERE version = ?", (version,)
+                    ).fetchone()
+                    if done:
+                        conn.rollback()
+                        continue
+                    if explain and verbose:
+                        _print_plans(f"before {version}_{name}", explain_hot_queries(conn))
+                    apply(conn)
+                    conn.execute(
+                        "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                        (version, name, int(time.time()))
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                applied.append(version)
+                if verbose:
+                    print(f"[migrations] applied {version}_{name} to {key}")
+                    if explain:
+                        _print_plans(f"after {version}_{name}", explain_hot_queries(conn))
+        finally:
+            conn.close()
+        _migrated.add(key)
+        return applied
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    db_path = argv[0] if argv else MAIN_DB_PATH
+    applied = migrate(db_path)
+    conn = get_connection(db_path)
+    try:
+        print(f"[migrations] {os.path.abspath(db_path)}: versions {applied_versions(conn)}"
+              f" (applied now: {applied or 'none'})")
+        _print_plans("current", explain_hot_queries(conn))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 from game_service.gameroom.game_room_controller import game_room_controller
 class game_service_controller:
-    def __init__(self):
-        self.game_room_controller = game_room_controller()
+    def __init__(self, user_service=None, classroom_service=None):
+        self.game_room_controller = game_room_controller(user_service, classroom_service)
 
     def create_game_room(self, student_id,difficulty,class_id):
         print("Creating game room with student_id:", student_id, "difficulty:", difficulty, "class_id:", class_id)
@@ -14,4 +14,7 @@ class game_service_controller:
         return self.game_room_controller.get_question(session_id,class_id)
 
     def check_answer(self, session_id, answer,question_id):
-        return self.game_room_controller.check_answer(session_id, answer,question_id)
\ No newline at end of file
+        return self.game_room_controller.check_answer(session_id, answer,question_id)
+
+    def get_room_stats(self):
+        return self.game_room_controller.get_room_stats()
@@ -1,37 +1,57 @@
-import random
 from classroom_service.classroom_service import ClassroomService
 from flask import jsonify
 from game_service.question.question import QuestionAbstract
 
 from game_service.question.game_resource_interface import game_resource_interface
+from game_service.question.question_deck import question_deck
+from game_service.question.answer_key import make_answer_key
 
 class game_logic_handler:
-    def __init__(self,player_hp, player_atk, monster_hp, monster_atk,difficulty):
+    __slots__ = ('hp', 'atk', 'monster_hp', 'monster_atk', 'difficulty', 'classroom_service',
+                 'game_resource_interface', 'question', 'deck', 'answer_keys')
+
+    def __init__(self,player_hp, player_atk, monster_hp, monster_atk,difficulty,
+                 classroom_service=None, resource_interface=None):
         self.hp= player_hp
         self.atk= player_atk
         self.monster_hp= monster_hp
         self.monster_atk= monster_atk
         self.difficulty= difficulty
-        self.game_resource_interface = game_resource_interface()
+        # classroom_service / resource_interface được game_service truyền vào và dùng chung giữa các phòng
+        self.classroom_service = classroom_service or ClassroomService()
+        self.game_resource_interface = resource_interface or game_resource_interface(self.classroom_service)
         self.question = None # Placeholder for the question object
-        self.classroom_service = ClassroomService()
+        # Bộ câu hỏi riêng của phòng, nạp khi hỏi câu đầu tiên
+        self.deck = question_deck(self.game_resource_interface, difficulty)
+        self.answer_keys = {}  # question_id -> QuestionAbstract, chấm điểm trong bộ nhớ
 
     def get_question(self,class_id):
-        question_type = random.randint(1, 4)
-        question = self.game_resource_interface.get_question(class_id,self.difficulty, question_type)
-        print(question)
-        print("stopstopstop")
-        return question
+        question = self.deck.draw(class_id)
+        print(question.id if question else None)
+        if question and question.id not in self.answer_keys:
+            self.answer_keys[question.id] = make_answer_key(question)
+        return jsonify([question.to_dict()] if question else [])
+
+    def _get_answer_key(self, question_id):
+        """Đáp án của câu hỏi; chỉ đọc database nếu câu hỏi không lấy từ deck của phòng"""
+        answer_key = self.answer_keys.get(question_id)
+        if answer_key is None:
+            question = self.classroom_service.get_question_by_id(question_id)
+            if question is None:
+                return None
+            answer_key = make_answer_key(question)
+            self.answer_keys[question_id] = answer_key
+        return answer_key
 
     def check_answer(self, answer,question_id):
-        print("debug2")
-        difficulty,question,answer_true = self.classroom_service.get_question_by_id_minimal(question_id)
-        print("debug")
-        print("dap an dung la:" ,answer_true)
+        answer_key = self._get_answer_key(question_id)
+        if answer_key is None:
+            return {"status": "error", "error": "Question not found"}
+        print("dap an dung la:" ,answer_key.answer)
         print("Monster HP:", self.monster_hp)
         print("Attack Dmg:", self.monster_atk)
         print("Player HP:", self.hp)
-        if answer_true == answer:
+        if answer_key.check_answer(answer):
             print("Correct!")
             self.monster_hp -= self.atk
             if self.monster_hp <= 0:
@@ -2,9 +2,8 @@ from flask import jsonify
 from game_service.gameroom.gameroom_service import game_service
 
 class game_room_controller:
-    def __init__(self):
-        self.game_service = game_service()
-        pass
+    def __init__(self, user_service=None, classroom_service=None):
+        self.game_service = game_service(user_service, classroom_service)
 
     def create_game_room(self, student_id,difficulty,class_id):
         if student_id:
@@ -21,4 +20,7 @@ class game_room_controller:
         return self.game_service.get_question(session_id,class_id)
 
     def check_answer(self, session_id, answer,question_id):
-        return self.game_service.check_answer(session_id, answer,question_id)
\ No newline at end of file
+        return self.game_service.check_answer(session_id, answer,question_id)
+
+    def get_room_stats(self):
+        return jsonify(self.game_service.get_room_stats()), 200
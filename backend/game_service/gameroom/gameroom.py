@@ -1,8 +1,7 @@
-from user_profile_service.user.user_service import UserProfileService as userService
-from game_service.monster.monster_service import monster_service
 class gameroom:
+    __slots__ = ('student_id', 'money_win', 'session_id', 'difficulty', 'monster', 'status', 'game_logic_handler')
+
     def __init__(self,session_id,student_id,game_logic_handler,difficulty,monster,money_win):
-        self.user_service = userService()
         self.student_id=student_id
         self.money_win= money_win
         self.session_id= session_id
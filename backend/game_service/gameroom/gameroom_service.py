@@ -2,17 +2,24 @@ from flask import jsonify
 
 from game_service.gameroom.game_logic_handler import game_logic_handler
 from game_service.gameroom.gameroom import gameroom
+from game_service.gameroom.room_reaper import room_reaper
 from game_service.monster.monster_service import monster_service
+from game_service.question.game_resource_interface import game_resource_interface
+from classroom_service.classroom_service import ClassroomService
 from user_profile_service.user.user_service import UserProfileService as userService
 import uuid
-from threading import Timer
 class game_service:
-    def __init__(self):
+    def __init__(self, user_service=None, classroom_service=None):
         self.game_room = gameroom
         self.game_room_list = {}
         self.student_id_to_session_id = {}
-        self.user_service = userService()
+        # Các service dùng chung cho mọi phòng, tạo một lần (hoặc được truyền vào)
+        self.user_service = user_service or userService()
+        self.classroom_service = classroom_service or ClassroomService(self.user_service)
+        self.resource_interface = game_resource_interface(self.classroom_service)
         self.monster_service = monster_service()
+        # Một thread nền xóa phòng đã kết thúc hoặc bị bỏ dở
+        self.reaper = room_reaper(self.trigger_game_room_deletion)
 
     def create_game_room(self, student_id, difficulty, class_id):
         try:
@@ -29,7 +36,9 @@ class game_service:
                 hp, atk,
                 monster.monster_hp,
                 monster.monster_atk,
-                difficulty
+                difficulty,
+                self.classroom_service,
+                self.resource_interface
             )
             room = self.game_room(
                 session_id, student_id, logic,
@@ -39,6 +48,7 @@ class game_service:
             print(f"Creating game room with session_id: {session_id}, student_id: {student_id}, difficulty: {difficulty}, class_id: {class_id}, hp: {hp}, atk: {atk}")
             self.game_room_list[session_id] = room
             self.student_id_to_session_id[student_id] = session_id
+            self.reaper.track(session_id)
             return jsonify({
                 "session_id": session_id,
                 "student_id": student_id,
@@ -64,35 +74,43 @@ class game_service:
         return room.status if room else None
 
     def get_question(self,session_id,class_id):
-        room = self.game_room_list.get(session_id).game_logic_handler
+        room = self.game_room_list.get(session_id)
         if room:
-            return room.get_question(class_id)
-        return None
+            self.reaper.touch(session_id)
+            return room.game_logic_handler.get_question(class_id)
+        return jsonify({"error": "Game room not found"}), 404
 
     def check_answer(self,session_id,answer,question_id):
-        room = self.game_room_list.get(session_id).game_logic_handler
+        room = self.game_room_list.get(session_id)
         if room:
-            result = room.check_answer(answer,question_id)
+            self.reaper.touch(session_id)
+            result = room.game_logic_handler.check_answer(answer,question_id)
             if result["status"] == "win":
-                self.game_room_list[session_id].status = 1
-                Timer(30 * 60, self.trigger_game_room_deletion, args=[session_id]).start()
+                room.status = 1
+                self.reaper.finish(session_id)
                 return jsonify(result)
             elif result["status"] == "lose":
-                self.game_room_list[session_id].status = 2
-                Timer(30 * 60, self.trigger_game_room_deletion, args=[session_id]).start()
+                room.status = 2
+                self.reaper.finish(session_id)
                 return jsonify(result)
             else:
                 return jsonify(result)
-        return None
+        return jsonify({"error": "Game room not found"}), 404
 
     def trigger_game_room_deletion(self, session_id):
-        if session_id in self.game_room_list:
-            del self.game_room_list[session_id]
-            for student_id, sid in list(self.student_id_to_session_id.items()):
-                if sid == session_id:
-                    del self.student_id_to_session_id[student_id]
-                    print(f"Game room {session_id} has been deleted due to inactivity.")
-                    break
-        else:
+        room = self.game_room_list.pop(session_id, None)
+        if room is None:
             print(f"Game room {session_id} not found for deletion, might already removed")
+            return
+        self.reaper.forget(session_id)
+        # Chỉ xóa mapping nếu student chưa tạo phòng mới
+        if self.student_id_to_session_id.get(room.student_id) == session_id:
+            del self.student_id_to_session_id[room.student_id]
+        print(f"Game room {session_id} has been deleted due to inactivity.")
+
+    def get_room_stats(self):
+        """Số phòng đang sống / đã hết hạn"""
+        stats = self.reaper.stats()
+        stats["rooms_in_memory"] = len(self.game_room_list)
+        return stats
 
@@ -0,0 +1,143 @@
+import heapq
+import os
+import threading
+import time
+
+from common.fork_safety import reinit_after_fork
+
+# Phòng đã kết thúc (thắng/thua) được giữ lại bao lâu trước khi xóa (giây)
+FINISHED_ROOM_TTL = float(os.getenv("GAME_ROOM_FINISHED_TTL", str(30 * 60)))
+# Phòng không có hoạt động trong bao lâu thì bị xem là bỏ dở (giây)
+IDLE_ROOM_TIMEOUT = float(os.getenv("GAME_ROOM_IDLE_TIMEOUT", str(30 * 60)))
+
+
+class room_reaper:
+    """
+    Một thread nền duy nhất xóa các phòng game đã kết thúc hoặc bị bỏ dở.
+
+    Deadline được giữ trong một heap. touch() chỉ cập nhật thời điểm hoạt động
+    cuối (O(1)); khi entry trong heap tới hạn, deadline thật được tính lại và
+    entry được đẩy lại nếu phòng vẫn còn hoạt động, nên heap chỉ có khoảng
+    một entry cho mỗi phòng.
+    """
+
+    def __init__(self, on_expire, finished_ttl=FINISHED_ROOM_TTL, idle_timeout=IDLE_ROOM_TIMEOUT):
+        """
+        Args:
+            on_expire: Hàm được gọi với session_id khi phòng hết hạn
+            finished_ttl: Thời gian giữ phòng sau khi kết thúc (giây)
+            idle_timeout: Thời gian tối đa không có hoạt động (giây)
+        """
+        self.on_expire = on_expire
+        self.finished_ttl = finished_ttl
+        self.idle_timeout = idle_timeout
+        self._heap = []             # (deadline, session_id)
+        self._last_activity = {}    # session_id -> thời điểm hoạt động cuối
+        self._finished_at = {}      # session_id -> thời điểm kết thúc
+        self._condition = threading.Condition()
+        self._thread = None
+        self._expired_idle = 0
+        self._expired_finished = 0
+        reinit_after_fork(self)
+
+    def _after_fork(self):
+        # Thread nền không sống qua fork: tạo lại ở lần track/touch/finish tiếp theo
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def _deadline(self, session_id):
+        finished_at = self._finished_at.get(session_id)
+        if finished_at is not None:
+            return finished_at + self.finished_ttl
+        return self._last_activity[session_id] + self.idle_timeout
+
+    def _push(self, deadline, session_id):
+        heapq.heappush(self._heap, (deadline, session_id))
+        if self._heap[0][1] == session_id:
+            # Deadline mới sớm hơn, đánh thức thread để chờ lại
+            self._condition.notify()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="game-room-reaper", daemon=True)
+            self._thread.start()
+
+    def track(self, session_id):
+        """Bắt đầu theo dõi một phòng mới"""
+        now = time.time()
+        with self._condition:
+            self._last_activity[session_id] = now
+            self._finished_at.pop(session_id, None)
+            self._push(now + self.idle_timeout, session_id)
+            self._ensure_thread()
+
+    def touch(self, session_id):
+        """Ghi nhận hoạt động của phòng (lùi thời điểm hết hạn do idle)"""
+        with self._condition:
+            if session_id in self._last_activity:
+                self._last_activity[session_id] = time.time()
+                self._ensure_thread()
+
+    def finish(self, session_id):
+        """Đánh dấu phòng đã kết thúc, phòng sẽ bị xóa sau finished_ttl"""
+        now = time.time()
+        with self._condition:
+            if session_id not in self._last_activity or session_id in self._finished_at:
+                return
+            self._finished_at[session_id] = now
+            self._push(now + self.finished_ttl, session_id)
+            self._ensure_thread()
+
+    def forget(self, session_id):
+        """Ngừng theo dõi phòng (entry còn trong heap sẽ bị bỏ qua khi tới hạn)"""
+        with self._condition:
+            self._last_activity.pop(session_id, None)
+            self._finished_at.pop(session_id, None)
+
+    def _pop_expired(self):
+        """Lấy các phòng đã hết hạn; trả về (danh sách, thời gian chờ tới deadline tiếp theo)"""
+        expired = []
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, session_id = heapq.heappop(self._heap)
+            if session_id not in self._last_activity:
+                continue  # đã bị xóa hoặc là entry cũ
+            deadline = self._deadline(session_id)
+            if deadline > now:
+                heapq.heappush(self._heap, (deadline, session_id))
+                continue
+            if session_id in self._finished_at:
+                self._expired_finished += 1
+            else:
+                self._expired_idle += 1
+            del self._last_activity[session_id]
+            self._finished_at.pop(session_id, None)
+            expired.append(session_id)
+        wait = self._heap[0][0] - now if self._heap else None
+        return expired, wait
+
+    def _run(self):
+        while True:
+            with self._condition:
+                expired, wait = self._pop_expired()
+                if not expired:
+                    self._condition.wait(wait)
+                    continue
+            for session_id in expired:
+                try:
+                    self.on_expire(session_id)
+                except Exception as e:
+                    print(f"Failed to delete game room {session_id}: {e}")
+
+    def stats(self):
+        """Số phòng đang sống / đã hết hạn"""
+        with self._condition:
+            finished = len(self._finished_at)
+            return {
+                "live_rooms": len(self._last_activity),
+                "playing_rooms": len(self._last_activity) - finished,
+                "finished_rooms": finished,
+                "expired_idle": self._expired_idle,
+                "expired_finished": self._expired_finished,
+                "scheduled_entries": len(self._heap)
+            }
@@ -1,4 +1,6 @@
 class monster:
+    __slots__ = ('monster_hp', 'monster_atk', 'money_win')
+
     def __init__(self):
         self.monster_hp = 0
         self.monster_atk = 0
@@ -0,0 +1,28 @@
+from game_service.question.question_fill_in_the_blank import question_fill_in_the_blank
+from game_service.question.question_multiple_choice import question_multiple_choice
+from game_service.question.question_true_false import question_true_false
+from game_service.question.question4 import question4
+
+
+def make_answer_key(question):
+    """
+    Tạo đối tượng QuestionAbstract dùng để chấm điểm từ một Question (classroom_model)
+
+    - fill_in_the_blank: đáp án đã chuẩn hóa
+    - multiple_choice: set các đáp án đúng
+    - single_choice: vị trí (index) của đáp án đúng
+    - true_false: chuỗi đáp án
+    """
+    choices = list(question.choices or [])
+    correct_index = question.correct_index
+    correct = choices[correct_index] if 0 <= correct_index < len(choices) else None
+    ans1, ans2, ans3, ans4 = (choices + [None] * 4)[:4]
+
+    if question.type == "fill_in_the_blank":
+        return question_fill_in_the_blank(question.difficulty, question.question, correct or "")
+    if question.type == "multiple_choice":
+        answers = {correct} if correct is not None else set()
+        return question_multiple_choice(question.difficulty, question.question, ans1, ans2, ans3, ans4, answers)
+    if question.type == "single_choice":
+        return question4(question.difficulty, question.question, ans1, ans2, ans3, ans4, correct, correct_index)
+    return question_true_false(question.difficulty, question.question, correct)
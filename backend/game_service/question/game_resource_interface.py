@@ -8,9 +8,8 @@ from game_service.question.question4 import question4
 from classroom_service.classroom_service import ClassroomService as classroom_service
 
 class game_resource_interface:
-    def __init__(self):
-        self.classroom_service = classroom_service()
-        pass
+    def __init__(self, classroom_service_obj=None):
+        self.classroom_service = classroom_service_obj or classroom_service()
 
     def get_question(self,class_id, difficulty,qtype):
         QUESTION_TYPES = {
@@ -25,6 +24,10 @@ class game_resource_interface:
         print("stopstopstopstop")
         return jsonify(question)
 
+    def load_questions(self, class_id, difficulty):
+        """Nạp toàn bộ câu hỏi của lớp theo độ khó (dùng cho question_deck)"""
+        return self.classroom_service.get_questions(class_id, difficulty)
+
     # Question type:
     # 1: Multiple choice: difficulty, question, ans1, ans2, ans3, ans4, right_answer[array]
     # 2: True/False: difficulty, question, answer
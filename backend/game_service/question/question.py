@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 
 class QuestionAbstract(ABC):
+    __slots__ = ('difficulty', 'question', 'answer')
+
     def __init__(self, difficulty, question,answer):
         self.difficulty = difficulty
         self.question = question
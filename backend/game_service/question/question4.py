@@ -2,17 +2,23 @@ from game_service.question.question import QuestionAbstract
 from flask import jsonify
 
 class question4(QuestionAbstract):
-    def __init__(self, difficulty, question, ans1, ans2, ans3, ans4, answer):
+    __slots__ = ('ans1', 'ans2', 'ans3', 'ans4', 'answer_index')
+
+    def __init__(self, difficulty, question, ans1, ans2, ans3, ans4, answer, answer_index=None):
         super().__init__(difficulty, question, answer)
         self.ans1=ans1
         self.ans2=ans2
         self.ans3=ans3
         self.ans4=ans4
+        self.answer_index = answer_index
     def check_answer(self,answer):
-        if answer==self.answer:
+        # Chấp nhận cả nội dung đáp án lẫn vị trí (index) của đáp án.
+        # Index phải đúng kiểu int: JSON true/false là bool (True == 1) và không phải index
+        if self.answer is not None and answer == self.answer:
+            return True
+        if self.answer_index is not None and type(answer) is int and answer == self.answer_index:
             return True
-        else:
-            return False
+        return False
 
     def get_choices(self):
         return [self.ans1, self.ans2, self.ans3, self.ans4]
@@ -0,0 +1,46 @@
+import random
+
+
+class question_deck:
+    """
+    Bộ câu hỏi đã xáo trộn của một phòng game.
+
+    Câu hỏi của lớp (theo độ khó của phòng) được nạp bằng một query, xáo trộn
+    rồi lấy dần từ bộ nhớ nên không lặp lại cho đến khi hết bộ. Khi hết, bộ
+    được nạp lại (để lấy cả câu hỏi giáo viên mới thêm) và xáo trộn lại.
+    """
+    __slots__ = ('resource_interface', 'difficulty', 'class_id', '_cards', '_last_id', 'loads')
+
+    def __init__(self, resource_interface, difficulty):
+        self.resource_interface = resource_interface
+        self.difficulty = difficulty
+        self.class_id = None
+        self._cards = []
+        self._last_id = None
+        self.loads = 0
+
+    def _refill(self):
+        questions = list(self.resource_interface.load_questions(self.class_id, self.difficulty))
+        random.shuffle(questions)
+        # Tránh ra lại câu vừa hỏi ngay đầu bộ mới
+        if len(questions) > 1 and questions[-1].id == self._last_id:
+            questions[0], questions[-1] = questions[-1], questions[0]
+        self._cards = questions
+        self.loads += 1
+
+    def draw(self, class_id):
+        """Lấy câu hỏi tiếp theo, None nếu lớp không có câu hỏi nào"""
+        if class_id != self.class_id:
+            self.class_id = class_id
+            self._cards = []
+            self._last_id = None
+        if not self._cards:
+            self._refill()
+        if not self._cards:
+            return None
+        question = self._cards.pop()
+        self._last_id = question.id
+        return question
+
+    def remaining(self):
+        return len(self._cards)
@@ -5,11 +5,14 @@ def normalize(text):
     return re.sub(r'\W+', '', text.lower())
 
 class question_fill_in_the_blank(QuestionAbstract):
+    __slots__ = ('normalized_answer',)
+
     def __init__(self, difficulty, question,answer):
         super().__init__(difficulty, question,answer)
+        self.normalized_answer = normalize(answer)
 
     def check_answer(self, answer):
-        return normalize(answer) == normalize(self.answer)
+        return normalize(str(answer)) == self.normalized_answer
 
     def get_choices(self):
         return ""
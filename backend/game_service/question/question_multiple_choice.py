@@ -3,6 +3,8 @@ import array
 from flask import jsonify
 
 class question_multiple_choice(QuestionAbstract):
+    __slots__ = ('ans1', 'ans2', 'ans3', 'ans4')
+
     def __init__(self, difficulty, question, ans1, ans2, ans3, ans4, answer:array):
         super().__init__(difficulty, question,answer)
         self.ans1 = ans1
@@ -11,7 +13,11 @@ class question_multiple_choice(QuestionAbstract):
         self.ans4 = ans4
 
     def check_answer(self, selected):
-        return selected in self.answer
+        # self.answer là set các đáp án đúng
+        try:
+            return selected in self.answer
+        except TypeError:
+            return False
 
     def get_choices(self):
         return [self.ans1, self.ans2, self.ans3, self.ans4]
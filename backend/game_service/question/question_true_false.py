@@ -1,6 +1,8 @@
 from game_service.question.question import QuestionAbstract
 from flask import jsonify
 class question_true_false(QuestionAbstract):
+    __slots__ = ()
+
     def __init__(self, difficulty, question, answer):
         super().__init__(difficulty, question,answer)
 
@@ -15,7 +15,7 @@ class FeedbackController:
                 "status": "healthy",
                 "service": "feedback",
                 "uptime_seconds": int(time.time() - self.progress_service._startup_time),
-                "total_feedback": len(self.progress_service.feedback),
+                "total_feedback": self.progress_service.progress_repository.count_feedback(),
                 "focus": "map_feedback_system"
             }), 200
         except Exception as e:
@@ -0,0 +1,68 @@
+import bisect
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class MapLeaderboard:
+    """
+    Sorted leaderboard index for one map.
+
+    Keeps only the best passed result per user, ordered by
+    (-percent_correct, completion_time). Updated incrementally on each
+    recorded attempt, so reads never rescan attempt history.
+    """
+
+    def __init__(self, map_number: int):
+        self.map_number = map_number
+        self._keys: List[Tuple[float, int, str]] = []   # sorted (-percent, time, user_id)
+        self._best: Dict[str, Dict[str, Any]] = {}        # user_id -> best entry
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(user_id: str, entry: Dict[str, Any]) -> Tuple[float, int, str]:
+        return (-entry["percent_correct"], entry["completion_time"], user_id)
+
+    def record(self, map_result: Dict[str, Any]) -> bool:
+        """Add a passed result; returns True if it became the user's new best"""
+        user_id = map_result["user_id"]
+        entry = {
+            "user_id": user_id,
+            "score": map_result["score"],
+            "max_score": map_result["max_score"],
+            "percent_correct": map_result["percent_correct"],
+            "completion_time": map_result["completion_time"],
+            "completed_at": map_result["completed_at"]
+        }
+        new_key = self._key(user_id, entry)
+
+        with self._lock:
+            current = self._best.get(user_id)
+            if current is not None:
+                old_key = self._key(user_id, current)
+                if old_key <= new_key:
+                    return False
+                del self._keys[bisect.bisect_left(self._keys, old_key)]
+            bisect.insort(self._keys, new_key)
+            self._best[user_id] = entry
+            return True
+
+    def top(self, k: int = 10) -> List[Dict[str, Any]]:
+        """Top-k entries in O(k)"""
+        with self._lock:
+            return [dict(self._best[key[2]]) for key in self._keys[:k]]
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """1-based rank of a user in O(log n), None if the user has no passed result"""
+        with self._lock:
+            entry = self._best.get(user_id)
+            if entry is None:
+                return None
+            return bisect.bisect_left(self._keys, self._key(user_id, entry)) + 1
+
+    def best(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._best.get(user_id)
+            return dict(entry) if entry else None
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -0,0 +1,54 @@
+import threading
+from typing import Dict, Any
+
+
+class MapStatistics:
+    """
+    Running aggregates of every attempt on one map.
+
+    Updated once per recorded attempt, so statistics are answered in
+    constant time no matter how many attempts are stored.
+    """
+
+    def __init__(self, map_number: int):
+        self.map_number = map_number
+        self.total_attempts = 0
+        self.passed_attempts = 0
+        self.sum_percent = 0.0
+        self.sum_time = 0
+        self.difficulty_counts = {"Easy": 0, "Normal": 0, "Hard": 0}
+        self._lock = threading.Lock()
+
+    def record(self, map_result: Dict[str, Any]) -> None:
+        """Add one attempt (passed or not) to the aggregates"""
+        difficulty = map_result.get("difficulty", "Normal")
+        with self._lock:
+            self.total_attempts += 1
+            if map_result.get("passed", False):
+                self.passed_attempts += 1
+            self.sum_percent += map_result["percent_correct"]
+            self.sum_time += map_result["completion_time"]
+            self.difficulty_counts[difficulty] = self.difficulty_counts.get(difficulty, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Statistics in the /progress/map/statistics response format"""
+        with self._lock:
+            total = self.total_attempts
+            if not total:
+                return {
+                    "map_number": self.map_number,
+                    "total_attempts": 0,
+                    "passed_attempts": 0,
+                    "pass_rate": 0,
+                    "average_score": 0,
+                    "average_time": 0
+                }
+            return {
+                "map_number": self.map_number,
+                "total_attempts": total,
+                "passed_attempts": self.passed_attempts,
+                "pass_rate": round(self.passed_attempts / total * 100, 2),
+                "average_score": round(self.sum_percent / total * 100, 2),
+                "average_time": round(self.sum_time / total, 2),
+                "difficulty_breakdown": dict(self.difficulty_counts)
+            }
@@ -0,0 +1,31 @@
+-- Lịch sử các lần chơi map (cả pass và không pass)
+CREATE TABLE IF NOT EXISTS map_attempts (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    map_number INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    max_score INTEGER NOT NULL,
+    percent_correct REAL NOT NULL,
+    completion_time INTEGER NOT NULL,
+    difficulty TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    rewards TEXT,                -- JSON, NULL nếu không pass
+    completed_at INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_map_attempts_user ON map_attempts(user_id);
+CREATE INDEX IF NOT EXISTS idx_map_attempts_map_passed ON map_attempts(map_number, passed);
+
+-- Feedback sinh ra sau mỗi lần pass map
+CREATE TABLE IF NOT EXISTS feedback (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    map_number INTEGER,
+    data TEXT NOT NULL,          -- JSON của toàn bộ feedback
+    created_at INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_feedback_id ON feedback(id);
+CREATE INDEX IF NOT EXISTS idx_feedback_user ON feedback(user_id);
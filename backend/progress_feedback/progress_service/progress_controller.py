@@ -78,7 +78,15 @@ class ProgressController:
                     "error": "map_number required"
                 }), 400
 
-            result = self.progress_service.get_map_leaderboard(map_number)
+            try:
+                limit = int(data.get('limit', 10))
+            except (TypeError, ValueError):
+                return jsonify({
+                    "success": False,
+                    "error": "limit must be an integer"
+                }), 400
+
+            result = self.progress_service.get_map_leaderboard(map_number, limit, data.get('user_id'))
             
             if result.get('success'):
                 return jsonify(result), 200
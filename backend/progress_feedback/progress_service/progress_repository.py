@@ -0,0 +1,327 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from common.fork_safety import abandon, reinit_after_fork
+from common.lru_cache import LRUCache
+from db.connection_pool import get_connection, open_connection
+from db.migrations import migrate
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DB_PATH = os.path.join(BASE_DIR, "database.db")
+
+# Số user tối đa được giữ lịch sử trong bộ nhớ
+HISTORY_CACHE_SIZE = int(os.getenv("PROGRESS_HISTORY_CACHE_SIZE", "1024"))
+# Số feedback tối đa trong index theo ID
+FEEDBACK_INDEX_SIZE = int(os.getenv("PROGRESS_FEEDBACK_INDEX_SIZE", "8192"))
+# Khoảng thời gian tối thiểu (giây) giữa hai lần kiểm tra attempts/feedback do tiến trình khác ghi
+PROGRESS_POLL_INTERVAL = float(os.getenv("PROGRESS_POLL_INTERVAL", "1"))
+
+FEEDBACK_ID_PREFIX = "feedback_"
+
+_ATTEMPT_COLUMNS = ("id, user_id, map_number, score, max_score, percent_correct, "
+                    "completion_time, difficulty, passed, rewards, completed_at")
+
+
+def make_feedback_id(user_id: str, map_number: int, created_at: int, suffix: str) -> str:
+    """
+    Tạo ID feedback có chứa user sở hữu
+
+    Định dạng: feedback_{user_id}_{map_number}_{created_at}_{suffix}
+    """
+    return f"{FEEDBACK_ID_PREFIX}{user_id}_{map_number}_{created_at}_{suffix}"
+
+
+class ProgressRepository:
+    """
+    Lưu map attempts và feedback vào SQLite.
+
+    Lịch sử gần đây của từng user được giữ trong LRU có giới hạn, đọc qua
+    cache (read-through) và cập nhật cache khi ghi (write-through).
+
+    Bảng được dùng chung giữa các tiến trình worker: refresh() theo dõi
+    PRAGMA data_version trên một kết nối riêng (không đọc đĩa), khi thay đổi thì
+    đọc các dòng có seq lớn hơn seq đã biết và bỏ lịch sử trong cache của các
+    user đó. Kiểm tra tối đa mỗi poll_interval giây, trước mỗi lần đọc.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, cache_size: int = HISTORY_CACHE_SIZE,
+                 feedback_index_size: int = FEEDBACK_INDEX_SIZE, poll_interval: float = PROGRESS_POLL_INTERVAL):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self._attempts_cache = LRUCache(cache_size)
+        self._feedback_cache = LRUCache(cache_size)
+        self._feedback_by_id = LRUCache(feedback_index_size)  # feedback_id -> feedback
+        # Giữ cho việc nạp cache khi miss và ghi mới không xen kẽ nhau
+        self._write_lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._data_version = None
+        self._checked_at = 0.0
+        # Bảng map_attempts/feedback được tạo bởi migration runner dùng chung cho database.db
+        migrate(self.db_path)
+        # seq lớn nhất đã được phản ánh trong cache
+        self._attempts_seq, self._feedback_seq = self._max_seqs()
+        reinit_after_fork(self)
+
+    def _after_fork(self):
+        # Kết nối theo dõi của tiến trình cha bị bỏ lại (không đóng)
+        self._write_lock = threading.Lock()
+        abandon(self._connection)
+        self._connection = None
+        self._pid = None
+        self._data_version = None
+        self._checked_at = 0.0
+
+    def _max_seqs(self) -> Tuple[int, int]:
+        conn = get_connection(self.db_path)
+        try:
+            return (conn.execute("SELECT COALESCE(MAX(seq), 0) FROM map_attempts").fetchone()[0],
+                    conn.execute("SELECT COALESCE(MAX(seq), 0) FROM feedback").fetchone()[0])
+        finally:
+            conn.close()
+
+    def _get_watch_connection(self):
+        # data_version chỉ so sánh được trên cùng một kết nối, mỗi tiến trình một kết nối
+        pid = os.getpid()
+        if self._connection is None or self._pid != pid:
+            self._connection = open_connection(self.db_path)
+            self._pid = pid
+            self._data_version = None
+        return self._connection
+
+    def _apply_changes(self, conn) -> None:
+        """Bỏ cache của user có attempt/feedback mới hơn seq đã biết (gọi khi giữ _write_lock)"""
+        rows = conn.execute(
+            "SELECT seq, user_id FROM map_attempts WHERE seq > ? ORDER BY seq", (self._attempts_seq,)
+        ).fetchall()
+        for _, user_id in rows:
+            self._attempts_cache.invalidate(user_id)
+        if rows:
+            self._attempts_seq = rows[-1][0]
+
+        rows = conn.execute(
+            "SELECT seq, user_id FROM feedback WHERE seq > ? ORDER BY seq", (self._feedback_seq,)
+        ).fetchall()
+        for _, user_id in rows:
+            self._feedback_cache.invalidate(user_id)
+        if rows:
+            self._feedback_seq = rows[-1][0]
+
+    def refresh(self) -> None:
+        """Đồng bộ cache với các dòng do tiến trình khác ghi (tối đa mỗi poll_interval giây)"""
+        if time.monotonic() - self._checked_at < self.poll_interval:
+            return
+        with self._write_lock:
+            if time.monotonic() - self._checked_at < self.poll_interval:
+                return
+            connection = self._get_watch_connection()
+            data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                self._apply_changes(connection)
+                self._data_version = data_version
+            self._checked_at = time.monotonic()
+
+    @property
+    def attempt_seq(self) -> int:
+        """seq của attempt mới nhất đã biết (tăng khi ghi hoặc khi refresh thấy dòng mới)"""
+        return self._attempts_seq
+
+    @staticmethod
+    def _row_to_attempt(row) -> Dict[str, Any]:
+        """Chuyển một dòng map_attempts thành dict map_result"""
+        attempt = {
+            "id": row[0],
+            "user_id": row[1],
+            "map_number": row[2],
+            "score": row[3],
+            "max_score": row[4],
+            "percent_correct": row[5],
+            "completion_time": row[6],
+            "difficulty": row[7],
+            "passed": bool(row[8])
+        }
+        if row[9] is not None:
+            attempt["rewards"] = json.loads(row[9])
+        attempt["completed_at"] = row[10]
+        return attempt
+
+    # ----- Map attempts -----
+
+    def add_attempt(self, map_result: Dict[str, Any]) -> int:
+        """
+        Lưu một attempt và cập nhật lịch sử trong cache (nếu user đang được cache)
+
+        Returns:
+            seq của dòng vừa ghi
+        """
+        rewards = map_result.get("rewards")
+        with self._write_lock:
+            conn = get_connection(self.db_path)
+            try:
+                cursor = conn.execute(
+                    f"INSERT INTO map_attempts ({_ATTEMPT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        map_result["id"], map_result["user_id"], map_result["map_number"],
+                        map_result["score"], map_result["max_score"], map_result["percent_correct"],
+                        map_result["completion_time"], map_result["difficulty"],
+                        1 if map_result.get("passed", False) else 0,
+                        json.dumps(rewards) if rewards is not None else None,
+                        map_result["completed_at"]
+                    )
+                )
+                conn.commit()
+                seq = cursor.lastrowid
+                if seq == self._attempts_seq + 1:
+                    # Không có dòng nào của tiến trình khác xen giữa: cập nhật cache tại chỗ
+                    self._attempts_seq = seq
+                    cached = self._attempts_cache.peek(map_result["user_id"])
+                    if cached is not None:
+                        cached.append(map_result)
+                else:
+                    self._apply_changes(conn)
+            finally:
+                conn.close()
+            return seq
+
+    def get_user_attempts(self, user_id: str) -> List[Dict[str, Any]]:
+        """Toàn bộ attempts của user theo thứ tự thời gian"""
+        self.refresh()
+        cached = self._attempts_cache.get(user_id)
+        if cached is None:
+            with self._write_lock:
+                cached = self._attempts_cache.peek(user_id)
+                if cached is None:
+                    conn = get_connection(self.db_path)
+                    try:
+                        rows = conn.execute(
+                            f"SELECT {_ATTEMPT_COLUMNS} FROM map_attempts WHERE user_id = ? ORDER BY seq",
+                            (user_id,)
+                        ).fetchall()
+                    finally:
+                        conn.close()
+                    cached = [self._row_to_attempt(row) for row in rows]
+                    self._attempts_cache.put(user_id, cached)
+        return list(cached)
+
+    def iter_attempts(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Duyệt toàn bộ attempts theo từng batch (dùng khi dựng lại index lúc khởi động)"""
+        for _, attempt in self.attempts_after(0, batch_size):
+            yield attempt
+
+    def attempts_after(self, after_seq: int, batch_size: int = 1000) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Các attempt có seq > after_seq theo thứ tự ghi, dạng (seq, attempt)"""
+        last_seq = after_seq
+        while True:
+            conn = get_connection(self.db_path)
+            try:
+                rows = conn.execute(
+                    f"SELECT seq, {_ATTEMPT_COLUMNS} FROM map_attempts WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (last_seq, batch_size)
+                ).fetchall()
+            finally:
+                conn.close()
+            if not rows:
+                return
+            for row in rows:
+                yield row[0], self._row_to_attempt(row[1:])
+            last_seq = rows[-1][0]
+
+    def count_attempts(self) -> int:
+        conn = get_connection(self.db_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM map_attempts").fetchone()[0]
+        finally:
+            conn.close()
+
+    def count_tracked_users(self) -> int:
+        """Số user đã có ít nhất một attempt"""
+        conn = get_connection(self.db_path)
+        try:
+            return conn.execute("SELECT COUNT(DISTINCT user_id) FROM map_attempts").fetchone()[0]
+        finally:
+            conn.close()
+
+    # ----- Feedback -----
+
+    def add_feedback(self, feedback: Dict[str, Any]) -> None:
+        """Lưu một feedback và cập nhật cache của user"""
+        with self._write_lock:
+            conn = get_connection(self.db_path)
+            try:
+                cursor = conn.execute(
+                    "INSERT INTO feedback (id, user_id, map_number, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (feedback["id"], feedback["user_id"], feedback.get("map_number"),
+                     json.dumps(feedback), feedback["created_at"])
+                )
+                conn.commit()
+                if cursor.lastrowid == self._feedback_seq + 1:
+                    self._feedback_seq = cursor.lastrowid
+                    cached = self._feedback_cache.peek(feedback["user_id"])
+                    if cached is not None:
+                        cached.append(feedback)
+                else:
+                    self._apply_changes(conn)
+            finally:
+                conn.close()
+            self._feedback_by_id.put(feedback["id"], feedback)
+
+    def get_user_feedback(self, user_id: str) -> List[Dict[str, Any]]:
+        """Toàn bộ feedback của user theo thứ tự tạo"""
+        self.refresh()
+        cached = self._feedback_cache.get(user_id)
+        if cached is None:
+            with self._write_lock:
+                cached = self._feedback_cache.peek(user_id)
+                if cached is None:
+                    conn = get_connection(self.db_path)
+                    try:
+                        rows = conn.execute(
+                            "SELECT data FROM feedback WHERE user_id = ? ORDER BY seq", (user_id,)
+                        ).fetchall()
+                    finally:
+                        conn.close()
+                    cached = [json.loads(row[0]) for row in rows]
+                    self._feedback_cache.put(user_id, cached)
+                    for feedback in cached:
+                        self._feedback_by_id.put(feedback["id"], feedback)
+        return list(cached)
+
+    def get_feedback_by_id(self, feedback_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Tìm feedback theo ID: index theo ID trong bộ nhớ, không có thì một query
+        theo idx_feedback_id (không nạp lịch sử của user)
+        """
+        feedback = self._feedback_by_id.get(feedback_id)
+        if feedback is not None:
+            return feedback
+
+        conn = get_connection(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT data FROM feedback WHERE id = ? ORDER BY seq LIMIT 1", (feedback_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        feedback = json.loads(row[0])
+        self._feedback_by_id.put(feedback_id, feedback)
+        return feedback
+
+    def count_feedback(self) -> int:
+        conn = get_connection(self.db_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+        finally:
+            conn.close()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Số liệu của LRU lịch sử attempts/feedback"""
+        return {
+            "attempts": self._attempts_cache.stats(),
+            "feedback": self._feedback_cache.stats(),
+            "feedback_by_id": self._feedback_by_id.stats()
+        }
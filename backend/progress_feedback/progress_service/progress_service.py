@@ -1,17 +1,26 @@
+import threading
 import time
+import uuid
 from typing import Dict, Any, List
 from user_profile_service.user.user import StudentProfile
+from progress_feedback.progress_service.map_leaderboard import MapLeaderboard
+from progress_feedback.progress_service.map_statistics import MapStatistics
+from progress_feedback.progress_service.progress_repository import ProgressRepository, make_feedback_id
 
 class ProgressService:
     """Progress service focused on map progression"""
     
-    def __init__(self, user_service, admin_service):
+    def __init__(self, user_service, admin_service, progress_repository: ProgressRepository = None):
         self.user_service = user_service
         self.admin_service = admin_service
-        self.map_results = {}  # Dict[user_id, List[MapResult]]
-        self.feedback = {}     # ✅ THÊM: Dict[user_id, List[Feedback]]
+        self.progress_repository = progress_repository or ProgressRepository()  # map attempts + feedback
+        self.leaderboards = {}  # Dict[map_number, MapLeaderboard] - best passed result per user
+        self.map_stats = {}     # Dict[map_number, MapStatistics] - running aggregates per map
+        self._indexed_seq = 0   # seq of the newest attempt reflected in the indexes
+        self._index_lock = threading.Lock()
         self.difficulty_evaluator = DifficultyEvaluator()
         self._startup_time = time.time()
+        self.rebuild_indexes()
 
     def complete_map(self, user_id: str, map_number: int, score: int, max_score: int, 
                      completion_time: int, difficulty: str = "Normal") -> dict:
@@ -80,10 +89,8 @@ class ProgressService:
                     "completed_at": int(time.time())
                 }
                 
-                # Lưu vào memory
-                if user_id not in self.map_results:
-                    self.map_results[user_id] = []
-                self.map_results[user_id].append(map_result)
+                # Lưu vào database
+                self._record_attempt(map_result)
                 
                 return {
                     "success": True,
@@ -95,19 +102,23 @@ class ProgressService:
                 }
             
             # Complete map thành công
-            map_completed = user.complete_map(map_number)
+            map_rewards = self._calculate_map_rewards(map_number, percent_correct, difficulty)
+
+            def apply_rewards(student):
+                # Gọi lại trên bản đọc mới nếu profile bị ghi đồng thời (vd: nâng cấp kiếm trừ tiền)
+                if not isinstance(student, StudentProfile) or not student.complete_map(map_number):
+                    return False
+                # Cập nhật points và money khi complete map
+                student.points += map_rewards["points"]
+                student.money += map_rewards["money"]
+                return True
+
+            # Lưu user với map progression mới (chỉ ghi nếu version của profile chưa đổi)
+            user, map_completed = self.user_service.user_repository.update(user_id, apply_rewards, user)
             
             if not map_completed:
                 return {"success": False, "error": f"Map {map_number} already completed or out of order"}
             
-            # Cập nhật points và money khi complete map
-            map_rewards = self._calculate_map_rewards(map_number, percent_correct, difficulty)
-            user.points += map_rewards["points"]
-            user.money += map_rewards["money"]
-            
-            # Lưu user với map progression mới
-            self.user_service.user_repository.save(user)
-            
             # Lưu map result
             map_result = {
                 "id": f"{user_id}_map_{map_number}_{int(time.time())}",
@@ -123,9 +134,7 @@ class ProgressService:
                 "completed_at": int(time.time())
             }
 
-            if user_id not in self.map_results:
-                self.map_results[user_id] = []
-            self.map_results[user_id].append(map_result)
+            self._record_attempt(map_result)
 
             # ✅ THÊM: Auto-generate feedback
             feedback_result = self.generate_feedback(user_id, map_result)
@@ -185,7 +194,7 @@ class ProgressService:
             map_progress = user.get_map_progress()
             
             # Lấy history của các map attempts
-            user_results = self.map_results.get(user_id, [])
+            user_results = self.progress_repository.get_user_attempts(user_id)
             
             return {
                 "success": True,
@@ -198,32 +207,70 @@ class ProgressService:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def get_map_leaderboard(self, map_number: int) -> dict:
-        """Get leaderboard for specific map"""
+    def _record_attempt(self, map_result: dict) -> None:
+        """Store an attempt and update the per-map indexes"""
+        seq = self.progress_repository.add_attempt(map_result)
+        self._refresh_indexes(seq)
+
+    def _refresh_indexes(self, min_seq: int = 0) -> None:
+        """
+        Index attempts stored after the last indexed seq, by this or another worker.
+
+        The repository notices other workers' writes through PRAGMA data_version,
+        so this is a no-op until the map_attempts table actually grows.
+        """
+        self.progress_repository.refresh()
+        if max(min_seq, self.progress_repository.attempt_seq) <= self._indexed_seq:
+            return
+        with self._index_lock:
+            for seq, map_result in self.progress_repository.attempts_after(self._indexed_seq):
+                self._index_attempt(map_result)
+                self._indexed_seq = seq
+
+    def _index_attempt(self, map_result: dict) -> None:
+        """Update leaderboard and running statistics with one attempt"""
+        map_number = map_result["map_number"]
+        stats = self.map_stats.get(map_number)
+        if stats is None:
+            stats = self.map_stats.setdefault(map_number, MapStatistics(map_number))
+        stats.record(map_result)
+        if map_result.get("passed", False):
+            self._get_leaderboard(map_number).record(map_result)
+
+    def rebuild_indexes(self) -> dict:
+        """Recompute leaderboards and map statistics from the stored attempt history"""
+        with self._index_lock:
+            self.leaderboards = {}
+            self.map_stats = {}
+            self._indexed_seq = 0
+            total = 0
+            for seq, map_result in self.progress_repository.attempts_after(0):
+                self._index_attempt(map_result)
+                self._indexed_seq = seq
+                total += 1
+        return {"success": True, "attempts_indexed": total, "maps": len(self.map_stats)}
+
+    def _get_leaderboard(self, map_number: int) -> MapLeaderboard:
+        """Get (or create) the leaderboard index for a map"""
+        leaderboard = self.leaderboards.get(map_number)
+        if leaderboard is None:
+            leaderboard = self.leaderboards.setdefault(map_number, MapLeaderboard(map_number))
+        return leaderboard
+
+    def get_map_leaderboard(self, map_number: int, limit: int = 10, user_id: str = None) -> dict:
+        """Get leaderboard for specific map (top-K from the incremental index)"""
         try:
-            leaderboard = []
-            
-            for user_id, results in self.map_results.items():
-                map_results = [r for r in results if r["map_number"] == map_number and r["passed"]]
-                if map_results:
-                    best_result = max(map_results, key=lambda x: x["percent_correct"])
-                    leaderboard.append({
-                        "user_id": user_id,
-                        "score": best_result["score"],
-                        "max_score": best_result["max_score"],
-                        "percent_correct": best_result["percent_correct"],
-                        "completion_time": best_result["completion_time"],
-                        "completed_at": best_result["completed_at"]
-                    })
-            
-            # Sort by percent_correct descending, then by completion_time ascending
-            leaderboard.sort(key=lambda x: (-x["percent_correct"], x["completion_time"]))
-            
-            return {
+            self._refresh_indexes()
+            leaderboard = self.leaderboards.get(map_number)
+            result = {
                 "success": True,
                 "map_number": map_number,
-                "leaderboard": leaderboard[:10]  # Top 10
+                "leaderboard": leaderboard.top(limit) if leaderboard else []
             }
+            if user_id:
+                result["user_rank"] = leaderboard.rank(user_id) if leaderboard else None
+                result["total_ranked"] = len(leaderboard) if leaderboard else 0
+            return result
             
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -233,8 +280,9 @@ class ProgressService:
         return {
             "status": "healthy",
             "uptime_seconds": int(time.time() - self._startup_time),
-            "total_users_tracked": len(self.map_results),
-            "total_map_attempts": sum(len(results) for results in self.map_results.values()),
+            "total_users_tracked": self.progress_repository.count_tracked_users(),
+            "total_map_attempts": self.progress_repository.count_attempts(),
+            "history_cache": self.progress_repository.cache_stats(),
             "focus": "map_progression_system"
         }
 
@@ -290,8 +338,9 @@ class ProgressService:
                 elif completion_time > 300:  # 5 minutes
                     suggestions.append("Try to improve speed")
             
+            created_at = int(time.time())
             feedback = {
-                "id": f"feedback_{user_id}_{map_number}_{int(time.time())}",
+                "id": make_feedback_id(user_id, map_number, created_at, uuid.uuid4().hex[:6]),
                 "user_id": user_id,
                 "map_number": map_number,
                 "performance_level": performance_level,
@@ -304,13 +353,11 @@ class ProgressService:
                 "weak_points": weak_points,
                 "suggestions": suggestions,
                 "next_steps": next_steps,
-                "created_at": int(time.time())
+                "created_at": created_at
             }
             
             # Save feedback
-            if user_id not in self.feedback:
-                self.feedback[user_id] = []
-            self.feedback[user_id].append(feedback)
+            self.progress_repository.add_feedback(feedback)
             
             return {"success": True, "feedback": feedback}
             
@@ -320,7 +367,7 @@ class ProgressService:
     def get_user_feedback(self, user_id: str) -> dict:
         """Get all feedback for user"""
         try:
-            user_feedback = self.feedback.get(user_id, [])
+            user_feedback = self.progress_repository.get_user_feedback(user_id)
             return {
                 "success": True,
                 "user_id": user_id,
@@ -331,68 +378,26 @@ class ProgressService:
             return {"success": False, "error": str(e)}
 
     def get_feedback_by_id(self, feedback_id: str) -> dict:
-        """Get specific feedback by ID"""
+        """Get specific feedback by ID (ID index, falls back to the indexed database lookup)"""
         try:
-            for user_id, feedbacks in self.feedback.items():
-                for feedback in feedbacks:
-                    if feedback.get('id') == feedback_id:
-                        return {"success": True, "feedback": feedback}
+            feedback = self.progress_repository.get_feedback_by_id(feedback_id)
+            if feedback:
+                return {"success": True, "feedback": feedback}
             
             return {"success": False, "error": "Feedback not found"}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
     def get_map_statistics(self, map_number: int) -> dict:
-        """Get statistics for specific map"""
+        """Get statistics for specific map (constant time from running aggregates)"""
         try:
-            all_attempts = []
-            passed_attempts = []
-            
-            for user_id, results in self.map_results.items():
-                map_attempts = [r for r in results if r["map_number"] == map_number]
-                all_attempts.extend(map_attempts)
-                passed_attempts.extend([r for r in map_attempts if r.get("passed", False)])
-            
-            if not all_attempts:
-                return {
-                    "success": True,
-                    "map_number": map_number,
-                    "total_attempts": 0,
-                    "passed_attempts": 0,
-                    "pass_rate": 0,
-                    "average_score": 0,
-                    "average_time": 0
-                }
-            
-            total_attempts = len(all_attempts)
-            passed_count = len(passed_attempts)
-            pass_rate = (passed_count / total_attempts) * 100 if total_attempts > 0 else 0
-            
-            avg_score = sum(r["percent_correct"] for r in all_attempts) / total_attempts * 100
-            avg_time = sum(r["completion_time"] for r in all_attempts) / total_attempts
-            
-            return {
-                "success": True,
-                "map_number": map_number,
-                "total_attempts": total_attempts,
-                "passed_attempts": passed_count,
-                "pass_rate": round(pass_rate, 2),
-                "average_score": round(avg_score, 2),
-                "average_time": round(avg_time, 2),
-                "difficulty_breakdown": self._get_difficulty_breakdown(all_attempts)
-            }
+            self._refresh_indexes()
+            stats = self.map_stats.get(map_number) or MapStatistics(map_number)
+            return {"success": True, **stats.to_dict()}
             
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def _get_difficulty_breakdown(self, attempts: list) -> dict:
-        """Get breakdown by difficulty"""
-        breakdown = {"Easy": 0, "Normal": 0, "Hard": 0}
-        for attempt in attempts:
-            difficulty = attempt.get("difficulty", "Normal")
-            breakdown[difficulty] = breakdown.get(difficulty, 0) + 1
-        return breakdown
-
     def get_user_progress_summary(self, user_id: str) -> dict:
         """Get comprehensive progress summary for user"""
         try:
@@ -406,7 +411,7 @@ class ProgressService:
             feedbacks = feedback_result.get('feedbacks', []) if feedback_result.get('success') else []
             
             # Calculate performance trends
-            user_results = self.map_results.get(user_id, [])
+            user_results = map_progress_result.get('map_history', [])
             passed_maps = [r for r in user_results if r.get("passed", False)]
             
             performance_trend = []
@@ -0,0 +1,218 @@
+"""
+Production entry point: chạy app dưới WSGI server nhiều worker (tắt debug).
+
+  - N tiến trình worker (pre-fork) dùng chung một socket đang listen,
+    mỗi worker phục vụ request bằng một thread pool có giới hạn
+  - app (kết nối database, thread nền, cache) được tạo trong từng worker SAU fork;
+    tiến trình cha chỉ mở socket và giám sát (worker chết thì được tạo lại)
+  - readiness: /readyz trả 200 sau khi worker chạy xong warm_up()
+  - graceful drain (SIGTERM/SIGINT): /readyz trả 503, chờ WEB_DRAIN_GRACE giây,
+    ngừng nhận kết nối mới, xử lý nốt request đã nhận (tối đa WEB_DRAIN_TIMEOUT giây)
+
+Mặc định một tiến trình nhiều thread. Với WEB_WORKERS > 1, dữ liệu dùng chung giữa
+các worker nằm trong database:
+  - ghi profile có điều kiện version (save_user, apply_sword_upgrade): bản đọc cũ
+    không ghi đè được thay đổi của worker khác, request được đọc lại và thử lại
+  - cache profile, permission, leaderboard, thống kê map, lịch sử progress và ngân hàng
+    câu hỏi theo dõi PRAGMA data_version và được làm mới sau tối đa *_POLL_INTERVAL giây
+Phòng game vẫn chỉ tồn tại trong bộ nhớ của worker tạo ra nó (mỗi phòng thuộc một
+student): cần sticky session theo client.
+
+Chạy từ thư mục backend:
+    python serve.py --workers 1 --threads 16 --port 5000
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("WEB_PORT", "5000"))
+# Số tiến trình worker và số thread xử lý request của mỗi worker
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "16"))
+WEB_BACKLOG = int(os.getenv("WEB_BACKLOG", "1024"))
+# Thời gian báo not-ready trước khi ngừng nhận kết nối, và thời gian chờ request dở dang (giây)
+WEB_DRAIN_GRACE = float(os.getenv("WEB_DRAIN_GRACE", "0"))
+WEB_DRAIN_TIMEOUT = float(os.getenv("WEB_DRAIN_TIMEOUT", "30"))
+WEB_ACCESS_LOG = os.getenv("WEB_ACCESS_LOG", "0") == "1"
+
+
+class RequestHandler(WSGIRequestHandler):
+    # Mỗi kết nối một request: kết nối keep-alive rảnh không giữ thread của pool
+    protocol_version = "HTTP/1.0"
+    access_log = WEB_ACCESS_LOG
+
+    def log_request(self, code="-", size="-"):
+        if self.access_log:
+            super().log_request(code, size)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """WSGI server của werkzeug, request được xử lý bởi một thread pool có giới hạn"""
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads, fd=None):
+        super().__init__(host, port, app, handler=RequestHandler, fd=fd)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+
+    def process_request(self, request, client_address):
+        # Kết nối chờ trong hàng đợi của pool khi mọi thread đang bận
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def drain(self, timeout: float) -> bool:
+        """Chờ các request đã nhận xử lý xong; False nếu hết thời gian chờ"""
+        waiter = threading.Thread(target=self.pool.shutdown, kwargs={"wait": True}, daemon=True)
+        waiter.start()
+        waiter.join(timeout)
+        return not waiter.is_alive()
+
+
+def open_listener(host: str, port: int, backlog: int = WEB_BACKLOG) -> socket.socket:
+    """Socket listen dùng chung cho mọi worker (mở trước khi fork)"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    listener.set_inheritable(True)
+    return listener
+
+
+def run_worker(listener: socket.socket, threads: int, drain_grace: float, drain_timeout: float) -> int:
+    """
+    Chạy một worker tới khi nhận SIGTERM/SIGINT
+
+    Returns:
+        Exit code: 0 nếu drain xong, 1 nếu còn request khi hết thời gian chờ
+    """
+    # App (và mọi kết nối/thread của nó) được tạo trong tiến trình worker
+    from app import create_app
+    app = create_app()
+    app.lifecycle.warm_up()
+
+    server = PooledWSGIServer(listener.getsockname()[0], listener.getsockname()[1], app, threads,
+                              fd=listener.fileno())
+
+    def shutdown():
+        app.lifecycle.begin_drain()
+        time.sleep(drain_grace)
+        server.shutdown()
+
+    def on_signal(signum, frame):
+        # serve_forever chạy ở thread chính: shutdown() phải gọi từ thread khác
+        threading.Thread(target=shutdown, name="drain", daemon=True).start()
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+    print(f"[worker {os.getpid()}] ready on {listener.getsockname()} with {threads} threads", flush=True)
+    server.serve_forever()
+    # Không nhận thêm kết nối (với một worker, socket gốc vẫn còn backlog nếu không đóng)
+    listener.close()
+    drained = server.drain(drain_timeout)
+    print(f"[worker {os.getpid()}] stopped ({'drained' if drained else 'drain timeout'})", flush=True)
+    return 0 if drained else 1
+
+
+class Supervisor:
+    """Tiến trình cha: fork worker, tạo lại worker bị chết, chuyển tín hiệu dừng cho worker"""
+
+    def __init__(self, listener, workers, threads, drain_grace, drain_timeout):
+        self.listener = listener
+        self.workers = workers
+        self.threads = threads
+        self.drain_grace = drain_grace
+        self.drain_timeout = drain_timeout
+        self.children = set()
+        self.stopping = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                code = run_worker(self.listener, self.threads, self.drain_grace, self.drain_timeout)
+            except BaseException as e:
+                print(f"[worker {os.getpid()}] crashed: {e}", file=sys.stderr, flush=True)
+            finally:
+                sys.stdout.flush()
+                os._exit(code)
+        self.children.add(pid)
+
+    def stop(self, signum, frame) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        deadline = None
+        while self.children:
+            if self.stopping and deadline is None:
+                deadline = time.monotonic() + self.drain_grace + self.drain_timeout + 5
+            if deadline is not None and time.monotonic() > deadline:
+                for pid in self.children:
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.2)
+                continue
+            self.children.discard(pid)
+            if not self.stopping:
+                print(f"[supervisor] worker {pid} exited ({status}), restarting", file=sys.stderr, flush=True)
+                time.sleep(1)   # tránh vòng lặp fork liên tục khi worker lỗi ngay lúc khởi động
+                self.spawn()
+        self.listener.close()
+        return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Production WSGI server for the English game backend")
+    parser.add_argument("--host", default=WEB_HOST)
+    parser.add_argument("--port", type=int, default=WEB_PORT)
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS, help="Số tiến trình worker")
+    parser.add_argument("--threads", type=int, default=WEB_THREADS, help="Số thread mỗi worker")
+    parser.add_argument("--drain-grace", type=float, default=WEB_DRAIN_GRACE)
+    parser.add_argument("--drain-timeout", type=float, default=WEB_DRAIN_TIMEOUT)
+    args = parser.parse_args()
+
+    listener = open_listener(args.host, args.port)
+    if args.workers > 1:
+        print(f"[supervisor {os.getpid()}] {args.workers} workers x {args.threads} threads "
+              f"on {args.host}:{args.port} (in-memory game rooms are per worker: use sticky sessions)", flush=True)
+        return Supervisor(listener, args.workers, args.threads, args.drain_grace, args.drain_timeout).run()
+    return run_worker(listener, args.threads, args.drain_grace, args.drain_timeout)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
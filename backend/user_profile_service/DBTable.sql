@@ -24,6 +24,7 @@ CREATE TABLE IF NOT EXISTS student_profiles (
     current_map INTEGER DEFAULT 1,         -- Bản đồ hiện tại
     maps_completed TEXT DEFAULT '[]',      -- JSON array các bản đồ đã hoàn thành
     max_map_unlocked INTEGER DEFAULT 1,     -- Bản đồ cao nhất đã mở khóa
+    version INTEGER NOT NULL DEFAULT 0,     -- Tăng mỗi lần cập nhật (optimistic concurrency)
     FOREIGN KEY (id) REFERENCES user_profiles(id) ON DELETE CASCADE
 
 );
@@ -47,12 +48,13 @@ CREATE TABLE IF NOT EXISTS items (
     max_level INTEGER DEFAULT 1,          -- Cấp độ tối đa có thể nâng cấp
     created_at INTEGER NOT NULL,          -- Thời gian tạo (Unix timestamp)
     owner_id TEXT,                        -- ID người sở hữu (NULL nếu là template)
-    is_template BOOLEAN DEFAULT 0         -- 1 nếu là template, 0 nếu là vật phẩm cá nhân
+    is_template BOOLEAN DEFAULT 0,        -- 1 nếu là template, 0 nếu là vật phẩm cá nhân
+    version INTEGER NOT NULL DEFAULT 0    -- Tăng mỗi lần cập nhật (optimistic concurrency)
 );
 
 -- Tạo các index để tăng tốc độ truy vấn
 CREATE INDEX IF NOT EXISTS idx_user_email ON user_profiles(email);
-CREATE INDEX IF NOT EXISTS idx_user_role ON user_profiles(role);
+CREATE INDEX IF NOT EXISTS idx_user_role_id ON user_profiles(role, id);
 CREATE INDEX IF NOT EXISTS idx_student_level ON student_profiles(language_level);
 CREATE INDEX IF NOT EXISTS idx_item_owner ON items(owner_id);
 CREATE INDEX IF NOT EXISTS idx_item_template ON items(is_template);
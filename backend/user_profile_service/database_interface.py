@@ -1,9 +1,104 @@
 import sqlite3
 import os
+import threading
 import json
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 import uuid
 import time
+from functools import lru_cache
+from db.connection_pool import get_connection
+from db.migrations import migrate
+
+
+class ProfileVersionConflict(Exception):
+    """Dòng student_profiles đã bị ghi (version khác) kể từ lúc profile được đọc"""
+
+
+def _m001_row_versions(conn):
+    """Thêm cột version cho student_profiles và items (database tạo trước khi có cột này)"""
+    for table in ("student_profiles", "items"):
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if "version" not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+
+def _m002_role_id_index(conn):
+    """Index (role, id) cho _get_role_page: lọc theo role và ORDER BY id không cần temp B-tree"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_role_id ON user_profiles(role, id)")
+    # idx_user_role là tiền tố của index mới
+    conn.execute("DROP INDEX IF EXISTS idx_user_role")
+
+
+def _m003_profile_versions(conn):
+    """
+    Thêm cột version cho user_profiles và teacher_profiles (tăng mỗi lần dòng bị ghi),
+    ProfileCache so sánh để biết profile trong cache đã bị tiến trình khác ghi
+    """
+    for table in ("user_profiles", "teacher_profiles"):
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if "version" not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+
+# Migration của userprofile.db (version, tên, hàm, in query plan)
+USER_PROFILE_MIGRATIONS = [
+    (1, "row_versions", _m001_row_versions, False),
+    (2, "role_id_index", _m002_role_id_index, True),
+    (3, "profile_versions", _m003_profile_versions, False),
+]
+
+# Cột được save_user / save_item cập nhật (key trong dict trùng tên cột) và giá trị mặc định khi INSERT.
+# created_at chỉ được ghi khi tạo dòng mới.
+_USER_COLUMNS = {'email': None, 'role': 'student', 'last_login': None}
+_STUDENT_COLUMNS = {
+    'language_level': 1, 'points': 0, 'money': 100, 'hp': 100, 'atk': 10, 'items': [],
+    'current_map': 1, 'maps_completed': [], 'max_map_unlocked': 1
+}
+_TEACHER_COLUMNS = {'subjects': []}
+_ITEM_COLUMNS = {
+    'name': None, 'description': None, 'price': 0, 'effect': 0, 'type': None,
+    'level': 1, 'max_level': 1, 'owner_id': None, 'is_template': False
+}
+
+
+def _columns_to_write(columns: Dict[str, Any], data: Dict[str, Any],
+                      changed: Optional[set]) -> Tuple[str, ...]:
+    """Các cột cần ghi: field đã thay đổi, hoặc mọi field có trong data nếu changed là None"""
+    if changed is None:
+        return tuple(column for column in columns if column in data)
+    return tuple(column for column in columns if column in changed)
+
+
+@lru_cache(maxsize=256)
+def _upsert_sql(table: str, insert_columns: Tuple[str, ...], update_columns: Tuple[str, ...],
+                bump_version: bool = False, guard_version: bool = False) -> str:
+    """
+    INSERT ... ON CONFLICT(id) DO UPDATE chỉ SET các cột trong update_columns
+
+    guard_version: chỉ UPDATE khi version của dòng bằng tham số cuối cùng
+    (optimistic concurrency, không có dòng nào thay đổi nếu version đã khác)
+    """
+    assignments = [f"{column} = excluded.{column}" for column in update_columns]
+    if assignments and bump_version:
+        assignments.append(f"version = {table}.version + 1")
+    action = f"DO UPDATE SET {', '.join(assignments)}" if assignments else "DO NOTHING"
+    if assignments and guard_version:
+        action += f" WHERE {table}.version = ?"
+    return (f"INSERT INTO {table} ({', '.join(insert_columns)}) "
+            f"VALUES ({', '.join('?' * len(insert_columns))}) ON CONFLICT(id) {action}")
+
+
+def _json_text(value) -> str:
+    """Giá trị cột JSON: chuỗi JSON giữ nguyên, list/dict thì json.dumps"""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value if value is not None else [])
+
+
+# File database đã kiểm tra/tạo schema trong tiến trình này (đường dẫn tuyệt đối)
+_schema_checked = set()
+_schema_lock = threading.Lock()
+
 
 class DatabaseInterface:
     def __init__(self, db_path="userprofile.db"):
@@ -15,20 +110,30 @@ class DatabaseInterface:
         """
         # Kiểm tra thư mục hiện tại cho đường dẫn tương đối
         self.db_path = db_path
-        self.connection = sqlite3.connect(self.db_path)
-        self.cursor = self.connection.cursor()
-        
-        # Kiểm tra các bảng đã tồn tại chưa
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='user_profiles'")
-        table_exists = self.cursor.fetchone() is not None
-        
-        # Nếu chưa, tạo bảng từ file SQL
-        if not table_exists:
-            self._create_tables_from_sql()
-        
-        self.cursor.close()
-        self.connection.close()
-        print("Database initialized")
+        # Schema chỉ kiểm tra một lần mỗi file database mỗi tiến trình,
+        # các repository tạo sau dùng lại kết quả (không mở kết nối)
+        key = os.path.abspath(db_path)
+        if key in _schema_checked:
+            return
+
+        with _schema_lock:
+            if key in _schema_checked:
+                return
+            with self._get_connection() as self.connection:
+                self.cursor = self.connection.cursor()
+
+                # Kiểm tra các bảng đã tồn tại chưa
+                self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='user_profiles'")
+                table_exists = self.cursor.fetchone() is not None
+
+                # Nếu chưa, tạo bảng từ file SQL
+                if not table_exists:
+                    self._create_tables_from_sql()
+
+                self.cursor.close()
+            migrate(self.db_path, USER_PROFILE_MIGRATIONS)
+            _schema_checked.add(key)
+            print("Database initialized")
     
     def _create_tables_from_sql(self):
         """Tạo các bảng từ file SQL"""
@@ -83,125 +188,110 @@ class DatabaseInterface:
             raise e
     
     def _get_connection(self):
-        """Tạo kết nối mới đến database"""
-        return sqlite3.connect(self.db_path)
+        """Lấy kết nối từ pool dùng chung của database (close() để trả lại pool)"""
+        return get_connection(self.db_path)
 
 
 class UserProfileDatabaseInterface(DatabaseInterface):
     """Interface cho các thao tác với user_profiles trong database"""
     
-    def save_user(self, user_data: Dict[str, Any]) -> int:
+    def save_user(self, user_data: Dict[str, Any], changed_fields: Optional[Iterable[str]] = None,
+                  expected_version: Optional[int] = None) -> int:
         """
-        Lưu thông tin người dùng vào database
+        Lưu thông tin người dùng vào database (upsert, mỗi bảng một câu lệnh)
         
         Args:
             user_data: Dictionary chứa thông tin người dùng
+            changed_fields: Các field đã thay đổi so với lúc đọc; None = ghi mọi field có trong user_data.
+                Bảng không có field nào thay đổi sẽ không bị ghi.
+            expected_version: version của student_profiles lúc đọc; dòng chỉ được cập nhật nếu
+                version chưa đổi. Khi ghi thành công, user_data['version'] là version mới.
             
         Returns:
             ID của người dùng đã lưu
+
+        Raises:
+            ProfileVersionConflict nếu student_profiles đã bị ghi kể từ lúc đọc (không có gì được lưu)
         """
+        changed = None if changed_fields is None else set(changed_fields)
+        user_id = user_data.get('id')
+        role = user_data.get('role', 'student')
+        # Đổi role thì ghi đủ profile để chắc chắn dòng profile của role mới tồn tại
+        profile_changed = changed is None or 'role' in changed
+
+        statements = []
+        # Vị trí câu lệnh student_profiles có điều kiện version trong statements
+        guarded = None
+        base_columns = _columns_to_write(_USER_COLUMNS, user_data, changed)
+        if user_id and base_columns:
+            statements.append((
+                _upsert_sql('user_profiles', ('id', 'email', 'role', 'created_at', 'last_login'), base_columns,
+                            bump_version=True),
+                (user_id, user_data.get('email'), role, user_data.get('created_at'), user_data.get('last_login'))
+            ))
+
+        if role == 'student':
+            student_columns = _columns_to_write(
+                _STUDENT_COLUMNS, user_data, None if profile_changed else changed
+            )
+            if student_columns or not user_id:
+                values = {column: user_data.get(column, default) for column, default in _STUDENT_COLUMNS.items()}
+                values['items'] = _json_text(values['items'])
+                values['maps_completed'] = _json_text(values['maps_completed'])
+                params = (user_id,) + tuple(values.values())
+                guard = bool(user_id and student_columns and expected_version is not None)
+                if guard:
+                    guarded = len(statements)
+                    params += (expected_version,)
+                statements.append((
+                    _upsert_sql('student_profiles', ('id',) + tuple(_STUDENT_COLUMNS), student_columns,
+                                bump_version=True, guard_version=guard),
+                    params
+                ))
+        elif role == 'teacher':
+            teacher_columns = _columns_to_write(
+                _TEACHER_COLUMNS, user_data, None if profile_changed else changed
+            )
+            if teacher_columns or not user_id:
+                statements.append((
+                    _upsert_sql('teacher_profiles', ('id', 'subjects'), teacher_columns, bump_version=True),
+                    (user_id, _json_text(user_data.get('subjects', [])))
+                ))
+
+        if user_id and not statements:
+            return user_id
+
         connection = self._get_connection()
         cursor = connection.cursor()
         
         try:
-            # Kiểm tra người dùng đã tồn tại chưa
-            user_id = user_data.get('id')
-            if user_id:
-                cursor.execute("SELECT id FROM user_profiles WHERE id = ?", (user_id,))
-                exists = cursor.fetchone() is not None
-            else:
-                exists = False
-            
-            if exists:
-                # Cập nhật thông tin cơ bản
-                cursor.execute("""
-                    UPDATE user_profiles 
-                    SET email = ?, role = ?, last_login = ? 
-                    WHERE id = ?
-                """, (
-                    user_data.get('email'),
-                    user_data.get('role'),
-                    user_data.get('last_login'),
-                    user_id
-                ))
-            else:
-                # Thêm người dùng mới
+            if not user_id:
+                # Thêm người dùng mới chưa có ID
                 cursor.execute("""
                     INSERT INTO user_profiles (email, role, created_at, last_login)
                     VALUES (?, ?, ?, ?)
                 """, (
                     user_data.get('email'),
-                    user_data.get('role'),
+                    role,
                     user_data.get('created_at'),
                     user_data.get('last_login')
                 ))
                 user_id = cursor.lastrowid
-            
-            # Xác định loại người dùng để lưu chi tiết
-            role = user_data.get('role', 'student')
-            
-            if role == 'student':
-                # Kiểm tra profile học sinh đã tồn tại chưa
-                cursor.execute("SELECT id FROM student_profiles WHERE id = ?", (user_id,))
-                student_exists = cursor.fetchone() is not None
-                
-                if student_exists:
-                    # Cập nhật profile học sinh
-                    cursor.execute("""
-                        UPDATE student_profiles 
-                        SET language_level = ?, points = ?, money = ?, hp = ?, atk = ?, items = ? 
-                        WHERE id = ?
-                    """, (
-                        user_data.get('language_level', 1),
-                        user_data.get('points', 0),
-                        user_data.get('money', 100),
-                        user_data.get('hp', 100),
-                        user_data.get('atk', 10),
-                        json.dumps(user_data.get('items', [])),
-                        user_id
-                    ))
-                else:
-                    # Thêm profile học sinh mới
-                    cursor.execute("""
-                        INSERT INTO student_profiles (id, language_level, points, money, hp, atk, items)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        user_id,
-                        user_data.get('language_level', 1),
-                        user_data.get('points', 0),
-                        user_data.get('money', 100),
-                        user_data.get('hp', 100),
-                        user_data.get('atk', 10),
-                        json.dumps(user_data.get('items', []))
-                    ))
-            elif role == 'teacher':
-                # Kiểm tra profile giáo viên đã tồn tại chưa
-                cursor.execute("SELECT id FROM teacher_profiles WHERE id = ?", (user_id,))
-                teacher_exists = cursor.fetchone() is not None
-                
-                if teacher_exists:
-                    # Cập nhật profile giáo viên
-                    cursor.execute("""
-                        UPDATE teacher_profiles 
-                        SET subjects = ?
-                        WHERE id = ?
-                    """, (
-                        json.dumps(user_data.get('subjects', [])),
-                        user_id
-                    ))
-                else:
-                    # Thêm profile giáo viên mới
-                    cursor.execute("""
-                        INSERT INTO teacher_profiles (id, subjects)
-                        VALUES (?, ?)
-                    """, (
-                        user_id,
-                        json.dumps(user_data.get('subjects', []))
-                    ))
+                statements = [(sql, (user_id,) + params[1:]) for sql, params in statements]
+
+            for index, (sql, params) in enumerate(statements):
+                cursor.execute(sql, params)
+                if index == guarded and cursor.rowcount == 0:
+                    raise ProfileVersionConflict(f"student_profiles row of user {user_id} was modified")
             
             connection.commit()
+            if guarded is not None:
+                user_data['version'] = expected_version + 1
             return user_id
             
+        except ProfileVersionConflict:
+            connection.rollback()
+            raise
         except Exception as e:
             connection.rollback()
             print(f"Error saving user: {str(e)}")
@@ -210,64 +300,32 @@ class UserProfileDatabaseInterface(DatabaseInterface):
             cursor.close()
             connection.close()
     
-    def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+    def get_user_by_id(self, user_id: str, row_factory=None) -> Optional[Any]:
         """
-        Lấy thông tin người dùng theo ID
+        Lấy thông tin người dùng theo ID (một truy vấn JOIN)
         
         Args:
             user_id: ID của người dùng
+            row_factory: Hàm (cursor, row) tạo object trực tiếp từ row theo thứ tự _USER_JOIN_COLUMNS;
+                None = trả về dictionary
             
         Returns:
-            Dictionary chứa thông tin người dùng hoặc None
+            Dictionary (hoặc object do row_factory tạo) chứa thông tin người dùng, None nếu không có
         """
-        print("get_user_by_id", user_id)
         connection = self._get_connection()
         cursor = connection.cursor()
         
         try:
-            # Lấy thông tin cơ bản
-            # cursor.execute("SELECT * FROM user_profiles WHERE id = ?", (user_id,))
-            cursor.execute("SELECT * FROM user_profiles WHERE id = ?", (user_id,))
-            user_data = cursor.fetchone()
-            
-            if not user_data:
-                return None
-                
-            # Chuyển đổi từ tuple sang dictionary
-            user_dict = {
-                'id': user_data[0],
-                'email': user_data[1],
-                'role': user_data[2],
-                'created_at': user_data[3],
-                'last_login': user_data[4]
-            }
-            
-            # Lấy thông tin theo loại người dùng
-            role = user_dict['role']
-            
-            if role == 'student':
-                cursor.execute("SELECT * FROM student_profiles WHERE id = ?", (user_id,))
-                student_data = cursor.fetchone()
-                
-                if student_data:
-                    user_dict.update({
-                        'language_level': student_data[1],
-                        'points': student_data[2],
-                        'money': student_data[3],
-                        'hp': student_data[4],
-                        'atk': student_data[5],
-                        'items': json.loads(student_data[6] or '[]')
-                    })
-            elif role == 'teacher':
-                cursor.execute("SELECT * FROM teacher_profiles WHERE id = ?", (user_id,))
-                teacher_data = cursor.fetchone()
-                
-                if teacher_data:
-                    user_dict.update({
-                        'subjects': json.loads(teacher_data[1] or '[]')
-                    })
-            
-            return user_dict
+            cursor.row_factory = row_factory
+            cursor.execute(f"""
+                SELECT {self._USER_JOIN_COLUMNS}
+                FROM {self._USER_JOIN_TABLES}
+                WHERE up.id = ?
+            """, (user_id,))
+            row = cursor.fetchone()
+            if row is None or row_factory is not None:
+                return row
+            return self._joined_row_to_dict(row)
             
         except Exception as e:
             print(f"Error getting user: {str(e)}")
@@ -276,12 +334,102 @@ class UserProfileDatabaseInterface(DatabaseInterface):
             cursor.close()
             connection.close()
 
-    def get_user_by_id_gameplay(self, user_id: str) -> Optional[Dict[str, Any]]:
+    # Cột dùng chung cho các truy vấn JOIN user_profiles với profile theo role.
+    # Thứ tự này là layout mà StudentProfile.from_row / TeacherProfile.from_row đọc:
+    # 5 cột cơ bản, 9 cột của student (5..13), subjects (14), version của student_profiles (15).
+    _USER_JOIN_COLUMNS = """
+        up.id, up.email, up.role, up.created_at, up.last_login,
+        sp.language_level, sp.points, sp.money, sp.hp, sp.atk, sp.items,
+        sp.current_map, sp.maps_completed, sp.max_map_unlocked,
+        tp.subjects, sp.version
+    """
+    _USER_JOIN_TABLES = """
+        user_profiles up
+        LEFT JOIN student_profiles sp ON sp.id = up.id
+        LEFT JOIN teacher_profiles tp ON tp.id = up.id
+    """
+    # Giới hạn số tham số trong một câu IN (...) để an toàn với SQLITE_MAX_VARIABLE_NUMBER
+    _IN_CHUNK_SIZE = 500
+
+    @staticmethod
+    def _joined_row_to_dict(row) -> Dict[str, Any]:
+        """Chuyển một dòng của truy vấn JOIN sang dictionary giống get_user_by_id"""
+        user_dict = {
+            'id': row[0],
+            'email': row[1],
+            'role': row[2],
+            'created_at': row[3],
+            'last_login': row[4]
+        }
+        if row[2] == 'student' and row[5] is not None:
+            user_dict.update({
+                'language_level': row[5],
+                'points': row[6],
+                'money': row[7],
+                'hp': row[8],
+                'atk': row[9],
+                'items': json.loads(row[10] or '[]'),
+                'current_map': row[11] or 1,
+                'maps_completed': row[12] or '[]',
+                'max_map_unlocked': row[13] or 1,
+                'version': row[15]
+            })
+        elif row[2] == 'teacher' and row[14] is not None:
+            user_dict.update({
+                'subjects': json.loads(row[14] or '[]')
+            })
+        return user_dict
+
+    def get_users_by_ids(self, user_ids: List[str], row_factory=None) -> Dict[str, Any]:
+        """
+        Lấy thông tin nhiều người dùng cùng lúc (thay cho gọi get_user_by_id trong vòng lặp)
+        
+        Args:
+            user_ids: Danh sách ID người dùng
+            row_factory: Như get_user_by_id (object tạo ra phải có thuộc tính id)
+            
+        Returns:
+            Dictionary {user_id: thông tin người dùng}, bỏ qua các ID không tồn tại
+        """
+        unique_ids = list(dict.fromkeys(uid for uid in user_ids if uid is not None))
+        if not unique_ids:
+            return {}
+
+        connection = self._get_connection()
+        cursor = connection.cursor()
+        
+        try:
+            cursor.row_factory = row_factory
+            users = {}
+            for start in range(0, len(unique_ids), self._IN_CHUNK_SIZE):
+                chunk = unique_ids[start:start + self._IN_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(f"""
+                    SELECT {self._USER_JOIN_COLUMNS}
+                    FROM {self._USER_JOIN_TABLES}
+                    WHERE up.id IN ({placeholders})
+                """, chunk)
+                for row in cursor.fetchall():
+                    if row_factory is None:
+                        users[row[0]] = self._joined_row_to_dict(row)
+                    else:
+                        users[row.id] = row
+            return users
+            
+        except Exception as e:
+            print(f"Error getting users by ids: {str(e)}")
+            return {}
+        finally:
+            cursor.close()
+            connection.close()
+
+    def get_user_by_id_gameplay(self, user_id: str, row_factory=None) -> Optional[Any]:
         """
         Lấy thông tin người dùng theo ID
 
         Args:
             user_id: ID của người dùng
+            row_factory: Như get_user_by_id (cùng layout cột, chỉ có các cột của student)
 
         Returns:
             Dictionary chứa thông tin người dùng hoặc None
@@ -293,26 +441,32 @@ class UserProfileDatabaseInterface(DatabaseInterface):
         try:
             # Lấy thông tin cơ bản
             # cursor.execute("SELECT * FROM user_profiles WHERE id = ?", (user_id,))
-            cursor.execute("SELECT * FROM student_profiles WHERE id = ?", (user_id,))
+            cursor.row_factory = row_factory
+            cursor.execute("""
+                SELECT id, NULL, 'student', NULL, NULL,
+                       language_level, points, money, hp, atk, items,
+                       current_map, maps_completed, max_map_unlocked,
+                       NULL, version
+                FROM student_profiles WHERE id = ?
+            """, (user_id,))
             user_data = cursor.fetchone()
 
-            print("user_data123", user_data)
-
-            if not user_data:
-                return None
+            if not user_data or row_factory is not None:
+                return user_data
 
             # Chuyển đổi từ tuple sang dictionary
             user_dict = {
                 'id': user_data[0],
-                'language': user_data[1],
-                'points': user_data[2],
-                'money': user_data[3],
-                'hp': user_data[4],
-                'atk': user_data[5],
-                'items': json.loads(user_data[6] or '[]'),
-                'current_map': user_data[7],
-                'max_map_unlocked': user_data[8],
-                'maps_completed': user_data[9]
+                'language_level': user_data[5],
+                'points': user_data[6],
+                'money': user_data[7],
+                'hp': user_data[8],
+                'atk': user_data[9],
+                'items': json.loads(user_data[10] or '[]'),
+                'current_map': user_data[11],
+                'maps_completed': user_data[12],
+                'max_map_unlocked': user_data[13],
+                'version': user_data[15]
             }
 
             return user_dict
@@ -324,87 +478,105 @@ class UserProfileDatabaseInterface(DatabaseInterface):
             cursor.close()
             connection.close()
     
-    def  get_students(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+    def _get_role_page(self, role: str, limit: int, offset: int, after_id: Optional[str],
+                       row_factory=None) -> List[Any]:
         """
-        Lấy danh sách học sinh
+        Lấy một trang người dùng theo role bằng một truy vấn JOIN, sắp xếp theo id
         
         Args:
+            role: 'student' hoặc 'teacher'
             limit: Số lượng kết quả tối đa
-            offset: Vị trí bắt đầu
+            offset: Vị trí bắt đầu (chỉ dùng khi không có after_id)
+            after_id: Con trỏ keyset - chỉ lấy các id lớn hơn giá trị này
+            row_factory: Như get_user_by_id
             
         Returns:
-            Danh sách các học sinh dưới dạng dictionary
+            Danh sách người dùng dưới dạng dictionary (hoặc object do row_factory tạo)
         """
+        if role == 'student':
+            columns = """
+                up.id, up.email, up.role, up.created_at, up.last_login,
+                sp.language_level, sp.points, sp.money, sp.hp, sp.atk, sp.items,
+                sp.current_map, sp.maps_completed, sp.max_map_unlocked,
+                NULL, sp.version
+            """
+            join = "JOIN student_profiles sp ON sp.id = up.id"
+        else:
+            columns = """
+                up.id, up.email, up.role, up.created_at, up.last_login,
+                NULL, NULL, NULL, NULL, NULL, NULL,
+                NULL, NULL, NULL,
+                tp.subjects, NULL
+            """
+            join = "JOIN teacher_profiles tp ON tp.id = up.id"
+
+        if after_id is not None:
+            # Keyset pagination: dùng index của khóa chính, không phụ thuộc độ sâu trang
+            where, params = "up.role = ? AND up.id > ?", (role, after_id, limit)
+            paging = "LIMIT ?"
+        else:
+            where, params = "up.role = ?", (role, limit, offset)
+            paging = "LIMIT ? OFFSET ?"
+
         connection = self._get_connection()
         cursor = connection.cursor()
         
         try:
-            # Lấy danh sách ID học sinh
-            cursor.execute("""
-                SELECT up.id
+            cursor.row_factory = row_factory
+            cursor.execute(f"""
+                SELECT {columns}
                 FROM user_profiles up
-                JOIN student_profiles sp ON up.id = sp.id
-                LIMIT ? OFFSET ?
-            """, (limit, offset))
-            
-            student_ids = [row[0] for row in cursor.fetchall()]
-            students = []
-            
-            # Lấy thông tin chi tiết cho từng học sinh
-            for student_id in student_ids:
-                student = self.get_user_by_id(student_id)
-                if student:
-                    students.append(student)
-            
-            return students
+                {join}
+                WHERE {where}
+                ORDER BY up.id
+                {paging}
+            """, params)
+            if row_factory is not None:
+                return cursor.fetchall()
+            return [self._joined_row_to_dict(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            connection.close()
+
+    def get_students(self, limit: int = 100, offset: int = 0, after_id: Optional[str] = None,
+                     row_factory=None) -> List[Any]:
+        """
+        Lấy danh sách học sinh
+        
+        Args:
+            limit: Số lượng kết quả tối đa
+            offset: Vị trí bắt đầu
+            after_id: Con trỏ keyset (id cuối của trang trước), ưu tiên hơn offset
+            row_factory: Như get_user_by_id
             
+        Returns:
+            Danh sách các học sinh dưới dạng dictionary
+        """
+        try:
+            return self._get_role_page('student', limit, offset, after_id, row_factory)
         except Exception as e:
             print(f"Error getting students: {str(e)}")
             return []
-        finally:
-            cursor.close()
-            connection.close()
     
-    def get_teachers(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+    def get_teachers(self, limit: int = 100, offset: int = 0, after_id: Optional[str] = None,
+                     row_factory=None) -> List[Any]:
         """
         Lấy danh sách giáo viên
         
         Args:
             limit: Số lượng kết quả tối đa
             offset: Vị trí bắt đầu
+            after_id: Con trỏ keyset (id cuối của trang trước), ưu tiên hơn offset
+            row_factory: Như get_user_by_id
             
         Returns:
             Danh sách các giáo viên dưới dạng dictionary
         """
-        connection = self._get_connection()
-        cursor = connection.cursor()
-        
         try:
-            # Lấy danh sách ID giáo viên
-            cursor.execute("""
-                SELECT up.id
-                FROM user_profiles up
-                JOIN teacher_profiles tp ON up.id = tp.id
-                LIMIT ? OFFSET ?
-            """, (limit, offset))
-            
-            teacher_ids = [row[0] for row in cursor.fetchall()]
-            teachers = []
-            
-            # Lấy thông tin chi tiết cho từng giáo viên
-            for teacher_id in teacher_ids:
-                teacher = self.get_user_by_id(teacher_id)
-                if teacher:
-                    teachers.append(teacher)
-            
-            return teachers
-            
+            return self._get_role_page('teacher', limit, offset, after_id, row_factory)
         except Exception as e:
             print(f"Error getting teachers: {str(e)}")
             return []
-        finally:
-            cursor.close()
-            connection.close()
     
     def delete_user(self, user_id: int) -> bool:
         """
@@ -559,7 +731,7 @@ class UserProfileDatabaseInterface(DatabaseInterface):
             old_role = current_data[0]
             
             # Cập nhật role trong user_profiles
-            cursor.execute("UPDATE user_profiles SET role = ? WHERE id = ?", (new_role, user_id))
+            cursor.execute("UPDATE user_profiles SET role = ?, version = version + 1 WHERE id = ?", (new_role, user_id))
             
             # Xử lý profile tables
             if old_role != new_role:
@@ -606,69 +778,42 @@ class UserProfileDatabaseInterface(DatabaseInterface):
 
 class ItemDatabaseInterface(DatabaseInterface):
     """Interface cho các thao tác với items trong database"""
+
+    # Thứ tự cột mà Item.from_row đọc
+    _ITEM_SELECT_COLUMNS = "id, name, description, price, effect, type, level, max_level, created_at, owner_id, is_template"
     
-    def save_item(self, item_data: Dict[str, Any]) -> str:
+    def save_item(self, item_data: Dict[str, Any], changed_fields: Optional[Iterable[str]] = None) -> str:
         """
-        Lưu thông tin item vào database
+        Lưu thông tin item vào database (một câu upsert)
         
         Args:
             item_data: Dictionary chứa thông tin item
+            changed_fields: Các field đã thay đổi so với lúc đọc; None = ghi mọi field có trong item_data
             
         Returns:
             ID của item đã lưu
         """
+        item_id = item_data.get('id')
+        if not item_id:
+            item_id = str(uuid.uuid4())[:8]
+            item_data['id'] = item_id
+
+        changed = None if changed_fields is None else set(changed_fields)
+        update_columns = _columns_to_write(_ITEM_COLUMNS, item_data, changed)
+        if changed is not None and not update_columns:
+            return item_id
+
+        values = {column: item_data.get(column, default) for column, default in _ITEM_COLUMNS.items()}
+        values['is_template'] = 1 if values['is_template'] else 0
+
         connection = self._get_connection()
         cursor = connection.cursor()
         
         try:
-            # Kiểm tra item đã tồn tại chưa
-            item_id = item_data.get('id')
-            if not item_id:
-                item_id = str(uuid.uuid4())[:8]
-                item_data['id'] = item_id
-                
-            cursor.execute("SELECT id FROM items WHERE id = ?", (item_id,))
-            exists = cursor.fetchone() is not None
-            
-            if exists:
-                # Cập nhật item
-                cursor.execute("""
-                    UPDATE items 
-                    SET name = ?, description = ?, price = ?, effect = ?, 
-                        type = ?, level = ?, max_level = ?, owner_id = ?, is_template = ?
-                    WHERE id = ?
-                """, (
-                    item_data.get('name'),
-                    item_data.get('description'),
-                    item_data.get('price', 0),
-                    item_data.get('effect', 0),
-                    item_data.get('type'),
-                    item_data.get('level', 1),
-                    item_data.get('max_level', 1),
-                    item_data.get('owner_id'),
-                    1 if item_data.get('is_template', False) else 0,
-                    item_id
-                ))
-            else:
-                # Thêm item mới
-                created_at = item_data.get('created_at', int(time.time()))
-                cursor.execute("""
-                    INSERT INTO items (id, name, description, price, effect, type, level, max_level, created_at, owner_id, is_template)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    item_id,
-                    item_data.get('name'),
-                    item_data.get('description'),
-                    item_data.get('price', 0),
-                    item_data.get('effect', 0),
-                    item_data.get('type'),  # Sửa lỗi: thêm dấu đóng ngoặc ở đây
-                    item_data.get('level', 1),
-                    item_data.get('max_level', 1),
-                    created_at,
-                    item_data.get('owner_id'),
-                    1 if item_data.get('is_template', False) else 0
-                ))
-            
+            cursor.execute(
+                _upsert_sql('items', ('id', 'created_at') + tuple(_ITEM_COLUMNS), update_columns, bump_version=True),
+                (item_id, item_data.get('created_at', int(time.time()))) + tuple(values.values())
+            )
             connection.commit()
             return item_id
             
@@ -680,25 +825,114 @@ class ItemDatabaseInterface(DatabaseInterface):
             cursor.close()
             connection.close()
     
-    def get_item_by_id(self, item_id: str) -> Optional[Dict[str, Any]]:
+    def get_sword_upgrade_state(self, user_id: str, sword_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Đọc chỉ số student và thanh kiếm trong một query để nâng cấp
+
+        Args:
+            user_id: ID của student
+            sword_id: ID thanh kiếm
+
+        Returns:
+            Dictionary {money, hp, atk, version, sword} (sword là None nếu không có),
+            hoặc None nếu không phải student
+        """
+        connection = self._get_connection()
+        try:
+            row = connection.execute("""
+                SELECT sp.money, sp.hp, sp.atk, sp.version,
+                       i.id, i.name, i.description, i.effect, i.type, i.level, i.max_level,
+                       i.created_at, i.owner_id, i.is_template, i.version
+                FROM user_profiles up
+                JOIN student_profiles sp ON sp.id = up.id
+                LEFT JOIN items i ON i.id = ?
+                WHERE up.id = ? AND up.role = 'student'
+            """, (sword_id, user_id)).fetchone()
+        finally:
+            connection.close()
+
+        if not row:
+            return None
+        sword = None
+        if row[4] is not None:
+            sword = {
+                'id': row[4],
+                'name': row[5],
+                'description': row[6],
+                'effect': row[7],
+                'type': row[8],
+                'level': row[9],
+                'max_level': row[10],
+                'created_at': row[11],
+                'owner_id': row[12],
+                'is_template': bool(row[13]),
+                'version': row[14]
+            }
+        return {"money": row[0], "hp": row[1], "atk": row[2], "version": row[3], "sword": sword}
+
+    def apply_sword_upgrade(self, user_id: str, user_version: int, cost: int, new_hp: int, new_atk: int,
+                            sword_id: str, sword_version: int, new_level: int, new_effect: int) -> bool:
+        """
+        Trừ tiền, cập nhật chỉ số student và thanh kiếm trong một transaction
+
+        Mỗi UPDATE có điều kiện version (optimistic concurrency) và money >= cost,
+        nên hai request nâng cấp đồng thời không thể cùng trừ một khoản tiền.
+
+        Returns:
+            True nếu thành công, False nếu dữ liệu đã bị thay đổi (cần đọc lại và thử lại)
+        """
+        connection = self._get_connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            cursor = connection.execute("""
+                UPDATE student_profiles
+                SET money = money - ?, hp = ?, atk = ?, version = version + 1
+                WHERE id = ? AND money >= ? AND version = ?
+            """, (cost, new_hp, new_atk, user_id, cost, user_version))
+            if cursor.rowcount != 1:
+                connection.rollback()
+                return False
+
+            cursor = connection.execute("""
+                UPDATE items
+                SET level = ?, effect = ?, version = version + 1
+                WHERE id = ? AND version = ? AND level < max_level
+            """, (new_level, new_effect, sword_id, sword_version))
+            if cursor.rowcount != 1:
+                connection.rollback()
+                return False
+
+            connection.commit()
+            return True
+        except Exception as e:
+            connection.rollback()
+            print(f"Error upgrading sword: {str(e)}")
+            raise e
+        finally:
+            connection.close()
+
+    def get_item_by_id(self, item_id: str, row_factory=None) -> Optional[Any]:
         """
         Lấy thông tin item theo ID
         
         Args:
             item_id: ID của item
+            row_factory: Hàm (cursor, row) tạo object trực tiếp từ row theo thứ tự _ITEM_SELECT_COLUMNS;
+                None = trả về dictionary
             
         Returns:
-            Dictionary chứa thông tin item hoặc None
+            Dictionary (hoặc object do row_factory tạo) chứa thông tin item hoặc None
         """
         connection = self._get_connection()
         cursor = connection.cursor()
         
         try:
-            cursor.execute("SELECT * FROM items WHERE id = ?", (item_id,))
+            cursor.row_factory = row_factory
+            cursor.execute(f"SELECT {self._ITEM_SELECT_COLUMNS} FROM items WHERE id = ?", (item_id,))
             item_data = cursor.fetchone()
             
-            if not item_data:
-                return None
+            if not item_data or row_factory is not None:
+                return item_data
                 
             # Tạo dictionary cho item
             item_dict = {
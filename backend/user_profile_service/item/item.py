@@ -1,9 +1,15 @@
 import time
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 class Item:
     """Item model for sword system only"""
+    __slots__ = ('id', 'name', 'description', 'effect', 'type', 'level', 'max_level',
+                 'created_at', 'owner_id', 'is_template', '_persisted')
+
+    # Fields written to the database, in to_dict order (used for change tracking)
+    _FIELDS = ('id', 'name', 'description', 'effect', 'type', 'level', 'max_level',
+               'created_at', 'owner_id', 'is_template')
     
     def __init__(self, **kwargs):
         self.id = kwargs.get('id')
@@ -23,6 +29,33 @@ class Item:
                 self.id = f"sword_{self.owner_id}"  # Unique sword per user
             else:
                 self.id = str(uuid.uuid4())[:8]
+        self._persisted = None
+
+    @classmethod
+    def from_row(cls, row) -> "Item":
+        """
+        Build directly from a row (id, name, description, price, effect, type, level,
+        max_level, created_at, owner_id, is_template) without an intermediate dict
+        """
+        item = cls.__new__(cls)
+        (item.id, item.name, item.description, _price, item.effect, item.type,
+         item.level, item.max_level, item.created_at, item.owner_id, is_template) = row
+        item.is_template = bool(is_template)
+        item._persisted = None
+        return item
+
+    def snapshot(self) -> tuple:
+        return tuple(getattr(self, field) for field in self._FIELDS)
+
+    def mark_persisted(self) -> None:
+        """Remember the current values as the stored state"""
+        self._persisted = self.snapshot()
+
+    def changed_fields(self) -> Optional[List[str]]:
+        """Fields changed since mark_persisted(); None if never loaded or saved"""
+        if self._persisted is None:
+            return None
+        return [field for field, old, new in zip(self._FIELDS, self._persisted, self.snapshot()) if old != new]
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for database storage"""
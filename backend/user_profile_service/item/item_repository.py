@@ -22,25 +22,50 @@ class ItemRepository:
 
     def find_by_id(self, item_id: str) -> Optional[Item]:
         """Find sword by ID"""
-        item_dict = self.db.get_item_by_id(item_id)
-        return self._dict_to_item(item_dict)
+        return self.db.get_item_by_id(item_id, self._row_to_item)
+
+    @staticmethod
+    def _row_to_item(cursor, row) -> Item:
+        """Row factory: build the Item straight from the database row"""
+        item = Item.from_row(row)
+        item.mark_persisted()
+        return item
 
     def save_item(self, item: Item) -> Item:
         """Save sword to database"""
         item_dict = item.to_dict()
-        item_id = self.db.save_item(item_dict)
+        item_id = self.db.save_item(item_dict, item.changed_fields())
         
         if not item.id:
             item.id = item_id
+        item.mark_persisted()
             
         return item
 
+    def get_upgrade_state(self, user_id: str, sword_id: str) -> Optional[Dict[str, Any]]:
+        """Read student stats and sword (as Item) in one query"""
+        state = self.db.get_sword_upgrade_state(user_id, sword_id)
+        if state is None:
+            return None
+        sword_dict = state.pop('sword')
+        state['sword'] = self._dict_to_item(sword_dict)
+        state['sword_version'] = sword_dict['version'] if sword_dict else None
+        return state
+
+    def apply_upgrade(self, user_id: str, user_version: int, cost: int, new_hp: int, new_atk: int,
+                      sword: Item, sword_version: int) -> bool:
+        """Guarded single-transaction upgrade, False on concurrent modification"""
+        return self.db.apply_sword_upgrade(
+            user_id, user_version, cost, new_hp, new_atk,
+            sword.id, sword_version, sword.level, sword.effect
+        )
+
     def _dict_to_item(self, item_dict: Dict[str, Any]) -> Optional[Item]:
         """Convert dictionary to Item object"""
         if not item_dict:
             return None
             
-        return Item(
+        item = Item(
             id=item_dict.get('id'),
             name=item_dict.get('name'),
             description=item_dict.get('description'),
@@ -51,4 +76,6 @@ class ItemRepository:
             created_at=item_dict.get('created_at', int(time.time())),
             owner_id=item_dict.get('owner_id'),
             is_template=item_dict.get('is_template', False)
-        )
\ No newline at end of file
+        )
+        item.mark_persisted()
+        return item
\ No newline at end of file
@@ -6,6 +6,9 @@ from user_profile_service.user.user import StudentProfile
 
 class ItemService:
     """Item service focused on single sword system"""
+
+    # Số lần đọc lại và thử lại khi nâng cấp bị xung đột với request khác
+    MAX_UPGRADE_ATTEMPTS = 5
     
     def __init__(self):
         """Khởi tạo ItemService"""
@@ -97,88 +100,96 @@ class ItemService:
         return (current_level ** 2) * 50
 
     def upgrade_sword(self, user_id: str) -> dict:
-        """Upgrade sword with enhanced validation"""
+        """
+        Upgrade sword in one guarded transaction
+
+        Student and sword are read in one query, then money/stats and the sword
+        are updated together with `WHERE money >= cost AND version = ?`. If another
+        request changed either row in between, the state is re-read and retried.
+        """
         try:
             # Validate input
             if not user_id or not isinstance(user_id, str):
                 return {"success": False, "error": "Invalid user_id"}
 
-            # Lấy thông tin user
-            user = self.user_repository.find_by_id(user_id)
-            if not user or not isinstance(user, StudentProfile):
-                return {"success": False, "error": "Student not found"}
-            
-            # Validate user money
-            if user.money < 0:
-                return {"success": False, "error": "Invalid money amount"}
-
-            # Tìm sword
             sword_id = f"sword_{user_id}"
-            sword = self.item_repository.find_by_id(sword_id)
-            if not sword:
-                return {"success": False, "error": "Sword not found"}
-            
-            # Kiểm tra có thể upgrade không
-            if not sword.can_upgrade():
-                return {"success": False, "error": f"Sword already at maximum level ({sword.max_level})"}
-            
-            # Tính cost upgrade
-            upgrade_cost = sword.get_upgrade_cost()
-            
-            # Kiểm tra đủ tiền không
-            if user.money < upgrade_cost:
+            for _ in range(self.MAX_UPGRADE_ATTEMPTS):
+                # Lấy thông tin user và sword trong một query
+                state = self.item_repository.get_upgrade_state(user_id, sword_id)
+                if not state:
+                    return {"success": False, "error": "Student not found"}
+
+                # Validate user money
+                if state["money"] < 0:
+                    return {"success": False, "error": "Invalid money amount"}
+
+                sword = state["sword"]
+                if not sword:
+                    return {"success": False, "error": "Sword not found"}
+
+                # Kiểm tra có thể upgrade không
+                if not sword.can_upgrade():
+                    return {"success": False, "error": f"Sword already at maximum level ({sword.max_level})"}
+
+                # Tính cost upgrade
+                upgrade_cost = sword.get_upgrade_cost()
+
+                # Kiểm tra đủ tiền không
+                if state["money"] < upgrade_cost:
+                    return {
+                        "success": False,
+                        "error": f"Not enough money. Required: {upgrade_cost}, Have: {state['money']}",
+                        "upgrade_cost": upgrade_cost,
+                        "user_money": state["money"]
+                    }
+
+                # Lưu giá trị cũ
+                old_level = sword.level
+                old_effect = sword.effect
+                old_money = state["money"]
+                old_hp = state["hp"]
+                old_atk = state["atk"]
+
+                # Upgrade sword
+                sword.level += 1
+                sword.effect = int(sword.effect * 1.3)  # Tăng 30% effect mỗi level
+
+                # Nâng cấp stats của user
+                hp_increase = 20  # Mỗi level tăng 20 HP
+                atk_increase = int(sword.effect * 0.5)  # ATK = 50% sword effect
+                new_hp = old_hp + hp_increase
+                new_atk = 10 + atk_increase  # Base ATK + bonus từ sword
+
+                # Trừ tiền và lưu thay đổi trong một transaction
+                if not self.item_repository.apply_upgrade(
+                    user_id, state["version"], upgrade_cost, new_hp, new_atk, sword, state["sword_version"]
+                ):
+                    continue
+                # money / hp / atk vừa được ghi thẳng xuống database
+                self.user_repository.invalidate(user_id)
+
                 return {
-                    "success": False, 
-                    "error": f"Not enough money. Required: {upgrade_cost}, Have: {user.money}",
-                    "upgrade_cost": upgrade_cost,
-                    "user_money": user.money
+                    "success": True,
+                    "sword": sword.to_dict(),
+                    "upgrade_info": {
+                        "old_level": old_level,
+                        "new_level": sword.level,
+                        "old_effect": old_effect,
+                        "new_effect": sword.effect,
+                        "effect_increase": sword.effect - old_effect,
+                        "upgrade_cost": upgrade_cost,
+                        "money_before": old_money,
+                        "money_after": old_money - upgrade_cost
+                    },
+                    "stat_changes": {
+                        "hp": {"old": old_hp, "new": new_hp, "increase": hp_increase},
+                        "atk": {"old": old_atk, "new": new_atk, "increase": new_atk - old_atk}
+                    },
+                    "next_upgrade_cost": self._calculate_upgrade_cost(sword.level) if sword.level < sword.max_level else None
                 }
-            
-            # Lưu giá trị cũ
-            old_level = sword.level
-            old_effect = sword.effect
-            old_money = user.money
-            old_hp = user.hp
-            old_atk = user.atk
-            
-            # Upgrade sword
-            sword.level += 1
-            sword.effect = int(sword.effect * 1.3)  # Tăng 30% effect mỗi level
-            
-            # Trừ tiền user
-            user.money -= upgrade_cost
-            
-            # Nâng cấp stats của user
-            hp_increase = 20  # Mỗi level tăng 20 HP
-            atk_increase = int(sword.effect * 0.5)  # ATK = 50% sword effect
-            
-            user.hp += hp_increase
-            user.atk = 10 + atk_increase  # Base ATK + bonus từ sword
-            
-            # Lưu thay đổi
-            self.item_repository.save_item(sword)
-            self.user_repository.save(user)
-            
-            return {
-                "success": True,
-                "sword": sword.to_dict(),
-                "upgrade_info": {
-                    "old_level": old_level,
-                    "new_level": sword.level,
-                    "old_effect": old_effect,
-                    "new_effect": sword.effect,
-                    "effect_increase": sword.effect - old_effect,
-                    "upgrade_cost": upgrade_cost,
-                    "money_before": old_money,
-                    "money_after": user.money
-                },
-                "stat_changes": {
-                    "hp": {"old": old_hp, "new": user.hp, "increase": hp_increase},
-                    "atk": {"old": old_atk, "new": user.atk, "increase": user.atk - old_atk}
-                },
-                "next_upgrade_cost": self._calculate_upgrade_cost(sword.level) if sword.level < sword.max_level else None
-            }
-            
+
+            return {"success": False, "error": "Sword was modified concurrently, please retry"}
+
         except Exception as e:
             self._last_error = e
-            return {"success": False, "error": str(e)}
\ No newline at end of file
+            return {"success": False, "error": str(e)}
@@ -0,0 +1,204 @@
+import copy
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from common.fork_safety import abandon, reinit_after_fork
+from common.lru_cache import LRUCache
+from db.connection_pool import get_connection, open_connection
+
+# Số profile tối đa giữ trong bộ nhớ và thời gian sống của mỗi entry (giây)
+PROFILE_CACHE_SIZE = int(os.getenv("USER_PROFILE_CACHE_SIZE", "4096"))
+PROFILE_CACHE_TTL = float(os.getenv("USER_PROFILE_CACHE_TTL", "60"))
+# Khoảng thời gian tối thiểu (giây) giữa hai lần kiểm tra thay đổi từ tiến trình khác
+PROFILE_CACHE_POLL_INTERVAL = float(os.getenv("USER_PROFILE_CACHE_POLL_INTERVAL", "1"))
+
+# version của các dòng profile của một user (user_profiles, student_profiles, teacher_profiles),
+# tăng mỗi khi dòng bị ghi (save_user, change_user_role, apply_sword_upgrade)
+_STAMP_SQL = """
+    SELECT (SELECT version FROM user_profiles WHERE id = ?),
+           (SELECT version FROM student_profiles WHERE id = ?),
+           (SELECT version FROM teacher_profiles WHERE id = ?)
+"""
+
+# Các dạng profile được cache cho mỗi user
+FULL = "full"
+GAMEPLAY = "gameplay"
+
+
+class ProfileCache:
+    """
+    Cache read-through các UserProfile đã hydrate, key là (dạng, user_id).
+
+    get_or_load trả về bản sao nông của object trong cache, nên caller có thể
+    sửa và save mà không làm bẩn cache. Nếu user bị invalidate trong lúc đang
+    đọc database thì kết quả đọc đó không được lưu vào cache.
+
+    Ghi từ tiến trình khác: mỗi entry giữ version các dòng profile đọc trước khi
+    load. Khi PRAGMA data_version trên kết nối riêng thay đổi (kiểm tra tối đa mỗi
+    poll_interval giây), entry được so lại với version trong database trước khi
+    trả về lần tiếp theo và bị bỏ nếu khác.
+    """
+
+    def __init__(self, max_entries: int = PROFILE_CACHE_SIZE, ttl_seconds: Optional[float] = PROFILE_CACHE_TTL,
+                 db_path: str = "userprofile.db", poll_interval: float = PROFILE_CACHE_POLL_INTERVAL):
+        self._cache = LRUCache(max_entries, ttl_seconds)
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._loading: Dict[Any, int] = {}   # user_id -> số lần đọc database đang chạy
+        self._stale = set()                  # user_id bị invalidate trong lúc đang đọc
+        self._invalidations = 0
+        self._version_misses = 0
+        self._connection = None
+        self._pid = None
+        self._data_version = None
+        self._checked_at = 0.0
+        # Tăng mỗi khi data_version đổi; entry kiểm tra ở generation cũ phải so lại version
+        self._generation = 0
+        reinit_after_fork(self)
+
+    def _after_fork(self):
+        # Kết nối theo dõi của tiến trình cha bị bỏ lại (không đóng); các entry đã cache
+        # phải so lại version vì có thể có ghi giữa lần kiểm tra cuối của cha và fork
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._stale = set()
+        abandon(self._connection)
+        self._connection = None
+        self._pid = None
+        self._data_version = None
+        self._generation += 1
+
+    def _refresh(self) -> None:
+        """Tăng generation nếu database đã bị ghi từ kết nối khác kể từ lần kiểm tra trước"""
+        if time.monotonic() - self._checked_at < self.poll_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.poll_interval:
+                return
+            # data_version chỉ so sánh được trên cùng một kết nối của cùng tiến trình
+            pid = os.getpid()
+            if self._connection is None or self._pid != pid:
+                self._connection = open_connection(self.db_path)
+                self._pid = pid
+                self._data_version = None
+            data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self._generation += 1
+            self._checked_at = time.monotonic()
+
+    def _stamps(self, user_ids) -> Dict[Any, Tuple]:
+        """version hiện tại của các dòng profile của từng user (None nếu không có dòng)"""
+        with get_connection(self.db_path) as connection:
+            return {user_id: tuple(connection.execute(_STAMP_SQL, (user_id,) * 3).fetchone())
+                    for user_id in user_ids}
+
+    def get(self, kind: str, user_id: Any):
+        """Bản sao của profile trong cache hoặc None (kể cả khi profile đã bị ghi từ nơi khác)"""
+        self._refresh()
+        entry = self._cache.get((kind, user_id))
+        if entry is None:
+            return None
+        user, stamp, generation = entry
+        if generation != self._generation:
+            generation = self._generation
+            if self._stamps((user_id,))[user_id] != stamp:
+                with self._lock:
+                    self._version_misses += 1
+                self._cache.invalidate((kind, user_id))
+                return None
+            entry[2] = generation
+        return copy.copy(user)
+
+    def get_or_load(self, kind: str, user_id: Any, loader: Callable[[], Any]):
+        """
+        Lấy profile từ cache, gọi loader() nếu chưa có (không cache kết quả None)
+
+        Args:
+            kind: Dạng profile (FULL hoặc GAMEPLAY)
+            user_id: ID người dùng
+            loader: Hàm đọc profile từ database
+        """
+        user = self.get(kind, user_id)
+        if user is not None:
+            return user
+
+        self._begin_load(user_id)
+        fresh = True
+        try:
+            # version đọc trước profile: nếu có ghi xen giữa, lần kiểm tra sau thấy khác và bỏ entry
+            generation = self._generation
+            stamp = self._stamps((user_id,))[user_id]
+            user = loader()
+        finally:
+            fresh = self._end_load(user_id)
+        if user is not None and fresh:
+            self._cache.put((kind, user_id), [copy.copy(user), stamp, generation])
+        return user
+
+    def put_many(self, kind: str, users: Dict[Any, Any], fresh_ids, snapshot: Tuple[int, Dict[Any, Tuple]]) -> None:
+        """Lưu kết quả đọc nhiều user (chỉ các user trong fresh_ids; snapshot từ begin_batch)"""
+        generation, stamps = snapshot
+        for user_id in fresh_ids:
+            user = users.get(user_id)
+            if user is not None:
+                self._cache.put((kind, user_id), [copy.copy(user), stamps[user_id], generation])
+
+    def _begin_load(self, user_id: Any) -> None:
+        with self._lock:
+            self._loading[user_id] = self._loading.get(user_id, 0) + 1
+
+    def _end_load(self, user_id: Any) -> bool:
+        """Kết thúc một lần đọc; False nếu user bị invalidate trong lúc đọc"""
+        with self._lock:
+            fresh = user_id not in self._stale
+            remaining = self._loading.get(user_id, 1) - 1
+            if remaining <= 0:
+                self._loading.pop(user_id, None)
+                self._stale.discard(user_id)
+            else:
+                self._loading[user_id] = remaining
+            return fresh
+
+    def begin_batch(self, user_ids) -> Tuple[int, Dict[Any, Tuple]]:
+        """Bắt đầu đọc nhiều user; trả về (generation, version của từng user) cho put_many"""
+        for user_id in user_ids:
+            self._begin_load(user_id)
+        try:
+            return self._generation, self._stamps(user_ids)
+        except BaseException:
+            self.end_batch(user_ids)
+            raise
+
+    def end_batch(self, user_ids) -> List[Any]:
+        """Kết thúc đọc nhiều user, trả về các user_id có thể cache"""
+        return [user_id for user_id in user_ids if self._end_load(user_id)]
+
+    def invalidate(self, user_id: Any) -> None:
+        """Xóa mọi dạng profile của user (gọi sau khi ghi)"""
+        with self._lock:
+            self._invalidations += 1
+            if user_id in self._loading:
+                self._stale.add(user_id)
+            for kind in (FULL, GAMEPLAY):
+                self._cache.invalidate((kind, user_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stale.update(self._loading)
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """hits / misses / evictions / expired / hit_rate của cache"""
+        stats = self._cache.stats()
+        stats["invalidations"] = self._invalidations
+        stats["version_misses"] = self._version_misses
+        stats["ttl_seconds"] = self._cache.ttl_seconds
+        return stats
+
+
+# Dùng chung cho mọi UserRepository trong tiến trình (UserProfileService, ItemService, ...)
+profile_cache = ProfileCache()
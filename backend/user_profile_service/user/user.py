@@ -1,20 +1,57 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, Boolean
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
 import time
 import json
 from typing import Dict, Any, List, Optional
 
-Base = declarative_base()
+def _json_text(value, default: str = '[]') -> str:
+    """Cột JSON đọc thẳng từ database; dòng cũ bị json.dumps hai lần thì giải mã một lớp"""
+    if not value:
+        return default
+    if value[0] == '"':
+        try:
+            decoded = json.loads(value)
+            return decoded if isinstance(decoded, str) else json.dumps(decoded)
+        except ValueError:
+            return default
+    return value
+
 
 class UserProfile:
     """Base user profile model"""
+    __slots__ = ('id', 'email', 'role', 'created_at', 'last_login', '_persisted')
+
+    # (key trong to_dict, thuộc tính) dùng cho snapshot phát hiện field đã đổi
+    _FIELDS = (('id', 'id'), ('email', 'email'), ('role', 'role'),
+               ('created_at', 'created_at'), ('last_login', 'last_login'))
+
     def __init__(self, **kwargs):
         self.id = kwargs.get('id')
         self.email = kwargs.get('email')
         self.role = kwargs.get('role', 'student')
         self.created_at = kwargs.get('created_at', int(time.time()))
         self.last_login = kwargs.get('last_login', self.created_at)
+        self._persisted = None
+
+    @classmethod
+    def from_row(cls, row):
+        """Tạo object từ 5 cột đầu của row (id, email, role, created_at, last_login), không qua dict"""
+        user = cls.__new__(cls)
+        user.id, user.email, user.role, user.created_at, user.last_login = row[:5]
+        user._persisted = None
+        return user
+
+    def snapshot(self) -> tuple:
+        """Giá trị hiện tại của các field lưu xuống database (so sánh với _persisted)"""
+        return tuple(getattr(self, attr) for _, attr in self._FIELDS)
+
+    def mark_persisted(self) -> None:
+        """Ghi nhận trạng thái hiện tại là trạng thái đang có trong database"""
+        self._persisted = self.snapshot()
+
+    def changed_fields(self) -> Optional[List[str]]:
+        """Các field đã đổi kể từ mark_persisted(); None nếu object chưa từng được đọc/lưu"""
+        if self._persisted is None:
+            return None
+        return [key for (key, _), old, new in zip(self._FIELDS, self._persisted, self.snapshot()) if old != new]
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert user to dictionary representation"""
@@ -33,6 +70,15 @@ class UserProfile:
 
 class StudentProfile(UserProfile):
     """Student profile with game stats và map progression"""
+    __slots__ = ('language_level', 'points', 'money', 'hp', 'atk',
+                 'current_map', 'max_map_unlocked', '_maps_completed', '_items', 'version')
+
+    _FIELDS = UserProfile._FIELDS + (
+        ('language_level', 'language_level'), ('points', 'points'), ('money', 'money'),
+        ('hp', 'hp'), ('atk', 'atk'), ('current_map', 'current_map'),
+        ('max_map_unlocked', 'max_map_unlocked'), ('maps_completed', '_maps_completed'), ('items', '_items')
+    )
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.language_level = kwargs.get('language_level', 1)
@@ -48,11 +94,30 @@ class StudentProfile(UserProfile):
         
         # Items
         self._items = kwargs.get('items', '[]')
+
+        # version của dòng student_profiles lúc đọc (None: chưa đọc từ database)
+        self.version = kwargs.get('version')
         
         # Initialize items properly
         if 'items' in kwargs:
             self.set_items(kwargs['items'])
 
+    @classmethod
+    def from_row(cls, row) -> "StudentProfile":
+        """
+        Tạo từ row (id, email, role, created_at, last_login, language_level, points, money,
+        hp, atk, items, current_map, maps_completed, max_map_unlocked, subjects, version), không qua dict
+        """
+        user = super().from_row(row)
+        (user.language_level, user.points, user.money, user.hp, user.atk,
+         items, current_map, maps_completed, max_map_unlocked) = row[5:14]
+        user.version = row[15]
+        user._items = _json_text(items)
+        user.current_map = current_map or 1
+        user._maps_completed = _json_text(maps_completed)
+        user.max_map_unlocked = max_map_unlocked or 1
+        return user
+
     def get_items(self) -> List[Dict[str, Any]]:
         """Get items as Python list"""
         try:
@@ -183,11 +248,22 @@ class StudentProfile(UserProfile):
 
 class TeacherProfile(UserProfile):
     """Teacher profile with teaching info"""
+    __slots__ = ('_subjects',)
+
+    _FIELDS = UserProfile._FIELDS + (('subjects', '_subjects'),)
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._subjects = "[]"
         if 'subjects' in kwargs:
             self.set_subjects(kwargs['subjects'])
+
+    @classmethod
+    def from_row(cls, row) -> "TeacherProfile":
+        """Tạo từ row (5 cột cơ bản, 9 cột của student, subjects ở cột 14), không qua dict"""
+        user = super().from_row(row)
+        user._subjects = _json_text(row[14])
+        return user
     
     def get_subjects(self) -> List[str]:
         """Get teacher's subjects as Python list"""
@@ -99,19 +99,19 @@ class UserController:
         except Exception as e:
             return jsonify({"error": f"Stats update error: {str(e)}"}), 500
 
-    def get_all_students(self, limit=100, offset=0):
-        """Lấy danh sách học sinh"""
+    def get_all_students(self, limit=100, offset=0, cursor=None):
+        """Lấy danh sách học sinh (cursor = next_cursor của trang trước)"""
         try:
-            students = self.user_service.get_all_students(limit, offset)
-            return jsonify({"students": students, "count": len(students)}), 200
+            students, next_cursor = self.user_service.get_students_page(limit, offset, cursor)
+            return jsonify({"students": students, "count": len(students), "next_cursor": next_cursor}), 200
         except Exception as e:
             return jsonify({"error": f"Get students error: {str(e)}"}), 500
 
-    def get_all_teachers(self, limit=100, offset=0):
-        """Lấy danh sách giáo viên"""
+    def get_all_teachers(self, limit=100, offset=0, cursor=None):
+        """Lấy danh sách giáo viên (cursor = next_cursor của trang trước)"""
         try:
-            teachers = self.user_service.get_all_teachers(limit, offset)
-            return jsonify({"teachers": teachers, "count": len(teachers)}), 200
+            teachers, next_cursor = self.user_service.get_teachers_page(limit, offset, cursor)
+            return jsonify({"teachers": teachers, "count": len(teachers), "next_cursor": next_cursor}), 200
         except Exception as e:
             return jsonify({"error": f"Get teachers error: {str(e)}"}), 500
 
@@ -1,14 +1,51 @@
-from typing import List, Optional, Dict, Any
+import json
+from typing import Any, Callable, List, Optional, Dict, Tuple
 from user_profile_service.user.user import UserProfile, StudentProfile, TeacherProfile
-from user_profile_service.database_interface import UserProfileDatabaseInterface  # Import từ thư mục cha
+from user_profile_service.database_interface import ProfileVersionConflict, UserProfileDatabaseInterface  # Import từ thư mục cha
+from user_profile_service.user.profile_cache import profile_cache, FULL, GAMEPLAY
 
 class UserRepository:
-    def __init__(self):
-        """Khởi tạo repository với database interface"""
+    # Số lần đọc lại và thử lại khi update() bị xung đột với request/tiến trình khác
+    MAX_UPDATE_ATTEMPTS = 5
+
+    def __init__(self, cache=profile_cache):
+        """
+        Khởi tạo repository với database interface
+        
+        Args:
+            cache: Cache profile dùng chung (mặc định: cache của tiến trình)
+        """
         self.db = UserProfileDatabaseInterface()
+        self.cache = cache
     
+    @staticmethod
+    def _row_to_user(cursor, row) -> UserProfile:
+        """
+        Row factory: tạo UserProfile trực tiếp từ row của database (layout _USER_JOIN_COLUMNS),
+        không qua dictionary trung gian
+        """
+        role = row[2]
+        if role == 'student':
+            if row[5] is not None:
+                user = StudentProfile.from_row(row)
+            else:
+                # Thiếu dòng student_profiles: dùng giá trị mặc định
+                user = StudentProfile(id=row[0], email=row[1], role=role, created_at=row[3], last_login=row[4])
+        elif role == 'teacher':
+            user = TeacherProfile.from_row(row)
+        else:
+            user = UserProfile.from_row(row)
+        user.mark_persisted()
+        return user
+
     def _dict_to_user(self, user_dict: Dict[str, Any]) -> Optional[UserProfile]:
-        """Convert dictionary to User object"""
+        """Convert dictionary to User object (kèm snapshot để save chỉ ghi field đã đổi)"""
+        user = self._build_user(user_dict)
+        if user is not None:
+            user.mark_persisted()
+        return user
+
+    def _build_user(self, user_dict: Dict[str, Any]) -> Optional[UserProfile]:
         if not user_dict:
             return None
         
@@ -32,6 +69,7 @@ class UserRepository:
             user.current_map = user_dict.get('current_map', 1)
             user.max_map_unlocked = user_dict.get('max_map_unlocked', 1)
             user._maps_completed = user_dict.get('maps_completed', '[]')
+            user.version = user_dict.get('version')
             
             # SỬA: Items handling với defensive programming
             items_data = user_dict.get('items', '[]')
@@ -87,18 +125,63 @@ class UserRepository:
             
         Returns:
             Đối tượng UserProfile đã lưu
+
+        Raises:
+            ProfileVersionConflict nếu student_profiles đã bị ghi kể từ lúc user được đọc
+            (không có gì được lưu, profile bị xóa khỏi cache để lần đọc sau lấy từ database)
         """
         # Chuyển đổi đối tượng thành dictionary
         user_dict = user.to_dict()
         
-        # Lưu vào database và lấy ID
-        user_id = self.db.save_user(user_dict)
+        # Lưu vào database và lấy ID (chỉ các field khác với snapshot lúc đọc)
+        try:
+            user_id = self.db.save_user(user_dict, user.changed_fields(), getattr(user, 'version', None))
+        except ProfileVersionConflict:
+            self.cache.invalidate(user.id)
+            raise
         
         # Cập nhật ID nếu là người dùng mới
         if not user.id:
             user.id = user_id
+        if 'version' in user_dict:
+            user.version = user_dict['version']
+        user.mark_persisted()
+        self.cache.invalidate(user.id)
             
         return user
+
+    def update(self, user_id: str, apply: Callable[[UserProfile], Any],
+               user: Optional[UserProfile] = None) -> Tuple[Optional[UserProfile], Any]:
+        """
+        Đọc user, sửa bằng apply(user) rồi lưu. Nếu student_profiles bị request/tiến trình
+        khác ghi kể từ lúc đọc (vd: nâng cấp kiếm trừ tiền), đọc lại từ database và gọi lại apply
+
+        Args:
+            user_id: ID người dùng
+            apply: Hàm sửa user; trả về giá trị falsy thì không lưu
+            user: Bản đã đọc sẵn dùng cho lần thử đầu tiên
+
+        Returns:
+            (user, kết quả của apply); (None, None) nếu không tìm thấy user
+
+        Raises:
+            ProfileVersionConflict nếu vẫn xung đột sau MAX_UPDATE_ATTEMPTS lần
+        """
+        for attempt in range(self.MAX_UPDATE_ATTEMPTS):
+            if user is None:
+                user = self.find_by_id(user_id)
+                if user is None:
+                    return None, None
+            result = apply(user)
+            if not result:
+                return user, result
+            try:
+                self.save(user)
+                return user, result
+            except ProfileVersionConflict:
+                if attempt == self.MAX_UPDATE_ATTEMPTS - 1:
+                    raise
+                user = None
     
     def find_by_id(self, user_id: str) -> Optional[UserProfile]:
         """
@@ -110,10 +193,37 @@ class UserRepository:
         Returns:
             Đối tượng UserProfile hoặc None nếu không tìm thấy
         """
-        print("find_by_id", user_id)
-        user_dict = self.db.get_user_by_id(user_id)
-        print("user_dict", user_dict)
-        return self._dict_to_user(user_dict)
+        return self.cache.get_or_load(FULL, user_id, lambda: self.db.get_user_by_id(user_id, self._row_to_user))
+
+    def find_by_ids(self, user_ids: List[str]) -> Dict[str, UserProfile]:
+        """
+        Tìm nhiều người dùng bằng một truy vấn
+        
+        Args:
+            user_ids: Danh sách ID người dùng
+            
+        Returns:
+            Dictionary {user_id: UserProfile}, bỏ qua các ID không tồn tại
+        """
+        users = {}
+        missing = []
+        for user_id in dict.fromkeys(uid for uid in user_ids if uid is not None):
+            user = self.cache.get(FULL, user_id)
+            if user is not None:
+                users[user_id] = user
+            else:
+                missing.append(user_id)
+        if not missing:
+            return users
+
+        snapshot = self.cache.begin_batch(missing)
+        loaded = {}
+        try:
+            loaded = self.db.get_users_by_ids(missing, self._row_to_user)
+        finally:
+            self.cache.put_many(FULL, loaded, self.cache.end_batch(missing), snapshot)
+        users.update(loaded)
+        return users
 
     def find_by_id_gameplay(self, user_id: str) -> Optional[UserProfile]:
         """
@@ -125,38 +235,66 @@ class UserRepository:
         Returns:
             Đối tượng UserProfile hoặc None nếu không tìm thấy
         """
-        print("find_by_id", user_id)
-        user_dict = self.db.get_user_by_id_gameplay(user_id)
-        print("user_dict", user_dict)
-        return self._dict_to_user(user_dict)
+        return self.cache.get_or_load(
+            GAMEPLAY, user_id, lambda: self.db.get_user_by_id_gameplay(user_id, self._row_to_user)
+        )
     
-    def find_students(self, limit: int = 100, offset: int = 0) -> List[StudentProfile]:
+    def find_students(self, limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> List[StudentProfile]:
         """
         Tìm tất cả học sinh với phân trang
         
         Args:
             limit: Số lượng kết quả tối đa
             offset: Vị trí bắt đầu
+            cursor: Con trỏ keyset (next_cursor của trang trước)
             
         Returns:
             Danh sách các đối tượng StudentProfile
         """
-        students_dict = self.db.get_students(limit, offset)
-        return [self._dict_to_user(s) for s in students_dict if s.get('role') == 'student']
+        return self.find_students_page(limit, offset, cursor)[0]
+
+    def find_students_page(self, limit: int = 100, offset: int = 0,
+                           cursor: Optional[str] = None) -> Tuple[List[StudentProfile], Optional[str]]:
+        """
+        Tìm một trang học sinh kèm next_cursor
+        
+        Returns:
+            (danh sách StudentProfile, next_cursor hoặc None nếu đã hết)
+        """
+        students = self.db.get_students(limit, offset, cursor, self._row_to_user)
+        return students, self._next_cursor(students, limit)
     
-    def find_teachers(self, limit: int = 100, offset: int = 0) -> List[TeacherProfile]:
+    def find_teachers(self, limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> List[TeacherProfile]:
         """
         Tìm tất cả giáo viên với phân trang
         
         Args:
             limit: Số lượng kết quả tối đa
             offset: Vị trí bắt đầu
+            cursor: Con trỏ keyset (next_cursor của trang trước)
             
         Returns:
             Danh sách các đối tượng TeacherProfile
         """
-        teachers_dict = self.db.get_teachers(limit, offset)
-        return [self._dict_to_user(t) for t in teachers_dict if t.get('role') == 'teacher']
+        return self.find_teachers_page(limit, offset, cursor)[0]
+
+    def find_teachers_page(self, limit: int = 100, offset: int = 0,
+                           cursor: Optional[str] = None) -> Tuple[List[TeacherProfile], Optional[str]]:
+        """
+        Tìm một trang giáo viên kèm next_cursor
+        
+        Returns:
+            (danh sách TeacherProfile, next_cursor hoặc None nếu đã hết)
+        """
+        teachers = self.db.get_teachers(limit, offset, cursor, self._row_to_user)
+        return teachers, self._next_cursor(teachers, limit)
+
+    @staticmethod
+    def _next_cursor(page: List[UserProfile], limit: int) -> Optional[str]:
+        """Trang đầy thì id cuối cùng là con trỏ cho trang tiếp theo"""
+        if limit and len(page) >= limit:
+            return page[-1].id
+        return None
     
     def delete_user(self, user_id: int) -> bool:
         """
@@ -168,7 +306,9 @@ class UserRepository:
         Returns:
             True nếu xóa thành công, False nếu không
         """
-        return self.db.delete_user(user_id)
+        deleted = self.db.delete_user(user_id)
+        self.cache.invalidate(user_id)
+        return deleted
     
     def count_users(self) -> dict:
         """
@@ -196,4 +336,14 @@ class UserRepository:
 
     def change_user_role(self, user_id: str, new_role: str) -> bool:
         """Thay đổi role của user"""
-        return self.db.change_user_role(user_id, new_role)
\ No newline at end of file
+        changed = self.db.change_user_role(user_id, new_role)
+        self.cache.invalidate(user_id)
+        return changed
+
+    def invalidate(self, user_id: str) -> None:
+        """Xóa profile khỏi cache sau khi ghi trực tiếp xuống database (vd: nâng cấp kiếm)"""
+        self.cache.invalidate(user_id)
+
+    def cache_stats(self) -> dict:
+        """Thống kê cache profile"""
+        return self.cache.stats()
\ No newline at end of file
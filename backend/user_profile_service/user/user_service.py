@@ -1,7 +1,7 @@
 from user_profile_service.user.user import UserProfile, StudentProfile, TeacherProfile
 from user_profile_service.user.user_repository import UserRepository
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 
 class UserProfileService:
     def __init__(self):
@@ -31,6 +31,16 @@ class UserProfileService:
             self._last_error = e
             return None
 
+    def get_users_by_ids(self, user_ids: List[str]) -> Dict[str, dict]:
+        """Get many users at once, keyed by user ID (missing IDs are skipped)"""
+        try:
+            users = self.user_repository.find_by_ids(user_ids)
+            return {user_id: user.to_dict() for user_id, user in users.items()}
+        except Exception as e:
+            print(f"💥 Error getting {len(user_ids)} users: {e}")
+            self._last_error = e
+            return {}
+
     def get_user_gameplay(self, user_id: str) -> Optional[dict]:
         """Get user details by ID"""
         try:
@@ -57,26 +67,26 @@ class UserProfileService:
         """Update user profile attributes"""
         self._stats["profile_updates"] += 1
         try:
-            user = self.user_repository.find_by_id(user_id)
+            def apply_updates(user):
+                # Update basic user properties (exclude money)
+                for key, value in updates.items():
+                    if hasattr(user, key) and not key.startswith('_') and key not in ['id', 'role', 'created_at', 'money', 'version']:
+                        setattr(user, key, value)
+                
+                # Handle special fields based on user type
+                if isinstance(user, StudentProfile):
+                    if 'items' in updates:
+                        user.set_items(updates['items'])
+                        
+                elif isinstance(user, TeacherProfile):
+                    if 'subjects' in updates:
+                        user.set_subjects(updates['subjects'])
+                return True
+            
+            # Save updated user (re-read and retried if the profile was written concurrently)
+            user, _ = self.user_repository.update(user_id, apply_updates)
             if not user:
                 return {"success": False, "error": "User not found"}
-            
-            # Update basic user properties (exclude money)
-            for key, value in updates.items():
-                if hasattr(user, key) and key not in ['id', 'role', 'created_at', 'money']:
-                    setattr(user, key, value)
-            
-            # Handle special fields based on user type
-            if isinstance(user, StudentProfile):
-                if 'items' in updates:
-                    user.set_items(updates['items'])
-                    
-            elif isinstance(user, TeacherProfile):
-                if 'subjects' in updates:
-                    user.set_subjects(updates['subjects'])
-            
-            # Save updated user
-            self.user_repository.save(user)
             return {"success": True, "updated_fields": list(updates.keys())}
             
         except Exception as e:
@@ -87,50 +97,52 @@ class UserProfileService:
         """Update user progress với automatic weapon upgrade"""
         self._stats["progress_updates"] += 1
         try:
-            user = self.user_repository.find_by_id(user_id)
-            if not user or not isinstance(user, StudentProfile):
-                return {"success": False, "error": "Student not found"}
-            
-            # Update points và level
-            old_points = user.points
-            old_level = user.language_level
-            old_atk = user.atk
-            
-            user.points += points
-            
-            # Level up logic (every 1000 points = 1 level)
-            new_level = max(1, user.points // 1000 + 1)
-            user.language_level = new_level
-            
-            # Auto weapon upgrade khi level up
-            weapon_upgraded = False
-            if new_level > old_level:
-                # Mỗi level tăng ATK lên 2 points
-                new_atk = 10 + (new_level - 1) * 2  # Base ATK = 10
-                user.atk = new_atk
-                weapon_upgraded = True
-            
-            # Save updated user
-            self.user_repository.save(user)
-            
-            result = {
-                "success": True, 
-                "old_points": old_points,
-                "new_points": user.points,
-                "points_gained": points,
-                "old_level": old_level,
-                "new_level": new_level,
-                "level_up": new_level > old_level,
-                "weapon_upgraded": weapon_upgraded
-            }
-            
-            if weapon_upgraded:
-                result["weapon_upgrade"] = {
-                    "old_atk": old_atk,
-                    "new_atk": user.atk,
-                    "atk_gained": user.atk - old_atk
+            def apply_points(user):
+                if not isinstance(user, StudentProfile):
+                    return None
+
+                # Update points và level
+                old_points = user.points
+                old_level = user.language_level
+                old_atk = user.atk
+                
+                user.points += points
+                
+                # Level up logic (every 1000 points = 1 level)
+                new_level = max(1, user.points // 1000 + 1)
+                user.language_level = new_level
+                
+                # Auto weapon upgrade khi level up
+                weapon_upgraded = False
+                if new_level > old_level:
+                    # Mỗi level tăng ATK lên 2 points
+                    new_atk = 10 + (new_level - 1) * 2  # Base ATK = 10
+                    user.atk = new_atk
+                    weapon_upgraded = True
+                
+                result = {
+                    "success": True, 
+                    "old_points": old_points,
+                    "new_points": user.points,
+                    "points_gained": points,
+                    "old_level": old_level,
+                    "new_level": new_level,
+                    "level_up": new_level > old_level,
+                    "weapon_upgraded": weapon_upgraded
                 }
+                
+                if weapon_upgraded:
+                    result["weapon_upgrade"] = {
+                        "old_atk": old_atk,
+                        "new_atk": user.atk,
+                        "atk_gained": user.atk - old_atk
+                    }
+                return result
             
+            # Save updated user (re-read and retried if the profile was written concurrently)
+            _, result = self.user_repository.update(user_id, apply_points)
+            if not result:
+                return {"success": False, "error": "Student not found"}
             return result
             
         except Exception as e:
@@ -157,26 +169,31 @@ class UserProfileService:
     def update_student_stats(self, user_id: int, hp: int = None, atk: int = None) -> dict:
         """Update student's game stats (HP, ATK) and return detailed info"""
         try:
-            user = self.user_repository.find_by_id(user_id)
-            if not user or not isinstance(user, StudentProfile):
-                return {"success": False, "error": "Student not found"}
-            
-            updates = {}
-            if hp is not None:
-                old_hp = user.hp
-                user.hp = max(0, hp)  # HP không được âm
-                updates['hp'] = {"old": old_hp, "new": user.hp}
-                
-            if atk is not None:
-                old_atk = user.atk
-                user.atk = max(1, atk)  # ATK tối thiểu là 1
-                updates['atk'] = {"old": old_atk, "new": user.atk}
-        
-            if not updates:
+            if hp is None and atk is None:
+                user = self.user_repository.find_by_id(user_id)
+                if not user or not isinstance(user, StudentProfile):
+                    return {"success": False, "error": "Student not found"}
                 return {"success": False, "error": "No stats to update"}
+
+            def apply_stats(user):
+                if not isinstance(user, StudentProfile):
+                    return None
+                updates = {}
+                if hp is not None:
+                    old_hp = user.hp
+                    user.hp = max(0, hp)  # HP không được âm
+                    updates['hp'] = {"old": old_hp, "new": user.hp}
+                    
+                if atk is not None:
+                    old_atk = user.atk
+                    user.atk = max(1, atk)  # ATK tối thiểu là 1
+                    updates['atk'] = {"old": old_atk, "new": user.atk}
+                return updates
             
-            # Save updated user
-            self.user_repository.save(user)
+            # Save updated user (re-read and retried if the profile was written concurrently)
+            user, updates = self.user_repository.update(user_id, apply_stats)
+            if not updates:
+                return {"success": False, "error": "Student not found"}
             
             # Return detailed stats including items and level
             return {
@@ -197,23 +214,31 @@ class UserProfileService:
             self._last_error = e
             return {"success": False, "error": str(e)}
     
-    def get_all_students(self, limit: int = 100, offset: int = 0) -> list:
+    def get_all_students(self, limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> list:
         """Get all student profiles"""
+        return self.get_students_page(limit, offset, cursor)[0]
+
+    def get_students_page(self, limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        """Get one page of student profiles and the cursor for the next page"""
         try:
-            students = self.user_repository.find_students(limit, offset)
-            return [student.to_dict() for student in students]
+            students, next_cursor = self.user_repository.find_students_page(limit, offset, cursor)
+            return [student.to_dict() for student in students], next_cursor
         except Exception as e:
             self._last_error = e
-            return []
+            return [], None
     
-    def get_all_teachers(self, limit: int = 100, offset: int = 0) -> list:
+    def get_all_teachers(self, limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> list:
         """Get all teacher profiles"""
+        return self.get_teachers_page(limit, offset, cursor)[0]
+
+    def get_teachers_page(self, limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        """Get one page of teacher profiles and the cursor for the next page"""
         try:
-            teachers = self.user_repository.find_teachers(limit, offset)
-            return [teacher.to_dict() for teacher in teachers]
+            teachers, next_cursor = self.user_repository.find_teachers_page(limit, offset, cursor)
+            return [teacher.to_dict() for teacher in teachers], next_cursor
         except Exception as e:
             self._last_error = e
-            return []
+            return [], None
 
     def find_by_role(self, role: str, limit: int = 100, offset: int = 0) -> List[UserProfile]:
         """Find users by role - wrapper method"""
@@ -256,6 +281,7 @@ class UserProfileService:
                 "last_error": str(self._last_error) if self._last_error else None,
                 "stats": self._stats.copy(),
                 "repository_status": "connected" if test_result else "disconnected",
+                "profile_cache": self.user_repository.cache_stats(),
                 "focus": "progress_based_upgrades"  # No money system
             }
         except Exception as e: